@@ -3,31 +3,51 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+import heapq
+import json
 import os
 import re
+import select
+import socket
 import subprocess
 import sys
-from typing import Iterable
+import threading
+import time
+from typing import Callable, Iterable, Iterator, NamedTuple, Sequence
 
+from activity_rank_client import daemon_request as _daemon_request, serve_socket_path
+import proc_table
 
+
+WORD_LEFT = r"(^|[^A-Za-z0-9_])"
+WORD_RIGHT = r"([^A-Za-z0-9_]|$)"
 DEFAULT_AGENT_RE = (
-    r"(^|[^A-Za-z0-9_])"
-    r"(codex|claude|gemini|opencode|aider|goose|cursor-agent|cursor agent|"
+    WORD_LEFT
+    + r"(codex|claude|gemini|opencode|aider|goose|cursor-agent|cursor agent|"
     r"roo|cline|openai|anthropic)"
-    r"([^A-Za-z0-9_]|$)"
+    + WORD_RIGHT
 )
 DEFAULT_NOISE_RE = (
-    r"(^|[^A-Za-z0-9_])"
-    r"(vite|vite-node|webpack|webpack-dev-server|next dev|next-server|"
+    WORD_LEFT
+    + r"(vite|vite-node|webpack|webpack-dev-server|next dev|next-server|"
     r"storybook|tsc -w|tsc --watch|nodemon|tsx watch|npm run dev|"
     r"pnpm dev|pnpm run dev|yarn dev|bun dev|nuxt|astro|svelte-kit|"
     r"turbo dev|rollup -w|rollup --watch|parcel)"
-    r"([^A-Za-z0-9_]|$)"
+    + WORD_RIGHT
 )
+DESCENDANT_LIMIT = 80
+
+
+def _scoped(server: str, ident: str) -> str:
+    # tmux ids (`$1`, `@1`, `%1`) are only unique per server; rows from other servers are keyed by socket too.
+    return f"{server}\t{ident}" if server else ident
 
 
-@dataclass
+@dataclass(slots=True)
 class WindowRow:
     session_id: str
     session_name: str
@@ -39,16 +59,30 @@ class WindowRow:
     codex_unread: bool
     active: bool
     zoomed: bool = False
+    server: str = ""
 
+    @property
+    def key(self) -> str:
+        return _scoped(self.server, self.window_id)
 
-@dataclass
+    @property
+    def session_key(self) -> str:
+        return _scoped(self.server, self.session_id)
+
+
+@dataclass(slots=True)
 class SessionRow:
     session_id: str
     session_name: str
     activity: int
+    server: str = ""
+
+    @property
+    def key(self) -> str:
+        return _scoped(self.server, self.session_id)
 
 
-@dataclass
+@dataclass(slots=True)
 class PaneRow:
     window_id: str
     pane_id: str
@@ -57,9 +91,18 @@ class PaneRow:
     title: str
     path: str
     pane_pid: int
+    server: str = ""
 
+    @property
+    def key(self) -> str:
+        return _scoped(self.server, self.pane_id)
 
-@dataclass
+    @property
+    def window_key(self) -> str:
+        return _scoped(self.server, self.window_id)
+
+
+@dataclass(slots=True)
 class PaneDetail:
     session_id: str
     session_name: str
@@ -78,6 +121,32 @@ class PaneDetail:
     window_zoomed: bool
     pane_pid: int = 0
     pane_active: bool = False
+    server: str = ""
+
+    @property
+    def key(self) -> str:
+        return _scoped(self.server, self.pane_id)
+
+    @property
+    def window_key(self) -> str:
+        return _scoped(self.server, self.window_id)
+
+
+@dataclass(slots=True, frozen=True)
+class RankInfo:
+    kind: str
+    bucket: int
+    mark: str
+
+
+NO_RANK = RankInfo("normal", 3, " ")
+
+
+class Ranked(NamedTuple):
+    """Rows in rank order plus their rank metadata, keyed by row `key` (the tmux id on a single server)."""
+
+    rows: list
+    info: dict[str, RankInfo]
 
 
 def _rx(name: str, default: str) -> re.Pattern[str]:
@@ -107,35 +176,125 @@ def _norm(text: str) -> str:
     return " ".join((text or "").replace("\t", " ").split()).lower()
 
 
+def _profile_log_path() -> str:
+    return os.path.expanduser(
+        os.environ.get("TMUX_ACTIVITY_PROFILE_LOG", "~/.config/tmux/run/activity_rank/profile.jsonl")
+    )
+
+
+class Profile:
+    """Opt-in wall time per phase and counters for one ranking run.
+
+    Enabled by `TMUX_ACTIVITY_PROFILE=1` or `--profile`; `emit` writes one JSON record to stderr
+    and appends it to `TMUX_ACTIVITY_PROFILE_LOG` (empty disables the log file).
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.phases: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def record(self, command: str) -> dict[str, object]:
+        return {
+            "ts": round(time.time(), 3),
+            "pid": os.getpid(),
+            "command": command,
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "total_ms": round(sum(self.phases.values()) * 1000, 3),
+            "counts": dict(self.counts),
+        }
+
+    def emit(self, command: str) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(self.record(command), ensure_ascii=False, separators=(",", ":"))
+        try:
+            sys.stderr.write(line + "\n")
+        except Exception:
+            pass
+        path = _profile_log_path()
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+
+def _profile_enabled() -> bool:
+    return _as_bool(os.environ.get("TMUX_ACTIVITY_PROFILE"))
+
+
+PROFILE = Profile(_profile_enabled())
+
+
 def _process_table() -> tuple[dict[int, list[int]], dict[int, str]]:
     try:
-        raw = subprocess.check_output(
-            ["ps", "-axo", "pid=,ppid=,command="],
-            text=True,
-            stderr=subprocess.DEVNULL,
-        )
+        parent_by_pid, commands = proc_table.process_table()
     except Exception:
         return {}, {}
 
     children: dict[int, list[int]] = {}
-    commands: dict[int, str] = {}
-    for line in raw.splitlines():
-        parts = line.strip().split(None, 2)
-        if len(parts) < 2:
-            continue
-        try:
-            pid = int(parts[0])
-            ppid = int(parts[1])
-        except ValueError:
-            continue
-        command = parts[2] if len(parts) > 2 else ""
-        commands[pid] = command
+    for pid, ppid in parent_by_pid.items():
         children.setdefault(ppid, []).append(pid)
     return children, commands
 
 
+def _proc_index_path() -> str:
+    return os.path.expanduser(
+        os.environ.get("TMUX_ACTIVITY_PROC_INDEX", "~/.config/tmux/run/activity_rank/proc-index.json")
+    )
+
+
+# Set by `serve`: the daemon keeps one index in memory instead of the cache file.
+_PROC_INDEX: proc_table.ProcessIndex | None = None
+
+
+def _descendant_text_from_index(pids: list[int], index: proc_table.ProcessIndex) -> dict[int, str]:
+    out: dict[int, str] = {}
+    for root in pids:
+        out[root] = _norm(" ".join(index.subtree_commands(root, DESCENDANT_LIMIT))) if root else ""
+    return out
+
+
 def _descendant_text_for(pids: Iterable[int]) -> dict[int, str]:
+    pids = list(pids)
+    if _PROC_INDEX is not None:
+        refreshed = _PROC_INDEX.refreshed
+        out = _descendant_text_from_index(pids, _PROC_INDEX)
+        PROFILE.count("processes", len(_PROC_INDEX.visited))
+        PROFILE.count("cmdline_reads", _PROC_INDEX.refreshed - refreshed)
+        _PROC_INDEX.commit()
+        return out
+    index_path = _proc_index_path()
+    if index_path and proc_table.ProcessIndex.supported():
+        index = proc_table.ProcessIndex()
+        index.load(index_path)
+        out = _descendant_text_from_index(pids, index)
+        PROFILE.count("processes", len(index.visited))
+        PROFILE.count("cmdline_reads", index.refreshed)
+        index.save(index_path)
+        return out
+
     children, commands = _process_table()
+    PROFILE.count("processes", len(commands))
     out: dict[int, str] = {}
     for root in pids:
         if not root:
@@ -144,7 +303,7 @@ def _descendant_text_for(pids: Iterable[int]) -> dict[int, str]:
         seen: set[int] = set()
         stack = [root]
         parts: list[str] = []
-        while stack and len(seen) < 80:
+        while stack and len(seen) < DESCENDANT_LIMIT:
             pid = stack.pop()
             if pid in seen:
                 continue
@@ -156,37 +315,70 @@ def _descendant_text_for(pids: Iterable[int]) -> dict[int, str]:
     return out
 
 
-def _pane_direct_text(pane: PaneRow | PaneDetail) -> str:
-    return _norm(f"{pane.command} {pane.title}")
-
-
-def _pane_process_text(pane: PaneRow | PaneDetail, process_text: dict[object, str]) -> str:
-    proc = process_text.get(getattr(pane, "pane_id", ""), "")
+def _pane_text(pane: PaneRow | PaneDetail, process_text: dict[object, str]) -> str:
+    proc = process_text.get(pane.key, "")
     if not proc:
         proc = process_text.get(getattr(pane, "pane_pid", 0), "")
-    return _norm(proc)
+    # _norm splits on any whitespace, so one pass over the joined raw text equals normalizing each part.
+    return _norm(f"{pane.command} {pane.title} {proc}")
+
+
+def _kind_rx() -> re.Pattern[str] | None:
+    agent, noise = AGENT_RE.pattern, NOISE_RE.pattern
+    if all(p.startswith(WORD_LEFT) and p.endswith(WORD_RIGHT) for p in (agent, noise)):
+        # Word-bounded alternations (the defaults): zero-width boundaries let matches sit back to back,
+        # so one finditer pass sees every agent/noise word.
+        agent = agent[len(WORD_LEFT):-len(WORD_RIGHT)]
+        noise = noise[len(WORD_LEFT):-len(WORD_RIGHT)]
+        pattern = rf"(?<![A-Za-z0-9_])(?:(?P<agent>{agent})|(?P<noise>{noise}))(?![A-Za-z0-9_])"
+    else:
+        # Arbitrary overrides: a zero-width lookahead so neither pattern consumes what the other needs.
+        pattern = f"(?=(?P<agent>{agent})|(?P<noise>{noise}))"
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return None
 
 
-def _pane_text(pane: PaneRow | PaneDetail, process_text: dict[object, str]) -> str:
-    return _norm(f"{_pane_direct_text(pane)} {_pane_process_text(pane, process_text)}")
+KIND_RE = _kind_rx()
+_KIND_CACHE: dict[str, str] = {}
+KIND_CACHE_LIMIT = 4096
+
+
+def _classify_text(text: str) -> str:
+    kind = _KIND_CACHE.get(text)
+    if kind is not None:
+        return kind
+    if KIND_RE is None:
+        # Custom patterns that cannot be embedded (e.g. inline global flags): two scans.
+        kind = "agent" if AGENT_RE.search(text) else "noise" if NOISE_RE.search(text) else "normal"
+    else:
+        kind = "normal"
+        for match in KIND_RE.finditer(text):
+            if match.group("agent") is not None:
+                kind = "agent"
+                break
+            kind = "noise"
+    PROFILE.count("regex_scans")
+    if len(_KIND_CACHE) >= KIND_CACHE_LIMIT:
+        _KIND_CACHE.clear()
+    _KIND_CACHE[text] = kind
+    return kind
 
 
 def _pane_kind(pane: PaneRow | PaneDetail, process_text: dict[object, str]) -> str:
-    direct = _pane_direct_text(pane)
-    if AGENT_RE.search(direct):
-        return "agent"
-    text = _norm(f"{direct} {_pane_process_text(pane, process_text)}")
-    if AGENT_RE.search(text):
-        return "agent"
-    if NOISE_RE.search(text):
-        return "noise"
-    return "normal"
+    # Agent wins over noise anywhere in command/title/process text, so a dev server started by an agent stays "agent".
+    return _classify_text(_pane_text(pane, process_text))
+
+
+def classify_panes(panes: Iterable[PaneRow | PaneDetail], process_text: dict[object, str]) -> dict[str, str]:
+    """Classify every pane once per ranking run: pane key -> agent|noise|normal."""
+    return {pane.key: _pane_kind(pane, process_text) for pane in panes}
 
 
-def _window_kind(window: WindowRow, panes: list[PaneRow], process_text: dict[object, str]) -> str:
-    if window.codex_unread:
+def _window_kind(codex_unread: bool, kinds: list[str]) -> str:
+    if codex_unread:
         return "done"
-    kinds = [_pane_kind(pane, process_text) for pane in panes]
     if kinds and all(kind == "noise" for kind in kinds):
         return "noise"
     if "agent" in kinds:
@@ -194,120 +386,154 @@ def _window_kind(window: WindowRow, panes: list[PaneRow], process_text: dict[obj
     return "normal"
 
 
-def _rank_for_window(window: WindowRow, panes: list[PaneRow], process_text: dict[object, str]) -> tuple[int, int, int, int, str]:
-    kind = _window_kind(window, panes, process_text)
+def _window_info(codex_unread: bool, activity_flag: bool, kinds: list[str]) -> RankInfo:
+    kind = _window_kind(codex_unread, kinds)
     # Keep tmux's raw activity flag as a marker, not a primary rank bucket:
     # long-running dev servers can set it forever, while window_activity is the useful freshness signal.
     if kind == "done":
-        bucket = 0
-        mark = "✓"
-    elif kind == "noise":
-        bucket = 2
-        mark = "·"
+        return RankInfo(kind, 0, "✓")
+    if kind == "noise":
+        return RankInfo(kind, 2, "·")
+    if kind == "agent" and activity_flag:
+        mark = "●"
+    elif activity_flag:
+        mark = "•"
     else:
-        bucket = 1
-        if kind == "agent" and window.activity_flag:
-            mark = "●"
-        elif window.activity_flag:
-            mark = "•"
-        else:
-            mark = " "
-    setattr(window, "kind", kind)
-    setattr(window, "bucket", bucket)
-    setattr(window, "mark", mark)
-    return (bucket, -window.activity, 0 if window.active else 1, window.window_index, window.window_id)
-
-
-def rank_windows(windows: list[WindowRow], panes: list[PaneRow], process_text: dict[object, str]) -> list[WindowRow]:
-    panes_by_window: dict[str, list[PaneRow]] = {}
+        mark = " "
+    return RankInfo(kind, 1, mark)
+
+
+def _kinds_by_window(panes: Iterable[PaneRow | PaneDetail], pane_kinds: dict[str, str]) -> dict[str, list[str]]:
+    out: dict[str, list[str]] = {}
     for pane in panes:
-        panes_by_window.setdefault(pane.window_id, []).append(pane)
-    return sorted(windows, key=lambda row: _rank_for_window(row, panes_by_window.get(row.window_id, []), process_text))
+        out.setdefault(pane.window_key, []).append(pane_kinds.get(pane.key, "normal"))
+    return out
+
+
+RankKey = Callable[[object], tuple]
+
+
+def _window_order(
+    windows: list[WindowRow],
+    panes: Sequence[PaneRow | PaneDetail],
+    process_text: dict[object, str],
+    pane_kinds: dict[str, str] | None = None,
+) -> tuple[dict[str, RankInfo], RankKey]:
+    if pane_kinds is None:
+        pane_kinds = classify_panes(panes, process_text)
+    kinds_by_window = _kinds_by_window(panes, pane_kinds)
+    info = {
+        row.key: _window_info(row.codex_unread, row.activity_flag, kinds_by_window.get(row.key, []))
+        for row in windows
+    }
+
+    def key(row: WindowRow) -> tuple[int, int, int, int, str]:
+        return (info[row.key].bucket, -row.activity, 0 if row.active else 1, row.window_index, row.key)
+
+    return info, key
+
+
+def rank_windows(
+    windows: list[WindowRow],
+    panes: Sequence[PaneRow | PaneDetail],
+    process_text: dict[object, str],
+    pane_kinds: dict[str, str] | None = None,
+) -> Ranked:
+    info, key = _window_order(windows, panes, process_text, pane_kinds)
+    return Ranked(sorted(windows, key=key), info)
 
 
 def rank_sessions(
     sessions: list[SessionRow],
     windows: list[WindowRow],
-    panes: list[PaneRow],
+    panes: Sequence[PaneRow | PaneDetail],
     process_text: dict[object, str],
-) -> list[SessionRow]:
-    ranked_windows = rank_windows(windows, panes, process_text)
+    pane_kinds: dict[str, str] | None = None,
+) -> Ranked:
+    ranked_windows = rank_windows(windows, panes, process_text, pane_kinds)
     best_by_session: dict[str, WindowRow] = {}
-    for window in ranked_windows:
-        current = best_by_session.get(window.session_id)
+    for window in ranked_windows.rows:
+        current = best_by_session.get(window.session_key)
         if current is None:
-            best_by_session[window.session_id] = window
+            best_by_session[window.session_key] = window
             continue
-        if (getattr(window, "bucket", 9), -window.activity) < (getattr(current, "bucket", 9), -current.activity):
-            best_by_session[window.session_id] = window
+        if (ranked_windows.info[window.key].bucket, -window.activity) < (ranked_windows.info[current.key].bucket, -current.activity):
+            best_by_session[window.session_key] = window
 
-    def key(session: SessionRow) -> tuple[int, int, str]:
-        best = best_by_session.get(session.session_id)
-        if best is None:
-            setattr(session, "mark", " ")
-            setattr(session, "bucket", 3)
-            return (3, -session.activity, session.session_name)
-        setattr(session, "mark", getattr(best, "mark", " "))
-        setattr(session, "bucket", getattr(best, "bucket", 3))
-        return (getattr(best, "bucket", 3), -best.activity, session.session_name)
+    info: dict[str, RankInfo] = {}
+    for session in sessions:
+        best = best_by_session.get(session.key)
+        info[session.key] = NO_RANK if best is None else ranked_windows.info[best.key]
 
-    return sorted(sessions, key=key)
+    def key(session: SessionRow) -> tuple[int, int, str, str]:
+        best = best_by_session.get(session.key)
+        activity = session.activity if best is None else best.activity
+        return (info[session.key].bucket, -activity, session.session_name, session.server)
 
+    return Ranked(sorted(sessions, key=key), info)
 
-def rank_panes(
+
+def _pane_order(
     panes: list[PaneDetail],
     process_text: dict[object, str],
-    origin_pane_id: str = "",
-) -> list[PaneDetail]:
-    windows: dict[str, WindowRow] = {}
-    pane_rows: list[PaneRow] = []
+    pane_kinds: dict[str, str] | None = None,
+) -> tuple[dict[str, RankInfo], RankKey]:
+    if pane_kinds is None:
+        pane_kinds = classify_panes(panes, process_text)
+    # Window fields are repeated on every PaneDetail, so the parent window rank comes straight from the panes.
+    kinds_by_window = _kinds_by_window(panes, pane_kinds)
+    window_info: dict[str, RankInfo] = {}
     for pane in panes:
-        windows[pane.window_id] = WindowRow(
-            pane.session_id,
-            pane.session_name,
-            pane.window_id,
-            pane.window_index,
-            pane.window_name,
-            pane.window_activity,
-            pane.window_activity_flag,
-            pane.codex_unread,
-            pane.window_active,
-            pane.window_zoomed,
-        )
-        pane_rows.append(
-            PaneRow(
-                pane.window_id,
-                pane.pane_id,
-                pane.pane_index,
-                pane.command,
-                pane.title,
-                pane.path,
-                pane.pane_pid,
-            )
-        )
-    ranked_windows = rank_windows(list(windows.values()), pane_rows, process_text)
-    window_rank = {row.window_id: (getattr(row, "bucket", 3), -row.activity, row.window_index, getattr(row, "mark", " ")) for row in ranked_windows}
+        if pane.window_key not in window_info:
+            window_info[pane.window_key] = _window_info(pane.codex_unread, pane.window_activity_flag, kinds_by_window[pane.window_key])
+
+    info: dict[str, RankInfo] = {}
+    for pane in panes:
+        window = window_info[pane.window_key]
+        info[pane.key] = RankInfo(pane_kinds[pane.key], window.bucket, window.mark)
 
     def key(pane: PaneDetail) -> tuple[int, int, int, int, str]:
-        bucket, neg_activity, window_index, mark = window_rank.get(pane.window_id, (3, -pane.window_activity, pane.window_index, " "))
-        kind = _pane_kind(pane, process_text)
-        pane_penalty = 1 if kind == "noise" and bucket != 4 else 0
-        setattr(pane, "mark", mark if bucket != 4 else "·")
-        setattr(pane, "kind", kind)
-        return (bucket, neg_activity, window_index, pane_penalty, pane.pane_id)
+        pane_info = info[pane.key]
+        pane_penalty = 1 if pane_info.kind == "noise" else 0
+        return (pane_info.bucket, -pane.window_activity, pane.window_index, pane_penalty, pane.key)
 
-    return sorted(panes, key=key)
+    return info, key
 
 
-def _tmux_cmd(args: list[str]) -> list[str]:
-    socket = os.environ.get("OUTER_TMUX_SOCKET") or os.environ.get("TMUX_ACTIVITY_SOCKET")
+def rank_panes(
+    panes: list[PaneDetail],
+    process_text: dict[object, str],
+    origin_pane_id: str = "",
+    pane_kinds: dict[str, str] | None = None,
+) -> Ranked:
+    info, key = _pane_order(panes, process_text, pane_kinds)
+    return Ranked(sorted(panes, key=key), info)
+
+
+def ranked_phases(rows: list, key: RankKey, top_k: int) -> Iterator[list]:
+    """Rows in rank order, in two phases: the best `top_k` first (heap partial sort), then the rest.
+
+    Every rank key ends with a unique id, so the phases concatenate to exactly `sorted(rows, key=key)`.
+    This only overlaps the tail sort with output: the keys need every row classified, so collection
+    and classification still finish before the first phase.
+    """
+    if 0 < top_k < len(rows):
+        head = heapq.nsmallest(top_k, rows, key=key)
+        yield head
+        taken = {id(row) for row in head}
+        rows = [row for row in rows if id(row) not in taken]
+    yield sorted(rows, key=key)
+
+
+def _tmux_cmd(args: list[str], server: str = "") -> list[str]:
+    socket = server or os.environ.get("OUTER_TMUX_SOCKET") or os.environ.get("TMUX_ACTIVITY_SOCKET")
     if socket:
         return ["tmux", "-S", socket, *args]
     return ["tmux", *args]
 
 
-def _tmux_out(args: list[str]) -> str:
-    return subprocess.check_output(_tmux_cmd(args), text=True, stderr=subprocess.DEVNULL)
+def _tmux_out(args: list[str], server: str = "") -> str:
+    return subprocess.check_output(_tmux_cmd(args, server), text=True, stderr=subprocess.DEVNULL)
 
 
 def _tmux_set(args: list[str]) -> None:
@@ -317,60 +543,321 @@ def _tmux_set(args: list[str]) -> None:
         pass
 
 
+class TmuxControlError(RuntimeError):
+    pass
+
+
+# A wedged server must not hang the picker: past this, the batch falls back to subprocesses.
+CONTROL_TIMEOUT_SECONDS = float(os.environ.get("TMUX_ACTIVITY_CONTROL_TIMEOUT_SECONDS", "1.0"))
+
+
+def _control_quote(arg: str) -> str:
+    # tmux single quotes are fully literal; anything we cannot express that way is left to the subprocess path.
+    if "'" in arg or "\n" in arg:
+        raise TmuxControlError(f"cannot quote argument for control mode: {arg!r}")
+    return f"'{arg}'"
+
+
+def _read_control_replies(lines: Iterable[str], count: int) -> list[str]:
+    """Collect the output of the next `count` commands sent by this client.
+
+    Blocks are framed by `%begin <time> <number> <flags>` and `%end`/`%error` with the same
+    time and number. Only blocks with flag bit 1 belong to our commands (the implicit attach has 0),
+    and notifications such as `%session-changed` arrive between blocks and are skipped.
+    """
+    replies: list[str] = []
+    block: list[str] | None = None
+    guard = ""
+    ours = False
+    for line in lines:
+        line = line.rstrip("\n")
+        if block is None:
+            if line.startswith("%begin "):
+                parts = line.split(" ")
+                guard = " ".join(parts[1:3])
+                ours = len(parts) > 3 and (_as_int(parts[3]) & 1) == 1
+                block = []
+            elif line.startswith("%exit"):
+                break
+            continue
+        if line.startswith(("%end ", "%error ")) and " ".join(line.split(" ")[1:3]) == guard:
+            if ours:
+                if line.startswith("%error "):
+                    raise TmuxControlError("\n".join(block))
+                replies.append("".join(f"{row}\n" for row in block))
+                if len(replies) >= count:
+                    return replies
+            block = None
+            continue
+        block.append(line)
+    raise TmuxControlError(f"control client ended after {len(replies)} of {count} replies")
+
+
+class TmuxControl:
+    """A `tmux -C` client that answers a batch of commands in one round-trip.
+
+    The client attaches read-only; core/hooks.conf skips its attach hooks for read-only
+    control clients, so querying never acknowledges tasks or marks windows seen. Every batch
+    must be answered within `CONTROL_TIMEOUT_SECONDS`, otherwise `TmuxControlError` is raised
+    and callers fall back to one subprocess per query.
+    """
+
+    def __init__(self, server: str = "") -> None:
+        self.proc = subprocess.Popen(
+            _tmux_cmd(["-C", "attach-session", "-f", "read-only,ignore-size,no-output"], server),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._pending = b""
+
+    def _lines(self, deadline: float) -> Iterator[str]:
+        assert self.proc.stdout is not None
+        fd = self.proc.stdout.fileno()
+        while True:
+            while b"\n" in self._pending:
+                line, self._pending = self._pending.split(b"\n", 1)
+                yield line.decode("utf-8", "replace")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TmuxControlError(f"no control-mode reply within {CONTROL_TIMEOUT_SECONDS}s")
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return
+            self._pending += chunk
+
+    def run(self, commands: list[list[str]]) -> list[str]:
+        if not commands:
+            return []
+        script = "".join(" ".join(_control_quote(arg) for arg in args) + "\n" for args in commands)
+        assert self.proc.stdin is not None
+        try:
+            self.proc.stdin.write(script.encode("utf-8"))
+            self.proc.stdin.flush()
+        except OSError as exc:
+            raise TmuxControlError(str(exc)) from exc
+        return _read_control_replies(self._lines(time.monotonic() + CONTROL_TIMEOUT_SECONDS), len(commands))
+
+    def close(self) -> None:
+        try:
+            if self.proc.stdin is not None:
+                self.proc.stdin.close()
+            self.proc.wait(timeout=0.2)
+        except Exception:
+            self.proc.kill()
+            self.proc.wait()
+
+
+def _use_control_backend() -> bool:
+    return os.environ.get("TMUX_ACTIVITY_BACKEND", "").strip().lower() in {"control", "control-mode", "-c"}
+
+
+# Set by `serve`: one control client held for the daemon's lifetime.
+_CONTROL: TmuxControl | None = None
+_CONTROL_LOCK = threading.Lock()
+
+
+def _tmux_batch(commands: list[list[str]], server: str = "") -> list[str]:
+    """Run several read-only tmux queries, over one control-mode connection when enabled.
+
+    `server` targets another socket than the default one; the daemon's persistent client is
+    only used for the default server.
+    """
+    global _CONTROL
+    PROFILE.count("tmux_queries", len(commands))
+    if _CONTROL is not None and not server:
+        with _CONTROL_LOCK:
+            try:
+                return _CONTROL.run(commands)
+            except (OSError, TmuxControlError):
+                # The reply stream may be out of sync now; drop the client and let the caller reconnect.
+                _CONTROL.close()
+                _CONTROL = None
+    elif len(commands) > 1 and _use_control_backend():
+        control: TmuxControl | None = None
+        try:
+            control = TmuxControl(server)
+            return control.run(commands)
+        except (OSError, TmuxControlError):
+            pass
+        finally:
+            if control is not None:
+                control.close()
+    return [_tmux_out(args, server) for args in commands]
+
+
 def _split_rows(raw: str) -> Iterable[list[str]]:
     for line in raw.splitlines():
         if line.strip():
             yield line.split("\t")
 
 
+SNAPSHOT_FMT = "\t".join(
+    [
+        "#{session_id}",
+        "#{session_name}",
+        "#{session_activity}",
+        "#{window_id}",
+        "#{window_index}",
+        "#{window_name}",
+        "#{window_activity}",
+        "#{window_activity_flag}",
+        "#{@codex_unread_count}",
+        "#{window_active}",
+        "#{window_zoomed_flag}",
+        "#{pane_id}",
+        "#{pane_index}",
+        "#{pane_current_command}",
+        "#{pane_title}",
+        "#{pane_current_path}",
+        "#{pane_pid}",
+        "#{pane_active}",
+    ]
+)
+SNAPSHOT_QUERY = ["list-panes", "-a", "-F", SNAPSHOT_FMT]
+EXCLUDE_WINDOW_QUERY = ["show", "-gqv", "@fzf_exclude_window_id"]
+ORIGIN_PANE_QUERY = ["show", "-gqv", "@panes_popup_origin_pane_id"]
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """Sessions, windows and panes derived from a single `list-panes -a` listing."""
+
+    sessions: list[SessionRow]
+    windows: list[WindowRow]
+    details: list[PaneDetail]
+
+    @property
+    def panes(self) -> list[PaneDetail]:
+        # PaneDetail carries every PaneRow field, so the ranking reads it directly instead of a second copy.
+        return self.details
+
+    @classmethod
+    def parse(cls, raw: str, server: str = "") -> Snapshot:
+        sessions: dict[str, SessionRow] = {}
+        # A linked window is listed once per session it is in; keep one row per link like `list-windows -a`.
+        windows: dict[tuple[str, str], WindowRow] = {}
+        details: list[PaneDetail] = []
+        for parts in _split_rows(raw):
+            parts += [""] * (18 - len(parts))
+            session_id, session_name, window_id = parts[0], parts[1], parts[3]
+            window_index = _as_int(parts[4])
+            window_activity = _as_int(parts[6])
+            activity_flag = _as_bool(parts[7])
+            codex_unread = _as_bool(parts[8])
+            window_active = _as_bool(parts[9])
+            zoomed = _as_bool(parts[10])
+            if session_id not in sessions:
+                sessions[session_id] = SessionRow(session_id, session_name, _as_int(parts[2]), server)
+            if (session_id, window_id) not in windows:
+                windows[session_id, window_id] = WindowRow(
+                    session_id, session_name, window_id, window_index, parts[5],
+                    window_activity, activity_flag, codex_unread, window_active, zoomed, server,
+                )
+            details.append(
+                PaneDetail(
+                    session_id, session_name, window_id, window_index, parts[5],
+                    parts[11], _as_int(parts[12]), parts[13], parts[14], parts[15],
+                    window_activity, activity_flag, codex_unread,
+                    window_active, zoomed, _as_int(parts[16]), _as_bool(parts[17]), server,
+                )
+            )
+        return cls(list(sessions.values()), list(windows.values()), details)
+
+
+def collect_snapshot() -> Snapshot:
+    return Snapshot.parse(_tmux_batch([SNAPSHOT_QUERY])[0])
+
+
+def activity_servers(sockets: Sequence[str] = ()) -> list[str]:
+    """Sockets to rank across: `--socket` options, else `TMUX_ACTIVITY_SOCKETS` (os.pathsep-separated)."""
+    raw = list(sockets) or os.environ.get("TMUX_ACTIVITY_SOCKETS", "").split(os.pathsep)
+    out: list[str] = []
+    for item in raw:
+        path = os.path.expanduser(item.strip())
+        if path and path not in out:
+            out.append(path)
+    return out
+
+
+def collect_servers(servers: Sequence[str]) -> Snapshot:
+    """Collect every server concurrently and merge the listings; rows are tagged with their socket.
+
+    A server that is not running (or not answering) is left out rather than failing the picker.
+    """
+
+    def collect(server: str) -> Snapshot | None:
+        try:
+            return Snapshot.parse(_tmux_batch([SNAPSHOT_QUERY], server)[0], server)
+        except Exception:
+            return None
+
+    merged = Snapshot([], [], [])
+    with ThreadPoolExecutor(max_workers=min(8, max(1, len(servers)))) as pool:
+        for snapshot in pool.map(collect, servers):
+            if snapshot is None:
+                continue
+            merged.sessions.extend(snapshot.sessions)
+            merged.windows.extend(snapshot.windows)
+            merged.details.extend(snapshot.details)
+    return merged
+
+
+def _current_server() -> str:
+    socket = os.environ.get("OUTER_TMUX_SOCKET") or os.environ.get("TMUX_ACTIVITY_SOCKET")
+    return socket or os.environ.get("TMUX", "").partition(",")[0]
+
+
 def collect_windows() -> list[WindowRow]:
-    fmt = "#{session_id}\t#{session_name}\t#{window_id}\t#{window_index}\t#{window_name}\t#{window_activity}\t#{window_activity_flag}\t#{@codex_unread_count}\t#{window_active}\t#{window_zoomed_flag}"
-    rows: list[WindowRow] = []
-    for parts in _split_rows(_tmux_out(["list-windows", "-a", "-F", fmt])):
-        parts += [""] * (10 - len(parts))
-        rows.append(WindowRow(parts[0], parts[1], parts[2], _as_int(parts[3]), parts[4], _as_int(parts[5]), _as_bool(parts[6]), _as_bool(parts[7]), _as_bool(parts[8]), _as_bool(parts[9])))
-    return rows
+    return collect_snapshot().windows
 
 
 def collect_sessions() -> list[SessionRow]:
-    fmt = "#{session_id}\t#{session_name}\t#{session_activity}"
-    rows: list[SessionRow] = []
-    for parts in _split_rows(_tmux_out(["list-sessions", "-F", fmt])):
-        parts += [""] * (3 - len(parts))
-        rows.append(SessionRow(parts[0], parts[1], _as_int(parts[2])))
-    return rows
+    return collect_snapshot().sessions
 
 
-def collect_pane_rows() -> list[PaneRow]:
-    fmt = "#{window_id}\t#{pane_id}\t#{pane_index}\t#{pane_current_command}\t#{pane_title}\t#{pane_current_path}\t#{pane_pid}"
-    rows: list[PaneRow] = []
-    for parts in _split_rows(_tmux_out(["list-panes", "-a", "-F", fmt])):
-        parts += [""] * (7 - len(parts))
-        rows.append(PaneRow(parts[0], parts[1], _as_int(parts[2]), parts[3], parts[4], parts[5], _as_int(parts[6])))
-    return rows
+def collect_pane_rows() -> list[PaneDetail]:
+    return collect_snapshot().panes
 
 
 def collect_pane_details() -> list[PaneDetail]:
-    fmt = "#{session_id}\t#{session_name}\t#{window_id}\t#{window_index}\t#{window_name}\t#{pane_id}\t#{pane_index}\t#{pane_current_command}\t#{pane_title}\t#{pane_current_path}\t#{window_activity}\t#{window_activity_flag}\t#{@codex_unread_count}\t#{window_active}\t#{window_zoomed_flag}\t#{pane_pid}\t#{pane_active}"
-    rows: list[PaneDetail] = []
-    exclude_window = _tmux_out(["show", "-gqv", "@fzf_exclude_window_id"]).strip()
     origin = os.environ.get("ORIGIN_PANE_ID", "").strip()
+    queries = [EXCLUDE_WINDOW_QUERY, SNAPSHOT_QUERY]
     if not origin:
-        origin = _tmux_out(["show", "-gqv", "@panes_popup_origin_pane_id"]).strip()
-    for parts in _split_rows(_tmux_out(["list-panes", "-a", "-F", fmt])):
-        parts += [""] * (17 - len(parts))
-        if exclude_window and parts[2] == exclude_window and parts[5] != origin:
-            continue
-        rows.append(
-            PaneDetail(
-                parts[0], parts[1], parts[2], _as_int(parts[3]), parts[4],
-                parts[5], _as_int(parts[6]), parts[7], parts[8], parts[9],
-                _as_int(parts[10]), _as_bool(parts[11]), _as_bool(parts[12]),
-                _as_bool(parts[13]), _as_bool(parts[14]), _as_int(parts[15]),
-                _as_bool(parts[16]),
-            )
+        queries.append(ORIGIN_PANE_QUERY)
+    replies = _tmux_batch(queries)
+    if not origin:
+        origin = replies[2].strip()
+    return _drop_excluded_window(Snapshot.parse(replies[1]).details, replies[0].strip(), origin)
+
+
+def collect_server_pane_details(servers: Sequence[str]) -> list[PaneDetail]:
+    details = collect_servers(servers).details
+    origin = os.environ.get("ORIGIN_PANE_ID", "").strip()
+    queries = [EXCLUDE_WINDOW_QUERY] if origin else [EXCLUDE_WINDOW_QUERY, ORIGIN_PANE_QUERY]
+    try:
+        replies = _tmux_batch(queries)
+    except Exception:
+        # Not invoked from a tmux popup (or the current server is not among the sockets): nothing to hide.
+        return details
+    if not origin:
+        origin = replies[1].strip()
+    return _drop_excluded_window(details, replies[0].strip(), origin, _current_server())
+
+
+def _drop_excluded_window(rows: list[PaneDetail], exclude_window: str, origin: str, server: str = "") -> list[PaneDetail]:
+    # The popup's own window is hidden from the pane picker, except for the pane it was opened from.
+    # The popup options live on the invoking server, so only its rows (untagged, or tagged with its socket) match.
+    return [
+        row
+        for row in rows
+        if not (
+            exclude_window
+            and row.window_id == exclude_window
+            and row.pane_id != origin
+            and row.server in ("", server)
         )
-    return rows
+    ]
 
 
 def process_text_for_panes(panes: Iterable[PaneRow | PaneDetail]) -> dict[object, str]:
@@ -378,56 +865,395 @@ def process_text_for_panes(panes: Iterable[PaneRow | PaneDetail]) -> dict[object
     by_pid = _descendant_text_for([getattr(row, "pane_pid", 0) for row in rows])
     out: dict[object, str] = dict(by_pid)
     for row in rows:
-        out[getattr(row, "pane_id", "")] = by_pid.get(getattr(row, "pane_pid", 0), "")
+        out[row.key] = by_pid.get(getattr(row, "pane_pid", 0), "")
     return out
 
 
-def print_windows() -> None:
-    windows = collect_windows()
-    panes = collect_pane_rows()
-    process_text = process_text_for_panes(panes)
-    for row in rank_windows(windows, panes, process_text):
+PANES_HEADER = "PANEID\tSESSION_ID\tWINDOW_ID\tSESSION\tWIN\tPANE\tTITLE\tCMD\tPATH"
+
+
+def _server_label(server: str) -> str:
+    return f"[{os.path.basename(server) or server}] " if server else ""
+
+
+def _server_field(server: str) -> str:
+    # Multi-server output appends the socket as the last field, so existing field numbers stay valid.
+    return f"\t{server}" if server else ""
+
+
+def render_windows(ranked: Ranked) -> list[str]:
+    lines: list[str] = []
+    for row in ranked.rows:
         zoom = "⛶" if row.zoomed else " "
         active = "▶" if row.active else " "
-        label = f"{getattr(row, 'mark', ' ')}{zoom}{active} {row.session_name}:{row.window_index}  {row.window_name}"
-        print(f"{row.session_name}:{row.window_index}\t{label}")
+        label = f"{ranked.info.get(row.key, NO_RANK).mark}{zoom}{active} {_server_label(row.server)}{row.session_name}:{row.window_index}  {row.window_name}"
+        lines.append(f"{row.session_name}:{row.window_index}\t{label}{_server_field(row.server)}")
+    return lines
 
 
-def print_sessions() -> None:
-    sessions = collect_sessions()
-    windows = collect_windows()
-    panes = collect_pane_rows()
-    process_text = process_text_for_panes(panes)
-    for row in rank_sessions(sessions, windows, panes, process_text):
-        print(f"{row.session_name}\t{getattr(row, 'mark', ' ')} {row.session_name}")
+def render_sessions(ranked: Ranked) -> list[str]:
+    return [
+        f"{row.session_name}\t{ranked.info.get(row.key, NO_RANK).mark} {_server_label(row.server)}{row.session_name}{_server_field(row.server)}"
+        for row in ranked.rows
+    ]
 
 
-def print_panes() -> None:
-    panes = collect_pane_details()
-    process_text = process_text_for_panes(panes)
-    ranked = rank_panes(panes, process_text, os.environ.get("ORIGIN_PANE_ID", ""))
-    print("PANEID\tSESSION_ID\tWINDOW_ID\tSESSION\tWIN\tPANE\tTITLE\tCMD\tPATH")
-    for row in ranked:
+def render_panes(ranked: Ranked) -> list[str]:
+    multi = any(row.server for row in ranked.rows)
+    lines = [f"{PANES_HEADER}\tSOCKET" if multi else PANES_HEADER]
+    for row in ranked.rows:
         zoom = "⛶" if row.window_zoomed else " "
         active = "▶" if row.window_active else " "
-        win = f"{getattr(row, 'mark', ' ')}{zoom}{active} {row.window_index}:{row.window_name}"
-        print(f"{row.pane_id}\t{row.session_id}\t{row.window_id}\t{row.session_name}\t{win}\t{row.pane_index}\t{row.title}\t{row.command}\t{row.path}")
+        win = f"{ranked.info.get(row.key, NO_RANK).mark}{zoom}{active} {row.window_index}:{row.window_name}"
+        lines.append(
+            f"{row.pane_id}\t{row.session_id}\t{row.window_id}\t{_server_label(row.server)}{row.session_name}\t{win}"
+            f"\t{row.pane_index}\t{row.title}\t{row.command}\t{row.path}{_server_field(row.server)}"
+        )
+    return lines
+
+
+def _text(lines: list[str]) -> str:
+    return "".join(f"{line}\n" for line in lines)
+
+
+RANK_FIELDS = ("kind", "bucket", "mark")
+_ROW_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def record_fields(row_type: type) -> tuple[str, ...]:
+    """Stable record keys for `--format=jsonl|nul`: the row's dataclass fields, then the rank fields."""
+    names = _ROW_FIELDS.get(row_type)
+    if names is None:
+        names = _ROW_FIELDS[row_type] = tuple(field.name for field in fields(row_type)) + RANK_FIELDS
+    return names
+
+
+def records(ranked: Ranked) -> Iterator[dict[str, object]]:
+    for row in ranked.rows:
+        info = ranked.info.get(row.key, NO_RANK)
+        record = {name: getattr(row, name) for name in record_fields(type(row))[: -len(RANK_FIELDS)]}
+        record.update(kind=info.kind, bucket=info.bucket, mark=info.mark)
+        yield record
+
+
+def _nul_value(value: object) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value).replace("\0", "").replace("\x1f", " ")
+
+
+def _nul_record(values: Iterable[str]) -> str:
+    # NUL-terminated records with \x1f between fields: `while IFS=$'\x1f' read -r -d '' ...` in bash.
+    return "\x1f".join(values) + "\0"
+
+
+Emit = Callable[[Ranked, bool], str]
+
+
+def _emitter(fmt: str, row_type: type, render: Callable[[Ranked], list[str]], header: bool = False) -> Emit:
+    """Serialize one phase of ranked rows; `first` is True for the phase that carries any header."""
+    if fmt == "jsonl":
+        return lambda ranked, first: "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records(ranked)
+        )
+    if fmt == "nul":
+        names = record_fields(row_type)
+
+        def nul(ranked: Ranked, first: bool) -> str:
+            out = [_nul_record(names)] if first else []
+            out.extend(_nul_record(_nul_value(record[name]) for name in names) for record in records(ranked))
+            return "".join(out)
+
+        return nul
+
+    def text(ranked: Ranked, first: bool) -> str:
+        lines = render(ranked)
+        return _text(lines if first or not header else lines[1:])
+
+    return text
+
+
+def _collect(servers: Sequence[str]) -> Snapshot:
+    return collect_servers(servers) if servers else collect_snapshot()
+
+
+def _classify(panes: Sequence[PaneRow | PaneDetail]) -> tuple[dict[object, str], dict[str, str]]:
+    PROFILE.count("panes", len(panes))
+    with PROFILE.phase("process_text"):
+        process_text = process_text_for_panes(panes)
+    with PROFILE.phase("classify"):
+        kinds = classify_panes(panes, process_text)
+    return process_text, kinds
+
+
+def rank(command: str, servers: Sequence[str] = ()) -> Ranked:
+    """Collect and rank `windows`, `sessions` or `panes` the way the CLI does, for importing callers.
+
+    `servers` are tmux sockets to merge (default: the current server only). `records(ranked)` turns
+    the rows into the dicts printed by `--format=jsonl`.
+    """
+    if command == "panes":
+        panes = collect_server_pane_details(servers) if servers else collect_pane_details()
+        process_text, kinds = _classify(panes)
+        return rank_panes(panes, process_text, os.environ.get("ORIGIN_PANE_ID", ""), kinds)
+    snapshot = _collect(servers)
+    process_text, kinds = _classify(snapshot.panes)
+    if command == "windows":
+        return rank_windows(snapshot.windows, snapshot.panes, process_text, kinds)
+    if command == "sessions":
+        return rank_sessions(snapshot.sessions, snapshot.windows, snapshot.panes, process_text, kinds)
+    raise ValueError(f"unknown ranking: {command}")
+
+
+def _write_phases(rows: list, info: dict[str, RankInfo], key: RankKey, top_k: int, emit: Emit) -> None:
+    # Flush after each phase so fzf can show the first screen while the rest is still being sorted
+    # (collection and classification are already done by now; only the sort is split).
+    phases = ranked_phases(rows, key, top_k)
+    first = True
+    while True:
+        with PROFILE.phase("rank"):
+            chunk = next(phases, None)
+        if chunk is None:
+            return
+        with PROFILE.phase("render"):
+            sys.stdout.write(emit(Ranked(chunk, info), first))
+            sys.stdout.flush()
+        first = False
+
+
+def print_windows(servers: Sequence[str] = (), top_k: int = 0, fmt: str = "text") -> None:
+    with PROFILE.phase("tmux"):
+        snapshot = _collect(servers)
+    process_text, kinds = _classify(snapshot.panes)
+    with PROFILE.phase("rank"):
+        info, key = _window_order(snapshot.windows, snapshot.panes, process_text, kinds)
+    _write_phases(snapshot.windows, info, key, top_k, _emitter(fmt, WindowRow, render_windows))
+
+
+def print_sessions(servers: Sequence[str] = (), fmt: str = "text") -> None:
+    with PROFILE.phase("tmux"):
+        snapshot = _collect(servers)
+    process_text, kinds = _classify(snapshot.panes)
+    with PROFILE.phase("rank"):
+        ranked = rank_sessions(snapshot.sessions, snapshot.windows, snapshot.panes, process_text, kinds)
+    with PROFILE.phase("render"):
+        sys.stdout.write(_emitter(fmt, SessionRow, render_sessions)(ranked, True))
+
+
+def print_panes(servers: Sequence[str] = (), top_k: int = 0, fmt: str = "text") -> None:
+    with PROFILE.phase("tmux"):
+        panes = collect_server_pane_details(servers) if servers else collect_pane_details()
+    process_text, kinds = _classify(panes)
+    with PROFILE.phase("rank"):
+        info, key = _pane_order(panes, process_text, kinds)
+    _write_phases(panes, info, key, top_k, _emitter(fmt, PaneDetail, render_panes, header=True))
+
+
+class RankState:
+    """Pre-ranked picker output held in memory by `serve`."""
+
+    def __init__(self, max_age: float) -> None:
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.windows = ""
+        self.sessions = ""
+        self.panes = Ranked([], {})
+        self.refreshed_at = 0.0
+        self.failures = 0
+
+    def refresh(self) -> bool:
+        global _CONTROL, PROFILE
+        with self.refresh_lock:
+            # One profile record per background refresh.
+            PROFILE = Profile(PROFILE.enabled)
+            # Same opt-in as the one-shot path: a resident control client is listed by `list-clients`.
+            if _CONTROL is None and _use_control_backend():
+                try:
+                    _CONTROL = TmuxControl()
+                except OSError:
+                    _CONTROL = None
+            try:
+                with PROFILE.phase("tmux"):
+                    snapshot = collect_snapshot()
+            except Exception:
+                self.failures += 1
+                return False
+            process_text, kinds = _classify(snapshot.panes)
+            with PROFILE.phase("rank"):
+                ranked_windows = rank_windows(snapshot.windows, snapshot.panes, process_text, kinds)
+                ranked_sessions = rank_sessions(snapshot.sessions, snapshot.windows, snapshot.panes, process_text, kinds)
+                panes = rank_panes(snapshot.details, process_text, pane_kinds=kinds)
+            with PROFILE.phase("render"):
+                windows = _text(render_windows(ranked_windows))
+                sessions = _text(render_sessions(ranked_sessions))
+            with self.lock:
+                self.windows, self.sessions, self.panes = windows, sessions, panes
+                self.refreshed_at = time.monotonic()
+            self.failures = 0
+            PROFILE.emit("refresh")
+            return True
+
+    def answer(self, request: str) -> str:
+        cmd, _, arg = request.partition("\t")
+        if cmd == "ping":
+            return ""
+        if cmd == "refresh":
+            self.wakeup.set()
+            return ""
+        if time.monotonic() - self.refreshed_at > self.max_age:
+            self.refresh()
+        with self.lock:
+            windows, sessions, panes = self.windows, self.sessions, self.panes
+        if cmd == "windows":
+            return windows
+        if cmd == "sessions":
+            return sessions
+        if cmd == "panes":
+            # Panes are ranked unfiltered; the popup exclusion is applied per request because the
+            # popup sets @fzf_exclude_window_id just before asking.
+            origin = arg.strip()
+            queries = [EXCLUDE_WINDOW_QUERY] if origin else [EXCLUDE_WINDOW_QUERY, ORIGIN_PANE_QUERY]
+            replies = _tmux_batch(queries)
+            if not origin:
+                origin = replies[1].strip()
+            return _text(render_panes(Ranked(_drop_excluded_window(panes.rows, replies[0].strip(), origin), panes.info)))
+        raise ValueError(f"unknown request: {cmd}")
+
+
+def _poll_loop(state: RankState, poll_seconds: float, stop: threading.Event) -> None:
+    while not stop.is_set():
+        state.wakeup.wait(poll_seconds)
+        state.wakeup.clear()
+        state.refresh()
+        if state.failures >= 3:
+            # The tmux server is gone; let the accept loop exit.
+            stop.set()
+
+
+def serve(poll_seconds: float) -> int:
+    global _PROC_INDEX
+    path = serve_socket_path()
+    if _daemon_request("ping") is not None:
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    if proc_table.ProcessIndex.supported():
+        _PROC_INDEX = proc_table.ProcessIndex()
+    state = RankState(max_age=max(poll_seconds * 2, 1.0))
+    state.refresh()
+    stop = threading.Event()
+    threading.Thread(target=_poll_loop, args=(state, poll_seconds, stop), daemon=True).start()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(16)
+    server.settimeout(0.5)
+    try:
+        while not stop.is_set():
+            try:
+                conn, _addr = server.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.settimeout(1.0)
+                try:
+                    raw = b""
+                    while not raw.endswith(b"\n"):
+                        chunk = conn.recv(4096)
+                        if not chunk:
+                            break
+                        raw += chunk
+                    request = raw.decode("utf-8", "replace").strip()
+                    if request == "stop":
+                        stop.set()
+                        conn.sendall(b"ok\n")
+                        continue
+                    try:
+                        reply = "ok\n" + state.answer(request)
+                    except Exception as exc:
+                        reply = f"error {exc}\n"
+                    conn.sendall(reply.encode("utf-8"))
+                except OSError:
+                    continue
+    finally:
+        server.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        if _CONTROL is not None:
+            _CONTROL.close()
+    return 0
 
 
 def main(argv: list[str]) -> int:
-    if len(argv) < 2:
-        print("usage: activity_rank.py windows|sessions|panes", file=sys.stderr)
-        return 2
-    cmd = argv[1]
+    ap = argparse.ArgumentParser(prog="activity_rank.py")
+    ap.add_argument("command", choices=["windows", "sessions", "panes", "serve", "refresh", "stop"])
+    ap.add_argument(
+        "--poll",
+        type=float,
+        default=float(os.environ.get("TMUX_ACTIVITY_POLL_SECONDS", "2.0")),
+        help="serve: seconds between background refreshes",
+    )
+    ap.add_argument(
+        "--socket",
+        action="append",
+        default=[],
+        help="rank across this tmux socket too (repeatable; default: $TMUX_ACTIVITY_SOCKETS)",
+    )
+    ap.add_argument(
+        "--top",
+        type=int,
+        default=_as_int(os.environ.get("TMUX_ACTIVITY_TOP_K")),
+        metavar="K",
+        help="windows/panes: print the best K rows first, then the rest (0 = one full sort)",
+    )
+    ap.add_argument(
+        "--format",
+        choices=["text", "jsonl", "nul"],
+        default="text",
+        help="text: fzf lines; jsonl: one JSON object per row; nul: \\x1f-separated fields, NUL-terminated records",
+    )
+    ap.add_argument(
+        "--profile",
+        action="store_true",
+        help="report per-phase wall time and counts (stderr + run/activity_rank/profile.jsonl)",
+    )
+    args = ap.parse_args(argv[1:])
+    cmd = args.command
+    if args.profile:
+        PROFILE.enabled = True
+    if cmd == "serve":
+        return serve(max(0.2, args.poll))
+    if cmd in ("refresh", "stop"):
+        _daemon_request(cmd)
+        return 0
+
+    servers = activity_servers(args.socket)
+    # The daemon ranks one server into fzf text; multi-server and structured output are collected on demand.
+    if not servers and args.format == "text" and os.environ.get("TMUX_ACTIVITY_DAEMON", "1").strip() != "0":
+        request = f"panes\t{os.environ.get('ORIGIN_PANE_ID', '').strip()}" if cmd == "panes" else cmd
+        with PROFILE.phase("daemon"):
+            reply = _daemon_request(request)
+        if reply is not None:
+            sys.stdout.write(reply)
+            PROFILE.emit(cmd)
+            return 0
+
+    PROFILE.count("servers", len(servers) or 1)
     if cmd == "windows":
-        print_windows()
+        print_windows(servers, args.top, args.format)
     elif cmd == "sessions":
-        print_sessions()
-    elif cmd == "panes":
-        print_panes()
+        print_sessions(servers, args.format)
     else:
-        print(f"unknown command: {cmd}", file=sys.stderr)
-        return 2
+        print_panes(servers, args.top, args.format)
+    PROFILE.emit(cmd)
     return 0
 
 
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Thin picker entry point for `activity_rank.py`: ask the `serve` daemon first.
+
+A daemon answer is one Unix-socket round-trip, so this module only imports what that needs
+(importing activity_rank itself costs several times the interpreter startup). When the
+daemon is off, not running, or the request uses options it does not serve (`--socket`,
+`--format`, `--profile`, `TMUX_ACTIVITY_SOCKETS`), it runs activity_rank's one-shot ranking
+in the same interpreter.
+
+Usage: activity_rank_client.py windows|sessions|panes [--top K]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import socket
+import sys
+
+
+COMMANDS = ("windows", "sessions", "panes")
+
+
+def serve_socket_path() -> str:
+    override = os.environ.get("TMUX_ACTIVITY_SERVE_SOCKET", "").strip()
+    if override:
+        return os.path.expanduser(override)
+    server = (
+        os.environ.get("OUTER_TMUX_SOCKET")
+        or os.environ.get("TMUX_ACTIVITY_SOCKET")
+        or os.environ.get("TMUX", "").partition(",")[0]
+        or "default"
+    )
+    key = hashlib.sha1(server.encode("utf-8")).hexdigest()[:12]
+    return os.path.expanduser(f"~/.config/tmux/run/activity_rank/{key}.sock")
+
+
+def daemon_request(request: str, timeout: float = 1.0) -> str | None:
+    """Ask a running `serve` daemon; None means no daemon (or a broken one), so run one-shot."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(serve_socket_path())
+            sock.sendall(f"{request}\n".encode("utf-8"))
+            sock.shutdown(socket.SHUT_WR)
+            chunks: list[bytes] = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None
+    status, _, payload = b"".join(chunks).decode("utf-8", "replace").partition("\n")
+    return payload if status == "ok" else None
+
+
+def daemon_request_for(argv: list[str]) -> str | None:
+    """The daemon request answering `argv`, or None when only the one-shot path can."""
+    if os.environ.get("TMUX_ACTIVITY_DAEMON", "1").strip() == "0":
+        return None
+    if os.environ.get("TMUX_ACTIVITY_PROFILE", "").strip().lower() in {"1", "on", "true", "yes"}:
+        return None
+    if any(part.strip() for part in os.environ.get("TMUX_ACTIVITY_SOCKETS", "").split(os.pathsep)):
+        return None
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        return None
+    rest = argv[2:]
+    # `--top` only changes how the one-shot path streams rows; the daemon output is already complete.
+    while rest:
+        if rest[0] == "--top" and len(rest) >= 2:
+            rest = rest[2:]
+        elif rest[0].startswith("--top="):
+            rest = rest[1:]
+        else:
+            return None
+    if argv[1] == "panes":
+        return f"panes\t{os.environ.get('ORIGIN_PANE_ID', '').strip()}"
+    return argv[1]
+
+
+def main(argv: list[str]) -> int:
+    request = daemon_request_for(argv)
+    if request is not None:
+        reply = daemon_request(request)
+        if reply is not None:
+            sys.stdout.write(reply)
+            return 0
+        # Already asked: do not make the one-shot path wait on the daemon again.
+        os.environ["TMUX_ACTIVITY_DAEMON"] = "0"
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import activity_rank
+
+    return activity_rank.main([os.path.join(os.path.dirname(argv[0]), "activity_rank.py"), *argv[1:]])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
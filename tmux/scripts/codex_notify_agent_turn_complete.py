@@ -1,26 +1,102 @@
 #!/usr/bin/env python3
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import redirect_stderr, redirect_stdout
+import importlib
+import io
+import json
 import os
 import subprocess
 import sys
+import threading
+import time
+from typing import Any
 
 
-SUBHANDLER_TIMEOUT_SECONDS = float(os.environ.get("CODEX_NOTIFY_SUBHANDLER_TIMEOUT_SECONDS", "2.0"))
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+SUBHANDLER_TIMEOUT_SECONDS = _env_float("CODEX_NOTIFY_SUBHANDLER_TIMEOUT_SECONDS", 2.0)
+# Module name and deadline (seconds after dispatch starts) of every subhandler.
+HANDLERS = (
+    ("codex_notify_handler", _env_float("CODEX_NOTIFY_HANDLER_TIMEOUT_SECONDS", SUBHANDLER_TIMEOUT_SECONDS)),
+    ("codex_notify_tmux_autorun", _env_float("CODEX_TMUX_AUTORUN_TIMEOUT_SECONDS", SUBHANDLER_TIMEOUT_SECONDS)),
+)
+# How long a missed deadline still waits for a notification batch that is mid-delivery: the
+# spool drainer holds other panes' events, so it must not be killed halfway through one.
+DRAIN_GRACE_SECONDS = _env_float("CODEX_NOTIFY_DRAIN_GRACE_SECONDS", 1.0)
+# 1: run every subhandler in its own interpreter (the old behaviour) so a crash or hang in
+# one cannot touch the other.
+ISOLATE = os.environ.get("CODEX_NOTIFY_ISOLATE", "").strip() == "1"
+
+
+class _Discard(io.TextIOBase):
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def _start_in_process(name: str, payload: Any) -> Future:
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            module = importlib.import_module(name)
+            future.set_result(module.handle(payload))
+        except BaseException as exc:
+            future.set_exception(exc)
 
+    # Daemon thread: a subhandler that overruns its deadline must not keep the process alive.
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
 
-def _run(handler: str, payload_json: str) -> None:
+
+def _start_subprocess(name: str, payload_json: str) -> subprocess.Popen | None:
+    handler = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{name}.py")
     if not os.path.isfile(handler):
-        return
-    python = sys.executable or "python3"
+        return None
     try:
-        subprocess.run(
-            [python, handler, payload_json],
-            check=False,
+        return subprocess.Popen(
+            [sys.executable or "python3", handler, payload_json],
+            stdin=subprocess.DEVNULL,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
-            timeout=SUBHANDLER_TIMEOUT_SECONDS,
         )
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return
+    except OSError:
+        return None
+
+
+def _dispatch_in_process(payload: Any) -> bool:
+    """Run every subhandler on its own thread; True once all of them finished in time."""
+    started = time.monotonic()
+    futures = [(_start_in_process(name, payload), deadline) for name, deadline in HANDLERS]
+    finished = True
+    for future, deadline in futures:
+        try:
+            future.result(timeout=max(0.0, started + deadline - time.monotonic()))
+        except FutureTimeoutError:
+            finished = False
+        except Exception:
+            continue
+    return finished
+
+
+def _dispatch_subprocess(payload_json: str) -> None:
+    started = time.monotonic()
+    procs = [(_start_subprocess(name, payload_json), deadline) for name, deadline in HANDLERS]
+    for proc, deadline in procs:
+        if proc is None:
+            continue
+        try:
+            proc.wait(timeout=max(0.0, started + deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
 
 
 def main(argv: list[str]) -> int:
@@ -28,10 +104,27 @@ def main(argv: list[str]) -> int:
         return 0
 
     payload_json = argv[1]
-    script_dir = os.path.dirname(__file__)
+    if ISOLATE:
+        _dispatch_subprocess(payload_json)
+        return 0
 
-    _run(os.path.join(script_dir, "codex_notify_handler.py"), payload_json)
-    _run(os.path.join(script_dir, "codex_notify_tmux_autorun.py"), payload_json)
+    try:
+        payload: Any = json.loads(payload_json)
+    except Exception:
+        return 0
+    # Subhandlers used to run with stdout/stderr on /dev/null; keep their prints and tracebacks
+    # off Codex's notify pipes. sys.stdout is process-wide, so this covers the whole fan-out
+    # (and the exit below) rather than each handle() call: a per-thread redirect would put the
+    # real stream back while a sibling is still running.
+    with redirect_stdout(_Discard()), redirect_stderr(_Discard()):
+        if not _dispatch_in_process(payload):
+            # A subhandler missed its deadline: leave without waiting on its threads, the way the
+            # subprocess timeout used to kill it, but let a batch the spool drainer has already
+            # claimed finish first, and hand what is still spooled to a detached drainer.
+            notify_spool = sys.modules.get("notify_spool")
+            if notify_spool is not None:
+                notify_spool.stop_draining(DRAIN_GRACE_SECONDS)
+            os._exit(0)
     return 0
 
 
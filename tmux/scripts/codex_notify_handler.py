@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
+from concurrent.futures import Future
 import json
 import os
 import shlex
 import shutil
 import subprocess
 import sys
+import threading
 import time
-from typing import Any
+from typing import Any, Callable
+
+import git_meta
+import notify_reaper
+import notify_spool
+import turn_markers
 
 
 def _env_int(name: str, default: int) -> int:
@@ -19,15 +26,38 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
 MAX_MESSAGE_CHARS = max(0, _env_int("CODEX_NOTIFY_MAX_MESSAGE_CHARS", 400))
-GIT_TIMEOUT_SECONDS = 1.0
 TMUX_TIMEOUT_SECONDS = 1.0
 OSASCRIPT_TIMEOUT_SECONDS = 0.8
+TERMINAL_NOTIFIER_TIMEOUT_SECONDS = 1.0
+# All probes share one deadline, kept below the parent's CODEX_NOTIFY_SUBHANDLER_TIMEOUT_SECONDS (2.0)
+# so the notification still goes out when git or osascript is slow.
+PROBE_DEADLINE_SECONDS = max(0.0, _env_float("CODEX_NOTIFY_PROBE_DEADLINE_SECONDS", 1.2))
 ITERM2_BUNDLE_ID = "com.googlecode.iterm2"
 ON_CLICK_SCRIPT = os.path.join(os.path.dirname(__file__), "codex_notify_on_click.py")
 TMUX_TURN_COMPLETE_DIR = os.path.expanduser(
     os.environ.get("CODEX_TMUX_TURN_COMPLETE_DIR", "~/.config/tmux/run/codex-turn-complete")
 )
+# Turn-completes are spooled and delivered in batches: whichever handler takes the drain
+# lock waits for the rest of a burst (until the spool has been quiet for COALESCE_QUIET_SECONDS,
+# at most COALESCE_SECONDS), then sends one notification for all of them.
+NOTIFY_SPOOL_DIR = os.path.expanduser(os.environ.get("CODEX_NOTIFY_SPOOL_DIR", "~/.config/tmux/run/codex-notify/spool"))
+NOTIFY_BATCH_LOG = os.path.join(os.path.dirname(NOTIFY_SPOOL_DIR), "batches.jsonl")
+COALESCE_SECONDS = max(0, _env_int("CODEX_NOTIFY_COALESCE_MS", 250)) / 1000.0
+COALESCE_QUIET_SECONDS = max(0, _env_int("CODEX_NOTIFY_COALESCE_QUIET_MS", 50)) / 1000.0
+# The drainer starts no batch later than this after the handler started, kept below the
+# parent's subhandler deadline (2.0) so a batch is not cut off mid-delivery.
+DRAIN_DEADLINE_SECONDS = max(0.0, _env_float("CODEX_NOTIFY_DRAIN_DEADLINE_SECONDS", 1.5))
 
 
 def _default_sender_bundle_id() -> str | None:
@@ -175,61 +205,137 @@ def _frontmost_bundle_id() -> str | None:
     return value or None
 
 
-def _tmux_pane_is_active_in_any_client(tmux_bin: str, socket: str | None, pane_id: str) -> bool:
+class Probes:
+    """Independent probes started together, one thread each, and awaited under one deadline.
+
+    A probe that has not finished by the deadline (or raised) yields its default. Its thread
+    is a daemon thread, so the process exits without joining a probe that is still running.
+    """
+
+    def __init__(self, deadline_seconds: float) -> None:
+        self.deadline = time.monotonic() + deadline_seconds
+        self.futures: dict[str, Future] = {}
+
+    def start(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        future: Future = Future()
+
+        def run() -> None:
+            try:
+                future.set_result(fn(*args))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, name=f"codex-notify-probe-{name}", daemon=True).start()
+        self.futures[name] = future
+
+    def get(self, name: str, default: Any = None) -> Any:
+        future = self.futures.get(name)
+        if future is None:
+            return default
+        try:
+            return future.result(timeout=max(0.0, self.deadline - time.monotonic()))
+        except Exception:
+            return default
+
+
+PANE_KEYS = ("pane_id", "session_id", "window_id", "pid", "session_name", "window_name")
+PANE_FORMAT = "\t".join(f"#{{{key}}}" for key in PANE_KEYS)
+CLIENT_FORMAT = "#{client_name}\t#{client_tty}\t#{pane_id}\t#{client_flags}"
+
+
+class TmuxContext:
+    """What the handler needs from tmux, fetched once per notification and shared by every phase.
+
+    All pane/session/window fields and the server pid come from one `display-message -p`;
+    every client question is answered from one `list-clients`. Both queries run lazily.
+    Control-mode clients (e.g. the activity_rank daemon) are not user-visible and are skipped.
+    """
+
+    def __init__(self, tmux_bin: str, socket: str | None, pane_id: str) -> None:
+        self.tmux_bin = tmux_bin
+        self.socket = socket
+        self.target = pane_id
+        self._pane: dict[str, str] | None = None
+        self._clients: list[tuple[str, str, str, set[str]]] | None = None
+        self._probes: Probes | None = None
+
+    @classmethod
+    def from_env(cls) -> "TmuxContext | None":
+        tmux_bin = _find_tmux()
+        if not tmux_bin:
+            return None
+        return cls(tmux_bin, _tmux_socket_from_env(), os.environ.get("TMUX_PANE", "").strip())
+
+    def prefetch(self, probes: Probes) -> None:
+        """Run both queries as probes; later reads wait for them up to the probe deadline."""
+        self._probes = probes
+        probes.start("tmux-pane", self._query_pane)
+        probes.start("tmux-clients", self._query_clients)
+
+    def _query_pane(self) -> dict[str, str]:
+        out = _tmux_display(self.tmux_bin, self.socket, PANE_FORMAT, target=self.target or None) or ""
+        if not out:
+            return {}
+        parts = out.split("\t", len(PANE_KEYS) - 1)
+        # display-message strips trailing whitespace, so an empty window name drops its tab.
+        parts += [""] * (len(PANE_KEYS) - len(parts))
+        return dict(zip(PANE_KEYS, (part.strip() for part in parts)))
+
+    def _query_clients(self) -> list[tuple[str, str, str, set[str]]]:
+        out = _tmux_capture(self.tmux_bin, self.socket, ["list-clients", "-F", CLIENT_FORMAT]) or ""
+        clients: list[tuple[str, str, str, set[str]]] = []
+        for line in out.splitlines():
+            parts = line.split("\t")
+            if len(parts) != 4:
+                continue
+            client_name, client_tty, client_pane_id, client_flags = (part.strip() for part in parts)
+            flag_set = {part.strip() for part in client_flags.split(",") if part.strip()}
+            if not client_name or "control-mode" in flag_set:
+                continue
+            clients.append((client_name, client_tty, client_pane_id, flag_set))
+        return clients
+
+    def value(self, key: str) -> str:
+        if self._pane is None:
+            self._pane = self._probes.get("tmux-pane", {}) if self._probes else self._query_pane()
+        return self._pane.get(key, "")
+
+    @property
+    def pane_id(self) -> str:
+        return self.target or self.value("pane_id")
+
+    def clients(self) -> list[tuple[str, str, str, set[str]]]:
+        """(client_name, client_tty, pane_id, flags) of every attached, non-control client."""
+        if self._clients is None:
+            self._clients = self._probes.get("tmux-clients", []) if self._probes else self._query_clients()
+        return self._clients
+
+
+def _tmux_pane_is_active_in_any_client(tmux: TmuxContext, pane_id: str) -> bool:
     if not pane_id:
         return False
-    out = _tmux_capture(tmux_bin, socket, ["list-clients", "-F", "#{pane_id}"])
-    if not out:
-        return False
-    for line in out.splitlines():
-        if line.strip() == pane_id:
-            return True
-    return False
+    return any(client_pane_id == pane_id for _name, _tty, client_pane_id, _flags in tmux.clients())
 
 
-def _tmux_pane_is_focused_in_any_client(tmux_bin: str, socket: str | None, pane_id: str) -> bool:
+def _tmux_pane_is_focused_in_any_client(tmux: TmuxContext, pane_id: str) -> bool:
     if not pane_id:
         return False
-    out = _tmux_capture(tmux_bin, socket, ["list-clients", "-F", "#{client_flags}\t#{pane_id}"])
-    if not out:
-        return False
-    for line in out.splitlines():
-        if "\t" in line:
-            flags, client_pane_id = line.split("\t", 1)
-        else:
-            flags, client_pane_id = "", line
-        if client_pane_id.strip() != pane_id:
-            continue
-        flag_set = {part.strip() for part in flags.split(",") if part.strip()}
-        if "focused" in flag_set:
-            return True
-    return False
+    return any(client_pane_id == pane_id and "focused" in flags for _name, _tty, client_pane_id, flags in tmux.clients())
 
 
-def _tmux_client_count(tmux_bin: str, socket: str | None) -> int:
-    out = _tmux_capture(tmux_bin, socket, ["list-clients", "-F", "#{client_name}"])
-    if not out:
-        return 0
-    return sum(1 for line in out.splitlines() if line.strip())
+def _tmux_client_count(tmux: TmuxContext) -> int:
+    return len(tmux.clients())
 
 
-def _tmux_client_for_pane(tmux_bin: str, socket: str | None, pane_id: str) -> tuple[str | None, str | None]:
+def _tmux_client_for_pane(tmux: TmuxContext, pane_id: str) -> tuple[str | None, str | None]:
     if not pane_id:
         return None, None
-    out = _tmux_capture(tmux_bin, socket, ["list-clients", "-F", "#{client_name}\t#{client_tty}\t#{pane_id}\t#{client_flags}"])
-    if not out:
-        return None, None
 
     matches: list[tuple[bool, str, str | None]] = []
-    for line in out.splitlines():
-        parts = line.split("\t")
-        if len(parts) != 4:
+    for client_name, client_tty, client_pane_id, flags in tmux.clients():
+        if client_pane_id != pane_id:
             continue
-        client_name, client_tty, client_pane_id, client_flags = (part.strip() for part in parts)
-        if not client_name or client_pane_id != pane_id:
-            continue
-        flag_set = {part.strip() for part in client_flags.split(",") if part.strip()}
-        matches.append(("focused" in flag_set, client_name, client_tty or None))
+        matches.append(("focused" in flags, client_name, client_tty or None))
 
     if not matches:
         return None, None
@@ -242,148 +348,72 @@ def _tmux_client_for_pane(tmux_bin: str, socket: str | None, pane_id: str) -> tu
     return None, None
 
 
-def _safe_filename(value: str) -> str:
-    value = (value or "").strip()
-    if not value:
-        return "unknown"
-    value = value.replace("/", "_").replace(":", "_")
-    while ".." in value:
-        value = value.replace("..", "__")
-    return value
-
-
-def _write_turn_complete_marker(*, thread_id: str, turn_id: str, cwd: str, title: str, message: str) -> None:
+def _turn_complete_marker(
+    *, thread_id: str, turn_id: str, cwd: str, title: str, message: str, tmux: TmuxContext | None
+) -> dict[str, Any] | None:
     pane_id = os.environ.get("TMUX_PANE", "").strip()
     if not pane_id:
-        return
-
-    tmux_bin = _find_tmux()
-    if not tmux_bin:
-        return
-
-    socket = _tmux_socket_from_env()
-    if _tmux_pane_is_focused_in_any_client(tmux_bin, socket, pane_id):
-        return
+        return None
 
-    window_id = _tmux_display(tmux_bin, socket, "#{window_id}", target=pane_id) or ""
-    server_pid = _tmux_display(tmux_bin, socket, "#{pid}") or ""
+    if tmux is None:
+        return None
 
-    try:
-        os.makedirs(TMUX_TURN_COMPLETE_DIR, exist_ok=True)
-    except Exception:
-        return
+    if _tmux_pane_is_focused_in_any_client(tmux, pane_id):
+        return None
 
-    path = os.path.join(TMUX_TURN_COMPLETE_DIR, _safe_filename(pane_id))
-    tmp_path = f"{path}.tmp"
-    payload = {
+    return {
         "type": "agent-turn-complete",
         "thread-id": thread_id,
         "turn-id": turn_id,
         "cwd": cwd,
         "title": title,
         "message": message,
-        "tmux-server-pid": server_pid,
+        "tmux-server-pid": tmux.value("pid"),
         "pane-id": pane_id,
-        "window-id": window_id,
+        "window-id": tmux.value("window_id"),
         "created-at": int(time.time()),
     }
+
+
+def _write_turn_complete_markers(events: list[dict[str, Any]]) -> None:
+    """One marker transaction for the batch, then one chained `set-window-option` per tmux server."""
+    marked = [event for event in events if isinstance(event.get("marker"), dict)]
+    if not marked:
+        return
     try:
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False)
-        os.replace(tmp_path, path)
+        with turn_markers.MarkerStore(TMUX_TURN_COMPLETE_DIR) as store:
+            store.add_many(event["marker"] for event in marked)
     except Exception:
-        try:
-            os.unlink(tmp_path)
-        except OSError:
-            pass
         return
 
-    if window_id:
-        _tmux_ok(tmux_bin, socket, ["set-window-option", "-t", window_id, "@codex_done", "1"])
-
-
-def _gc_turn_complete_markers(*, current_server_pid: str) -> None:
-    if not current_server_pid:
+    windows: dict[tuple[str, str], list[str]] = {}
+    for event in marked:
+        tmux_bin, socket = event.get("tmux") or ("", "")
+        window_id = event["marker"].get("window-id")
+        if tmux_bin and window_id and window_id not in windows.setdefault((tmux_bin, socket), []):
+            windows[(tmux_bin, socket)].append(window_id)
+    for (tmux_bin, socket), window_ids in windows.items():
+        args: list[str] = []
+        for window_id in window_ids:
+            if args:
+                args.append(";")
+            args.extend(["set-window-option", "-t", window_id, "@codex_done", "1"])
+        _tmux_ok(tmux_bin, socket or None, args)
+
+
+def _gc_turn_complete_markers(*, current_server_pid: str, tmux: TmuxContext | None) -> None:
+    # Rate limited and incremental: a no-op when a step ran within the GC interval,
+    # otherwise one bounded batch (list-panes only runs when the step does).
+    if tmux is None:
         return
-    ttl_raw = os.environ.get("CODEX_TMUX_TURN_COMPLETE_TTL_SECONDS", "").strip()
-    ttl_seconds = 0
-    if ttl_raw:
-        try:
-            ttl_seconds = int(float(ttl_raw))
-        except ValueError:
-            ttl_seconds = 0
-    if ttl_seconds < 0:
-        ttl_seconds = 0
-
-    tmux_bin = _find_tmux()
-    socket = _tmux_socket_from_env()
-    pane_ids: set[str] | None = None
-    if tmux_bin:
-        out = _tmux_capture(tmux_bin, socket, ["list-panes", "-a", "-F", "#{pane_id}"])
-        if out:
-            pane_ids = {line.strip() for line in out.splitlines() if line.strip()}
-
     try:
-        entries = os.listdir(TMUX_TURN_COMPLETE_DIR)
+        turn_markers.run_gc(
+            current_server_pid=current_server_pid,
+            list_panes=lambda: _tmux_capture(tmux.tmux_bin, tmux.socket, ["list-panes", "-a", "-F", "#{pane_id}"]),
+            directory=TMUX_TURN_COMPLETE_DIR,
+        )
     except Exception:
         return
-    count = 0
-    for name in entries:
-        if not name or name.startswith("."):
-            continue
-        path = os.path.join(TMUX_TURN_COMPLETE_DIR, name)
-        if not os.path.isfile(path):
-            continue
-
-        # Best-effort: derive a pane_id candidate from the filename.
-        pane_id_from_name = name if name.startswith("%") else ""
-
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = None
-
-        # If the marker points to a pane that no longer exists, we can safely delete it.
-        if pane_ids is not None and pane_id_from_name and pane_id_from_name not in pane_ids:
-            try:
-                os.unlink(path)
-            except OSError:
-                pass
-            continue
-
-        if isinstance(data, dict):
-            marker_server_pid = data.get("tmux-server-pid")
-            if isinstance(marker_server_pid, str) and marker_server_pid and marker_server_pid != current_server_pid:
-                try:
-                    os.unlink(path)
-                except OSError:
-                    pass
-                continue
-
-            if ttl_seconds > 0:
-                created_at = data.get("created-at")
-                if not isinstance(created_at, int):
-                    created_at = 0
-                if created_at > 0 and (time.time() - float(created_at)) > float(ttl_seconds):
-                    try:
-                        os.unlink(path)
-                    except OSError:
-                        pass
-                    continue
-        elif ttl_seconds > 0:
-            # Unknown marker format: fall back to file mtime TTL.
-            try:
-                st = os.stat(path)
-                if (time.time() - float(st.st_mtime)) > float(ttl_seconds):
-                    os.unlink(path)
-                    continue
-            except OSError:
-                pass
-
-        count += 1
-        if count >= 200:
-            break
 
 
 def _schedule_terminal_notifier_remove(terminal_notifier: str, group: str, delay_seconds: float) -> None:
@@ -391,43 +421,50 @@ def _schedule_terminal_notifier_remove(terminal_notifier: str, group: str, delay
         delay = max(0.0, float(delay_seconds))
     except Exception:
         delay = 4.0
+    if notify_reaper.schedule(group, delay, terminal_notifier):
+        return
+    # No reaper could be started: fall back to one sleeping shell for this notification.
     cmd = f"sleep {delay}; {shlex.quote(terminal_notifier)} -remove {shlex.quote(group)} >/dev/null 2>&1 || true"
     subprocess.Popen(
-        ["bash", "-lc", cmd],
+        ["sh", "-c", cmd],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
         start_new_session=True,
     )
 
 
-def _maybe_auto_remove_notification_if_visible(terminal_notifier: str, group: str | None) -> None:
+def _auto_remove_enabled() -> bool:
+    enabled = os.environ.get("CODEX_NOTIFY_AUTO_REMOVE_IF_VISIBLE", "1").strip()
+    return enabled not in ("0", "false", "FALSE", "off", "OFF", "no", "NO")
+
+
+def _pane_is_visible(tmux: TmuxContext | None, probes: Probes | None = None) -> bool:
+    """Whether this pane is on screen right now, so its notification can be auto-removed."""
     if sys.platform != "darwin":
-        return
-    if not terminal_notifier:
-        return
-    if not group:
-        return
+        return False
 
-    enabled = os.environ.get("CODEX_NOTIFY_AUTO_REMOVE_IF_VISIBLE", "1").strip()
-    if enabled in ("0", "false", "FALSE", "off", "OFF", "no", "NO"):
-        return
+    if not _auto_remove_enabled():
+        return False
 
-    if _frontmost_bundle_id() != ITERM2_BUNDLE_ID:
-        return
+    frontmost = probes.get("frontmost") if probes is not None else _frontmost_bundle_id()
+    if frontmost != ITERM2_BUNDLE_ID:
+        return False
 
     pane_id = os.environ.get("TMUX_PANE", "").strip()
     if not pane_id:
-        return
+        return False
 
-    tmux_bin = _find_tmux()
-    if not tmux_bin:
-        return
-    socket = _tmux_socket_from_env()
+    if tmux is None:
+        return False
     # Be conservative when multiple tmux clients are attached: "active in any client"
     # is not equivalent to "visible to the user right now".
-    if _tmux_client_count(tmux_bin, socket) != 1:
-        return
-    if not _tmux_pane_is_active_in_any_client(tmux_bin, socket, pane_id):
+    if _tmux_client_count(tmux) != 1:
+        return False
+    return _tmux_pane_is_active_in_any_client(tmux, pane_id)
+
+
+def _maybe_auto_remove_notification_if_visible(terminal_notifier: str, group: str | None, visible: bool) -> None:
+    if not terminal_notifier or not group or not visible:
         return
 
     try:
@@ -437,7 +474,7 @@ def _maybe_auto_remove_notification_if_visible(terminal_notifier: str, group: st
     _schedule_terminal_notifier_remove(terminal_notifier, group, delay_seconds)
 
 
-def _default_on_click_command(*, cwd: str, title: str) -> str | None:
+def _default_on_click_command(*, cwd: str, title: str, tmux: TmuxContext | None) -> str | None:
     # Allow manual override (useful for custom routing).
     override = os.environ.get("CODEX_NOTIFY_ON_CLICK", "").strip()
     if override:
@@ -446,28 +483,28 @@ def _default_on_click_command(*, cwd: str, title: str) -> str | None:
     if not os.environ.get("TMUX") and not os.environ.get("TMUX_PANE"):
         return None
 
-    tmux_bin = _find_tmux()
-    if not tmux_bin:
+    if tmux is None:
         return None
 
     if not os.path.isfile(ON_CLICK_SCRIPT):
         return None
 
-    socket = _tmux_socket_from_env()
-    pane_id = os.environ.get("TMUX_PANE", "").strip() or _tmux_display(tmux_bin, socket, "#{pane_id}")
+    socket = tmux.socket
+    pane_id = tmux.pane_id
     if not pane_id:
         return None
 
-    session_id = _tmux_display(tmux_bin, socket, "#{session_id}", target=pane_id)
-    session_name = _tmux_display(tmux_bin, socket, "#{session_name}", target=pane_id)
-    window_id = _tmux_display(tmux_bin, socket, "#{window_id}", target=pane_id)
-    window_name = _tmux_display(tmux_bin, socket, "#{window_name}", target=pane_id)
-    client_name, client_tty = _tmux_client_for_pane(tmux_bin, socket, pane_id)
-    if (not client_name or not client_tty) and _tmux_client_count(tmux_bin, socket) == 1:
-        client_name = client_name or _tmux_display(tmux_bin, socket, "#{client_name}")
-        client_tty = client_tty or _tmux_display(tmux_bin, socket, "#{client_tty}")
-
-    argv: list[str] = [sys.executable or "python3", ON_CLICK_SCRIPT, "--tmux-bin", tmux_bin]
+    session_id = tmux.value("session_id")
+    session_name = tmux.value("session_name")
+    window_id = tmux.value("window_id")
+    window_name = tmux.value("window_name")
+    client_name, client_tty = _tmux_client_for_pane(tmux, pane_id)
+    if (not client_name or not client_tty) and _tmux_client_count(tmux) == 1:
+        only_name, only_tty, _pane_id, _flags = tmux.clients()[0]
+        client_name = client_name or only_name or None
+        client_tty = client_tty or only_tty or None
+
+    argv: list[str] = [sys.executable or "python3", ON_CLICK_SCRIPT, "--tmux-bin", tmux.tmux_bin]
     if client_name:
         argv.extend(["--client", client_name])
     if client_tty:
@@ -491,7 +528,9 @@ def _default_on_click_command(*, cwd: str, title: str) -> str | None:
     return _shell_join(argv)
 
 
-def _notify_macos(title: str, message: str, *, group: str | None = None, cwd: str | None = None) -> None:
+def _notify_macos(
+    title: str, message: str, *, group: str | None = None, on_click: str | None = None, visible: bool = False
+) -> None:
     if sys.platform != "darwin":
         return
     if not title:
@@ -508,17 +547,20 @@ def _notify_macos(title: str, message: str, *, group: str | None = None, cwd: st
         if group:
             cmd.extend(["-group", group])
 
-        on_click = _default_on_click_command(cwd=cwd or "", title=title)
         if on_click:
             cmd.extend(["-execute", on_click])
 
-        subprocess.run(
-            cmd,
-            check=False,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        _maybe_auto_remove_notification_if_visible(terminal_notifier, group)
+        try:
+            subprocess.run(
+                cmd,
+                check=False,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=TERMINAL_NOTIFIER_TIMEOUT_SECONDS,
+            )
+        except subprocess.TimeoutExpired:
+            pass
+        _maybe_auto_remove_notification_if_visible(terminal_notifier, group, visible)
         return
 
     applescript = (
@@ -534,73 +576,109 @@ def _notify_macos(title: str, message: str, *, group: str | None = None, cwd: st
     )
 
 
-def _git_repo_root(cwd: str) -> str | None:
-    if not cwd or not os.path.isdir(cwd):
-        return None
-    try:
-        result = subprocess.run(
-            ["git", "-C", cwd, "rev-parse", "--show-toplevel"],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            text=True,
-            timeout=GIT_TIMEOUT_SECONDS,
+def _deliver_batch(events: list[dict[str, Any]]) -> None:
+    """Markers, window flags, one notification and one GC step for a batch of turn-completes."""
+    _write_turn_complete_markers(events)
+
+    latest = events[-1]
+    if len(events) == 1:
+        title, message = latest.get("title") or "Codex", latest.get("message") or ""
+    else:
+        title = f"Codex ({len(events)} turns complete)"
+        parts = []
+        for event in reversed(events):
+            label, text = event.get("label") or "", event.get("message") or ""
+            parts.append(f"{label}: {text}" if label else text)
+        message = _truncate(" | ".join(part for part in parts if part), MAX_MESSAGE_CHARS)
+    # A summary is grouped (and acked) with the newest pane and never auto-removed:
+    # the other panes in it are not on screen.
+    _notify_macos(
+        title,
+        message,
+        group=latest.get("group"),
+        on_click=latest.get("on-click"),
+        visible=len(events) == 1 and bool(latest.get("visible")),
+    )
+
+    tmux_bin, socket = latest.get("tmux") or ("", "")
+    if tmux_bin:
+        _gc_turn_complete_markers(
+            current_server_pid=latest.get("server-pid") or "", tmux=TmuxContext(tmux_bin, socket or None, "")
         )
-    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
-        return None
 
-    root = (result.stdout or "").strip()
-    return root if root else None
+
+def _submit(event: dict[str, Any], deadline: float | None = None) -> None:
+    """Spool the event and drain the spool unless another handler already is."""
+    try:
+        spool = notify_spool.Spool(NOTIFY_SPOOL_DIR, NOTIFY_BATCH_LOG)
+        spool.put(event)
+    except OSError:
+        _deliver_batch([event])
+        return
+    spool.drain(
+        COALESCE_SECONDS,
+        _deliver_batch,
+        quiet_seconds=COALESCE_QUIET_SECONDS,
+        deadline=deadline,
+        handoff=_hand_off_drain,
+    )
 
 
-def _git_branch_name(cwd: str) -> str | None:
-    if not cwd or not os.path.isdir(cwd):
-        return None
+def _hand_off_drain() -> None:
+    """Drain what this handler left spooled in a detached process that outlives its deadline."""
+    env = dict(
+        os.environ,
+        CODEX_NOTIFY_SPOOL_DIR=NOTIFY_SPOOL_DIR,
+        CODEX_TMUX_TURN_COMPLETE_DIR=TMUX_TURN_COMPLETE_DIR,
+    )
     try:
-        result = subprocess.run(
-            ["git", "-C", cwd, "rev-parse", "--abbrev-ref", "HEAD"],
-            check=True,
-            stdout=subprocess.PIPE,
+        subprocess.Popen(
+            [sys.executable or "python3", os.path.abspath(__file__), "--drain"],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
-            text=True,
-            timeout=GIT_TIMEOUT_SECONDS,
+            start_new_session=True,
         )
-    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
-        return None
-
-    branch = (result.stdout or "").strip()
-    if not branch:
-        return None
+    except OSError:
+        pass
 
-    if branch != "HEAD":
-        return branch
 
-    # Detached HEAD: report a short SHA instead.
+def _drain_detached() -> int:
+    # No deadline and no further handoff: this process has nobody waiting on it.
     try:
-        result = subprocess.run(
-            ["git", "-C", cwd, "rev-parse", "--short", "HEAD"],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            text=True,
-            timeout=GIT_TIMEOUT_SECONDS,
-        )
-    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
-        return "detached"
+        spool = notify_spool.Spool(NOTIFY_SPOOL_DIR, NOTIFY_BATCH_LOG)
+    except OSError:
+        return 0
+    spool.drain(COALESCE_SECONDS, _deliver_batch, quiet_seconds=COALESCE_QUIET_SECONDS, block=True)
+    return 0
 
-    sha = (result.stdout or "").strip()
-    return f"detached@{sha}" if sha else "detached"
+
+def _git_repo_root(cwd: str) -> str | None:
+    return git_meta.repo_root(cwd)
+
+
+def _git_branch_name(cwd: str) -> str | None:
+    return git_meta.branch_name(cwd)
 
 
 def main(argv: list[str]) -> int:
     if len(argv) != 2:
         return 0
+    if argv[1] == "--drain":
+        return _drain_detached()
 
     try:
         payload: Any = json.loads(argv[1])
     except Exception:
         return 0
 
+    return handle(payload)
+
+
+def handle(payload: Any) -> int:
+    """Handle one already-parsed notify payload (also the entry point for in-process dispatch)."""
+    started = time.monotonic()
     if not isinstance(payload, dict):
         return 0
 
@@ -623,11 +701,21 @@ def main(argv: list[str]) -> int:
     if not isinstance(turn_id, str):
         turn_id = ""
 
-    repo_root = _git_repo_root(cwd)
+    # git, tmux and osascript do not depend on each other: start them all, then wait once.
+    probes = Probes(PROBE_DEADLINE_SECONDS)
+    probes.start("git-root", _git_repo_root, cwd)
+    probes.start("git-branch", _git_branch_name, cwd)
+    tmux = TmuxContext.from_env()
+    if tmux is not None:
+        tmux.prefetch(probes)
+    if sys.platform == "darwin" and _auto_remove_enabled():
+        probes.start("frontmost", _frontmost_bundle_id)
+
+    repo_root = probes.get("git-root")
     project_path = repo_root or cwd
     project = os.path.basename(project_path.rstrip("/")) if project_path else None
 
-    branch = _git_branch_name(cwd) if repo_root else None
+    branch = probes.get("git-branch") if repo_root else None
     branch_extra = branch if branch and branch not in ("main", "master") else None
 
     if project and branch_extra:
@@ -651,13 +739,21 @@ def main(argv: list[str]) -> int:
 
     message = _truncate(message or "Turn complete", MAX_MESSAGE_CHARS)
 
-    _write_turn_complete_marker(thread_id=thread_id, turn_id=turn_id, cwd=cwd, title=title, message=message)
-    tmux_bin = _find_tmux()
-    if tmux_bin:
-        socket = _tmux_socket_from_env()
-        server_pid = _tmux_display(tmux_bin, socket, "#{pid}") or ""
-        _gc_turn_complete_markers(current_server_pid=server_pid)
-    _notify_macos(title, message, group=group, cwd=cwd)
+    marker = _turn_complete_marker(thread_id=thread_id, turn_id=turn_id, cwd=cwd, title=title, message=message, tmux=tmux)
+    event: dict[str, Any] = {
+        "queued-at": time.time(),
+        "pane-id": pane_id,
+        "title": title,
+        "label": f"{project}@{branch_extra}" if project and branch_extra else project or "",
+        "message": message,
+        "group": group,
+        "on-click": _default_on_click_command(cwd=cwd, title=title, tmux=tmux) if sys.platform == "darwin" else None,
+        "visible": _pane_is_visible(tmux, probes),
+        "marker": marker,
+        "tmux": [tmux.tmux_bin, tmux.socket or ""] if tmux is not None else None,
+        "server-pid": tmux.value("pid") if tmux is not None else "",
+    }
+    _submit(event, started + DRAIN_DEADLINE_SECONDS)
     return 0
 
 
@@ -103,15 +103,17 @@ def _tmux_display(tmux_bin: str, socket: str | None, target: str | None, fmt: st
 
 
 def _tmux_list_clients(tmux_bin: str, socket: str | None) -> list[TmuxClient]:
-    raw = _tmux_capture(tmux_bin, socket, ["list-clients", "-F", "#{client_name}\t#{client_tty}"])
+    raw = _tmux_capture(tmux_bin, socket, ["list-clients", "-F", "#{client_name}\t#{client_tty}\t#{client_control_mode}"])
     if not raw:
         return []
     clients: list[TmuxClient] = []
     for line in raw.splitlines():
-        name, _, tty = line.partition("\t")
+        name, _, rest = line.partition("\t")
+        tty, _, control_mode = rest.partition("\t")
         name = name.strip()
         tty = tty.strip()
-        if not name:
+        # Control-mode clients (e.g. activity_rank's read-only query connection) are not terminals to focus.
+        if not name or control_mode.strip() == "1":
             continue
         clients.append(TmuxClient(name=name, tty=tty or None))
     return clients
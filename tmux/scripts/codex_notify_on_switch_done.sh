@@ -9,7 +9,6 @@ case "${debounce_s}" in
 esac
 
 state_dir="${TMUX_CODEX_SWITCH_NOTIFY_STATE_DIR:-$HOME/.config/tmux/run/codex-switch-notify}"
-turn_complete_dir="${CODEX_TMUX_TURN_COMPLETE_DIR:-$HOME/.config/tmux/run/codex-turn-complete}"
 fallback_enabled="${TMUX_CODEX_DONE_FALLBACK:-0}"
 fallback_state_dir="${TMUX_CODEX_DONE_FALLBACK_STATE_DIR:-$HOME/.config/tmux/run/codex-done-fallback}"
 
@@ -45,14 +44,12 @@ if [[ -n "${last_token:-}" && "${last_token}" != "${token}" ]]; then
   exit 0
 fi
 
-IFS=$'\t' read -r session_name window_index window_name pane_id < <(
-  tmux_display $'#{session_name}\t#{window_index}\t#{window_name}\t#{pane_id}'
+IFS=$'\t' read -r window_done pane_id session_name window_index window_name < <(
+  tmux_display $'#{?@codex_done,1,0}\t#{pane_id}\t#{session_name}\t#{window_index}\t#{window_name}'
 )
 
 [[ -z "${pane_id:-}" ]] && exit 0
 
-marker_path="${turn_complete_dir}/$(safe_key "${pane_id}")"
-
 default_title="${TMUX_CODEX_DONE_NOTIFY_TITLE:-✅ 完成}"
 hud_body="${session_name}:${window_index} ${window_name}"
 if [[ -z "${hud_body//[[:space:]]/}" ]]; then
@@ -108,13 +105,13 @@ maybe_fallback_notify() {
   return 0
 }
 
-if [[ ! -f "${marker_path}" ]]; then
+# handler 写 marker 时会给 window 置 @codex_done，没置位就不用去查 marker store（省一次 python 启动）；
+# 置位时直接 ack：只调用一次 turn_markers.py，退出码表示是否确实有 marker 被 ack。
+if [[ "${window_done:-0}" != "1" ]] || ! ~/.config/tmux/scripts/codex_notify_ack_turn_complete.sh "${pane_id}" >/dev/null 2>&1; then
   maybe_fallback_notify
   exit 0
 fi
 
-~/.config/tmux/scripts/codex_notify_ack_turn_complete.sh "${pane_id}" >/dev/null 2>&1 || true
-
 if ~/.config/tmux/scripts/tmux_btt_hud_notify.sh "${default_title}" "${hud_body}" "${client_tty:-}" 2>/dev/null; then
   exit 0
 fi
@@ -177,6 +177,10 @@ def main(argv: list[str]) -> int:
     except Exception:
         return 0
 
+    return handle(payload)
+
+
+def handle(payload: Any) -> int:
     if not isinstance(payload, dict):
         return 0
 
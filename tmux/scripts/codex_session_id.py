@@ -24,6 +24,8 @@ import sys
 from dataclasses import dataclass
 from typing import Iterable, Optional
 
+import proc_table
+
 
 UUID_RE = re.compile(
     r"(?P<uuid>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
@@ -59,20 +61,15 @@ class Candidate:
 
 
 def iter_ps_table() -> tuple[dict[int, int], dict[int, str]]:
-    out = run(["ps", "-axo", "pid=,ppid=,command="])
+    # Linux 上直接读 /proc，其他平台回退到 `ps -axo pid=,ppid=,command=`；
+    # 没有 argv 的行（空命令、内核线程/僵尸的 `[comm]`）不可能是 codex，跳过。
     parent_by_pid: dict[int, int] = {}
     command_by_pid: dict[int, str] = {}
-    for line in out.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split(None, 2)
-        if len(parts) < 3:
+    table_parents, table_commands = proc_table.process_table()
+    for pid, cmd in table_commands.items():
+        if not cmd or (cmd.startswith("[") and cmd.endswith("]")):
             continue
-        pid = int(parts[0])
-        ppid = int(parts[1])
-        cmd = parts[2]
-        parent_by_pid[pid] = ppid
+        parent_by_pid[pid] = table_parents[pid]
         command_by_pid[pid] = cmd
     return parent_by_pid, command_by_pid
 
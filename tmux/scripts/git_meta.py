@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Git repo root and branch for tmux helper scripts, without forking git.
+
+The repo root is found by walking up to `.git` (a directory, or a worktree/submodule
+`gitdir:` file) and the branch comes from reading `HEAD` directly. Parsed `HEAD`s are
+cached by path and mtime, so resident callers only re-read it after a checkout.
+Layouts this reader does not understand (`GIT_DIR`/`GIT_WORK_TREE` overrides, reftable
+repos, odd `.git` files or `HEAD` contents) fall back to `git rev-parse` as before.
+
+A detached HEAD is shown as `detached@<short sha>`. The length follows `core.abbrev` from the
+system, global and repo config files; when it is unset or `auto` the sha is cut at git's
+minimum of 7 characters (git itself picks a longer one in repos with many objects). Configs
+this reader cannot follow (`include`/`includeIf`, `GIT_CONFIG_COUNT`/`GIT_CONFIG_PARAMETERS`)
+ask `git rev-parse --short` instead.
+
+Usage: git_meta.py root|branch [path]
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+
+
+GIT_TIMEOUT_SECONDS = 1.0
+SHORT_SHA_CHARS = 7
+_SHA_RE = re.compile(r"[0-9a-f]{40}([0-9a-f]{24})?")
+
+# HEAD path -> (mtime_ns, branch or None, sha or None)
+_HEAD_CACHE: dict[str, tuple[int, str | None, str | None]] = {}
+# config path -> (mtime_ns, core.abbrev value or None)
+_CONFIG_CACHE: dict[str, tuple[int, str | None]] = {}
+
+
+class Unsupported(Exception):
+    """The layout needs git itself to interpret."""
+
+
+def _git(cwd: str, args: list[str]) -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "-C", cwd, *args],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    value = (result.stdout or "").strip()
+    return value or None
+
+
+def _read_gitfile(path: str, top: str) -> str:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            line = f.readline().strip()
+    except (OSError, UnicodeDecodeError):
+        raise Unsupported(path)
+    prefix = "gitdir:"
+    if not line.startswith(prefix):
+        raise Unsupported(path)
+    git_dir = line[len(prefix):].strip()
+    return os.path.normpath(os.path.join(top, git_dir))
+
+
+def find_repo(path: str) -> tuple[str, str] | None:
+    """(worktree root, git dir) of the repository containing `path`, or None outside one."""
+    if os.environ.get("GIT_DIR") or os.environ.get("GIT_WORK_TREE"):
+        raise Unsupported("GIT_DIR")
+    # `git rev-parse --show-toplevel` reports the symlink-resolved path.
+    current = os.path.realpath(path)
+    while True:
+        dot_git = os.path.join(current, ".git")
+        if os.path.isdir(dot_git):
+            return current, dot_git
+        if os.path.isfile(dot_git):
+            return current, _read_gitfile(dot_git, current)
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def read_head(git_dir: str) -> tuple[str | None, str | None]:
+    """(branch, None) for a branch checkout or (None, sha) for a detached HEAD."""
+    head_path = os.path.join(git_dir, "HEAD")
+    try:
+        mtime_ns = os.stat(head_path).st_mtime_ns
+    except OSError:
+        raise Unsupported(head_path)
+    cached = _HEAD_CACHE.get(head_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1], cached[2]
+
+    try:
+        with open(head_path, "r", encoding="utf-8") as f:
+            raw = f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        raise Unsupported(head_path)
+    branch: str | None = None
+    sha: str | None = None
+    if raw.startswith("ref:"):
+        ref = raw[len("ref:"):].strip()
+        # Reftable repos keep a placeholder `refs/heads/.invalid` in HEAD.
+        if not ref.startswith("refs/heads/") or ref == "refs/heads/.invalid":
+            raise Unsupported(head_path)
+        branch = ref[len("refs/heads/"):]
+    elif _SHA_RE.fullmatch(raw):
+        sha = raw
+    else:
+        raise Unsupported(head_path)
+    _HEAD_CACHE[head_path] = (mtime_ns, branch, sha)
+    return branch, sha
+
+
+def _config_abbrev(path: str) -> str | None:
+    """The last `core.abbrev` value in one config file (None when the file does not set it)."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _CONFIG_CACHE.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        raise Unsupported(path)
+    section = ""
+    value: str | None = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            header, bracket, line = line[1:].partition("]")
+            if not bracket:
+                raise Unsupported(path)
+            section = header.strip().lower()
+            if section == "include" or section.startswith("includeif"):
+                raise Unsupported(path)
+            line = line.strip()
+        if not line or line[0] in "#;" or section != "core":
+            continue
+        key, equals, raw = line.partition("=")
+        if key.strip().lower() != "abbrev":
+            continue
+        if not equals:
+            raise Unsupported(path)
+        value = re.split(r"\s[#;]", raw.strip(), maxsplit=1)[0].strip().strip('"').lower()
+    _CONFIG_CACHE[path] = (mtime_ns, value)
+    return value
+
+
+def _config_paths(git_dir: str) -> list[str]:
+    """Config files in the order git reads them (later ones win)."""
+    if os.environ.get("GIT_CONFIG_COUNT") or os.environ.get("GIT_CONFIG_PARAMETERS"):
+        raise Unsupported("GIT_CONFIG_COUNT")
+    paths: list[str] = []
+    if not os.environ.get("GIT_CONFIG_NOSYSTEM"):
+        paths.append(os.environ.get("GIT_CONFIG_SYSTEM") or "/etc/gitconfig")
+    if os.environ.get("GIT_CONFIG_GLOBAL"):
+        paths.append(os.environ["GIT_CONFIG_GLOBAL"])
+    else:
+        xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+        paths += [os.path.join(xdg, "git", "config"), os.path.expanduser("~/.gitconfig")]
+    # Linked worktrees share the main repository's config.
+    common_dir = git_dir
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r", encoding="utf-8") as f:
+            common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except FileNotFoundError:
+        pass
+    except (OSError, UnicodeDecodeError):
+        raise Unsupported(git_dir)
+    paths.append(os.path.join(common_dir, "config"))
+    return paths
+
+
+def short_sha(sha: str, git_dir: str) -> str:
+    """`sha` cut to the `core.abbrev` length; raises Unsupported when git has to decide."""
+    abbrev: str | None = None
+    for path in _config_paths(git_dir):
+        abbrev = _config_abbrev(path) or abbrev
+    if abbrev is None or abbrev == "auto":
+        return sha[:SHORT_SHA_CHARS]
+    if abbrev in ("no", "false", "off", "0"):
+        return sha
+    if not abbrev.isdigit() or not 4 <= int(abbrev) <= len(sha):
+        raise Unsupported(abbrev)
+    return sha[: int(abbrev)]
+
+
+def repo_root(cwd: str) -> str | None:
+    if not cwd or not os.path.isdir(cwd):
+        return None
+    try:
+        repo = find_repo(cwd)
+    except Unsupported:
+        return _git(cwd, ["rev-parse", "--show-toplevel"])
+    return repo[0] if repo else None
+
+
+def branch_name(cwd: str) -> str | None:
+    """Current branch, `detached@<short sha>` for a detached HEAD, or None outside a repo."""
+    if not cwd or not os.path.isdir(cwd):
+        return None
+    try:
+        repo = find_repo(cwd)
+        if repo is None:
+            return None
+        branch, sha = read_head(repo[1])
+        if branch:
+            return branch
+        return f"detached@{short_sha(sha, repo[1])}" if sha else "detached"
+    except Unsupported:
+        return _git_branch_name(cwd)
+
+
+def _git_branch_name(cwd: str) -> str | None:
+    branch = _git(cwd, ["rev-parse", "--abbrev-ref", "HEAD"])
+    if not branch:
+        return None
+    if branch != "HEAD":
+        return branch
+    # Detached HEAD: report a short SHA instead.
+    sha = _git(cwd, ["rev-parse", "--short", "HEAD"])
+    return f"detached@{sha}" if sha else "detached"
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) not in (2, 3) or argv[1] not in ("root", "branch"):
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        return 2
+    path = argv[2] if len(argv) == 3 else os.getcwd()
+    value = repo_root(path) if argv[1] == "root" else branch_name(path)
+    if not value:
+        return 1
+    print(value)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
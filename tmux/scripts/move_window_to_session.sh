@@ -1,9 +1,10 @@
 #!/bin/bash
 
 index="$1"
+client="${2:-}"
 
 if [[ -z "$index" || ! "$index" =~ ^[0-9]+$ ]]; then
   exit 0
 fi
 
-python3 "$HOME/.config/tmux/scripts/session_manager.py" move-window-to "$index"
+python3 "$HOME/.config/tmux/scripts/session_manager.py" move-window-to "$index" "${client}"
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Delayed `terminal-notifier -remove` for every notification, from one reaper process.
+
+`schedule()` sends `{"group", "due", "notifier"}` as one datagram to the reaper's unix
+socket, starting the reaper first when nothing is listening. The reaper keeps pending
+removals in a heap (one deadline per group: rescheduling a group moves it), sleeps until
+the earliest deadline, and runs every removal due within `BATCH_SLACK_SECONDS` of it as one
+batch. It exits after `IDLE_EXIT_SECONDS` with nothing pending.
+
+Nothing here is macOS specific: the notifier is whatever executable the caller passes, so
+a stand-in script on PATH exercises the whole path on Linux.
+
+Usage: notify_reaper.py serve
+"""
+
+from __future__ import annotations
+
+import fcntl
+import heapq
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+RUN_DIR = os.path.expanduser(os.environ.get("CODEX_NOTIFY_REAPER_DIR", "~/.config/tmux/run/codex-notify"))
+IDLE_EXIT_SECONDS = max(0.0, _env_float("CODEX_NOTIFY_REAPER_IDLE_SECONDS", 60.0))
+BATCH_SLACK_SECONDS = 0.25
+REMOVE_TIMEOUT_SECONDS = 5.0
+START_WAIT_SECONDS = 0.5
+
+
+def socket_path(run_dir: str | None = None) -> str:
+    return os.path.join(run_dir or RUN_DIR, "reaper.sock")
+
+
+def _send(path: str, message: dict) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(json.dumps(message).encode("utf-8"), path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def schedule(group: str, delay_seconds: float, notifier: str, *, run_dir: str | None = None) -> bool:
+    """Queue `notifier -remove group` in `delay_seconds`; False when no reaper could be reached."""
+    path = socket_path(run_dir)
+    message = {"group": group, "due": time.time() + max(0.0, delay_seconds), "notifier": notifier}
+    if _send(path, message):
+        return True
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        env = dict(os.environ, CODEX_NOTIFY_REAPER_DIR=os.path.dirname(path))
+        subprocess.Popen(
+            [sys.executable or "python3", os.path.abspath(__file__), "serve"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            env=env,
+        )
+    except OSError:
+        return False
+    deadline = time.monotonic() + START_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        if _send(path, message):
+            return True
+    return False
+
+
+class Reaper:
+    def __init__(self) -> None:
+        self.heap: list[tuple[float, str]] = []
+        # group -> (due, notifier); heap entries whose due no longer matches are stale.
+        self.pending: dict[str, tuple[float, str]] = {}
+        self.batches: list[list[str]] = []
+
+    def add(self, raw: bytes) -> None:
+        try:
+            message = json.loads(raw)
+            group, due, notifier = str(message["group"]), float(message["due"]), str(message["notifier"])
+        except (ValueError, KeyError, TypeError):
+            return
+        if not group or not notifier:
+            return
+        self.pending[group] = (due, notifier)
+        heapq.heappush(self.heap, (due, group))
+
+    def _drop_stale(self) -> None:
+        while self.heap:
+            due, group = self.heap[0]
+            entry = self.pending.get(group)
+            if entry is not None and entry[0] == due:
+                return
+            heapq.heappop(self.heap)
+
+    def next_due(self) -> float | None:
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def take_due(self, now: float) -> list[tuple[str, str]]:
+        """Pop every live entry due by `now` + the batch slack, as (group, notifier)."""
+        due_now: list[tuple[str, str]] = []
+        while True:
+            first = self.next_due()
+            if first is None or first > now + BATCH_SLACK_SECONDS:
+                return due_now
+            _due, group = heapq.heappop(self.heap)
+            _due, notifier = self.pending.pop(group)
+            due_now.append((group, notifier))
+
+    def remove(self, batch: list[tuple[str, str]]) -> None:
+        procs = []
+        for group, notifier in batch:
+            try:
+                procs.append(
+                    subprocess.Popen(
+                        [notifier, "-remove", group],
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+                )
+            except OSError:
+                continue
+        for proc in procs:
+            try:
+                proc.wait(timeout=REMOVE_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self.batches.append([group for group, _notifier in batch])
+
+    def serve(self, sock: socket.socket) -> None:
+        idle_since = time.monotonic()
+        while True:
+            first = self.next_due()
+            if first is None:
+                timeout = IDLE_EXIT_SECONDS - (time.monotonic() - idle_since)
+                if timeout <= 0:
+                    return
+            else:
+                timeout = max(0.0, first - time.time())
+            sock.settimeout(timeout)
+            try:
+                self.add(sock.recv(4096))
+            except socket.timeout:
+                pass
+            # Drain whatever else arrived meanwhile before deciding what is due.
+            sock.setblocking(False)
+            try:
+                while True:
+                    self.add(sock.recv(4096))
+            except (BlockingIOError, InterruptedError):
+                pass
+            batch = self.take_due(time.time())
+            if batch:
+                self.remove(batch)
+            if self.pending or batch:
+                idle_since = time.monotonic()
+
+
+def command_serve() -> int:
+    path = socket_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        # Another reaper owns the socket.
+        return 0
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        # Under the lock, any existing socket file belongs to a reaper that is gone.
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        sock.bind(path)
+        Reaper().serve(sock)
+    finally:
+        # Unlink before releasing the lock so a new reaper never loses its fresh socket.
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        sock.close()
+        os.close(lock_fd)
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    if argv[1:] != ["serve"]:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        return 2
+    return command_serve()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Spool directory that coalesces bursts of notification events into batches.
+
+Every producer writes its event as one file (`put`) and then calls `drain`. Whichever
+producer takes the drain lock becomes the drainer: it waits until the spool has been quiet
+for a moment (at most a short window) so the rest of a burst can arrive, claims every
+spooled event by moving it into `inflight/`, and hands them to `deliver` as one batch.
+Claimed files are removed only after delivery; a failed delivery puts them back, and the
+next drainer puts back whatever a drainer that died mid-batch left in `inflight/`.
+Producers that find the lock taken just exit; the drainer re-checks the spool after
+releasing the lock, so an event spooled while it was delivering is never stranded. A
+drainer that stops early (its deadline passed, `stop_draining`, or a failed delivery)
+calls its `handoff`, which starts a detached drainer for whatever is still spooled.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Any, Callable
+
+
+LOCK_NAME = ".drain.lock"
+INFLIGHT_DIR = "inflight"
+LOG_LIMIT = 1 << 20
+
+Event = dict[str, Any]
+
+# Held while this process delivers a claimed batch; `stop_draining` waits on it.
+_delivering = threading.Lock()
+_stopping = threading.Event()
+# Spool directory -> (spool, handoff) of every drain running in this process.
+_handoffs: dict[str, tuple["Spool", Callable[[], None]]] = {}
+_handoffs_lock = threading.Lock()
+
+
+def _hand_off(directory: str) -> None:
+    """Run the drain's handoff if it left events behind; at most once per drain."""
+    with _handoffs_lock:
+        entry = _handoffs.pop(directory, None)
+    if entry is not None and entry[0].stranded():
+        entry[1]()
+
+
+def stop_draining(timeout: float) -> bool:
+    """Start no new batch in this process, wait for the one in delivery, and hand off the rest.
+
+    For callers that are about to exit without joining the drainer's thread. Returns False
+    when the batch in delivery did not finish in time.
+    """
+    _stopping.set()
+    delivered = _delivering.acquire(timeout=max(0.0, timeout))
+    if delivered:
+        _delivering.release()
+    for directory in list(_handoffs):
+        _hand_off(directory)
+    return delivered
+
+
+class Spool:
+    def __init__(self, directory: str, log_path: str = "") -> None:
+        self.directory = directory
+        self.inflight = os.path.join(directory, INFLIGHT_DIR)
+        self.log_path = log_path
+        os.makedirs(self.inflight, exist_ok=True)
+
+    def put(self, event: Event) -> str:
+        """Spool one event; names sort by arrival time."""
+        name = f"{time.time_ns():020d}-{os.getpid()}.json"
+        path = os.path.join(self.directory, name)
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(event, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def pending(self) -> list[str]:
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+        except OSError:
+            return []
+
+    def claim(self) -> list[tuple[str, Event]]:
+        """Move every spooled event into `inflight/`, oldest first; return (in-flight path, event)."""
+        claimed: list[tuple[str, Event]] = []
+        for name in self.pending():
+            path = os.path.join(self.inflight, name)
+            try:
+                os.rename(os.path.join(self.directory, name), path)
+            except OSError:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    event = json.load(f)
+            except (OSError, ValueError):
+                event = None
+            if isinstance(event, dict):
+                claimed.append((path, event))
+            else:
+                self._unlink(path)
+        return claimed
+
+    def stranded(self) -> bool:
+        """Whether events are still spooled or in flight."""
+        try:
+            return bool(self.pending() or os.listdir(self.inflight))
+        except OSError:
+            return bool(self.pending())
+
+    def requeue(self) -> int:
+        """Move in-flight events back into the spool; return how many."""
+        try:
+            names = os.listdir(self.inflight)
+        except OSError:
+            return 0
+        moved = 0
+        for name in names:
+            try:
+                os.rename(os.path.join(self.inflight, name), os.path.join(self.directory, name))
+            except OSError:
+                continue
+            moved += 1
+        return moved
+
+    def _unlink(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _settle(self, window_seconds: float, quiet_seconds: float, deadline: float | None) -> None:
+        """Wait until no event arrived for `quiet_seconds`, at most `window_seconds`."""
+        end = time.monotonic() + window_seconds
+        if deadline is not None:
+            end = min(end, deadline)
+        quiet = quiet_seconds if quiet_seconds > 0 else window_seconds
+        seen = len(self.pending())
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(quiet, remaining))
+            count = len(self.pending())
+            if count == seen:
+                return
+            seen = count
+
+    def drain(
+        self,
+        window_seconds: float,
+        deliver: Callable[[list[Event]], None],
+        *,
+        quiet_seconds: float = 0.0,
+        deadline: float | None = None,
+        handoff: Callable[[], None] | None = None,
+        block: bool = False,
+    ) -> int:
+        """Deliver spooled events in batches if no other drainer is running; return batches sent.
+
+        `quiet_seconds` ends the coalescing wait early once the spool stops growing (0: always
+        wait the full window). No batch is started after `deadline` (a `time.monotonic()` value).
+        When the drain stops with events left behind (deadline, `stop_draining`, or `deliver`
+        raising), `handoff` is called to drain them elsewhere. `block` waits for the drain lock
+        instead of leaving the spool to its holder (for the drainer a handoff starts).
+        """
+        if handoff is None:
+            return self._drain(window_seconds, deliver, quiet_seconds, deadline, block)[0]
+        with _handoffs_lock:
+            _handoffs[self.directory] = (self, handoff)
+        try:
+            batches, finished = self._drain(window_seconds, deliver, quiet_seconds, deadline, block)
+        except BaseException:
+            _hand_off(self.directory)
+            raise
+        if finished:
+            with _handoffs_lock:
+                _handoffs.pop(self.directory, None)
+        else:
+            _hand_off(self.directory)
+        return batches
+
+    def _drain(
+        self,
+        window_seconds: float,
+        deliver: Callable[[list[Event]], None],
+        quiet_seconds: float,
+        deadline: float | None,
+        block: bool,
+    ) -> tuple[int, bool]:
+        """(batches sent, whether the spool was left empty or to another drainer)."""
+        batches = 0
+        lock_path = os.path.join(self.directory, LOCK_NAME)
+        while not _stopping.is_set() and (deadline is None or time.monotonic() < deadline):
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX if block and not batches else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # The running drainer will pick our event up.
+                    return batches, True
+                # Holding the lock: anything in flight belongs to a drainer that died mid-batch.
+                self.requeue()
+                if window_seconds > 0:
+                    self._settle(window_seconds, quiet_seconds, deadline)
+                with _delivering:
+                    if _stopping.is_set():
+                        return batches, False
+                    started = time.time()
+                    claimed = self.claim()
+                    if claimed:
+                        try:
+                            deliver([event for _path, event in claimed])
+                        except BaseException:
+                            self.requeue()
+                            raise
+                        for path, _event in claimed:
+                            self._unlink(path)
+                        batches += 1
+                        self.log([event for _path, event in claimed], started)
+            finally:
+                os.close(fd)
+            if not self.pending():
+                return batches, True
+        return batches, False
+
+    def log(self, events: list[Event], started: float) -> None:
+        if not self.log_path:
+            return
+        queued = [event.get("queued-at") for event in events if isinstance(event.get("queued-at"), (int, float))]
+        record = {
+            "at": round(started, 3),
+            "events": len(events),
+            "panes": [event.get("pane-id", "") for event in events],
+            "oldest_ms": round((started - min(queued)) * 1000, 1) if queued else None,
+            "deliver_ms": round((time.time() - started) * 1000, 1),
+        }
+        try:
+            if os.path.getsize(self.log_path) > LOG_LIMIT:
+                os.replace(self.log_path, f"{self.log_path}.1")
+        except OSError:
+            pass
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
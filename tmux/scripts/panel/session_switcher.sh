@@ -10,7 +10,7 @@ if ! command -v fzf >/dev/null 2>&1; then
   exit 0
 fi
 
-sessions="$(python3 "$HOME/.config/tmux/scripts/activity_rank.py" sessions 2>/dev/null || true)"
+sessions="$(python3 "$HOME/.config/tmux/scripts/activity_rank_client.py" sessions 2>/dev/null || true)"
 if [[ -z "${sessions:-}" ]]; then
   printf '%s\n' "没有可切换的 session。"
   read -r -n 1 -s -p "按任意键关闭..." || true
@@ -24,14 +24,21 @@ selected="$(
     --exit-0 \
     --no-sort \
     --delimiter=$'\t' \
-    --with-nth=2.. \
+    --with-nth=2 \
     --prompt='session> ' \
     --header=$'✓=待处理  ●=agent/TUI 活动  •=普通活动  ·=背景噪音' \
-    --preview 'tmux capture-pane -p -t {1} -S -200 2>/dev/null | tail -n 200' \
+    --preview 'sock={3}; tmux ${sock:+-S "$sock"} capture-pane -p -t {1} -S -200 2>/dev/null | tail -n 200' \
     --preview-window='down,70%,wrap,follow'
 )" || true
 
 if [[ -n "${selected:-}" ]]; then
-  target="${selected%%$'\t'*}"
-  tmux switch-client -t "$target"
+  IFS=$'\t' read -r target _label socket <<<"$selected"
+  # 多 server 模式（TMUX_ACTIVITY_SOCKETS）下第 3 列是该 session 所在的 socket。
+  if [[ -n "${socket:-}" && "$socket" != "$(tmux display -p '#{socket_path}' 2>/dev/null || true)" ]]; then
+    # 当前 client 不在那个 server 上，switch-client 到不了：用 detach-client -E
+    # 把当前终端改为 attach 到那个 server（回原 server 需要重新 attach）。
+    tmux detach-client -E "env -u TMUX tmux -S $(printf '%q' "$socket") attach-session -t $(printf '%q' "$target")"
+  else
+    tmux switch-client -t "$target"
+  fi
 fi
@@ -20,7 +20,7 @@ if ! command -v fzf >/dev/null 2>&1; then
   exit 0
 fi
 
-windows="$(python3 "$HOME/.config/tmux/scripts/activity_rank.py" windows 2>/dev/null || true)"
+windows="$(python3 "$HOME/.config/tmux/scripts/activity_rank_client.py" windows 2>/dev/null || true)"
 if [[ -z "${windows:-}" ]]; then
   printf '%s\n' "没有可切换的 window。"
   pause
@@ -33,10 +33,10 @@ selected="$(
     --exit-0 \
     --no-sort \
     --delimiter=$'\t' \
-    --with-nth=2.. \
+    --with-nth=2 \
     --prompt='window> ' \
     --header=$'✓=待处理  ●=agent/TUI 活动  •=普通活动  ·=背景噪音  ⛶=zoom  ▶=当前 window' \
-    --preview 'tmux list-panes -t {1} -F "#{pane_index}#{?pane_active,*, } #{pane_current_command}  #{pane_current_path}" 2>/dev/null; echo "----"; tmux capture-pane -p -t {1} -S -200 2>/dev/null | tail -n 200' \
+    --preview 'sock={3}; tmux ${sock:+-S "$sock"} list-panes -t {1} -F "#{pane_index}#{?pane_active,*, } #{pane_current_command}  #{pane_current_path}" 2>/dev/null; echo "----"; tmux ${sock:+-S "$sock"} capture-pane -p -t {1} -S -200 2>/dev/null | tail -n 200' \
     --preview-window='down,70%,wrap,follow' \
     --bind 'alt-w:abort'
 )" || true
@@ -45,7 +45,17 @@ if [[ -z "${selected:-}" ]]; then
   exit 0
 fi
 
-target="${selected%%$'\t'*}"
+IFS=$'\t' read -r target _label socket <<<"$selected"
 if [[ -n "${target:-}" ]]; then
-  tmux switch-client -t "$target"
+  # 多 server 模式（TMUX_ACTIVITY_SOCKETS）下第 3 列是该 window 所在的 socket。
+  if [[ -n "${socket:-}" && "$socket" != "$(tmux display -p '#{socket_path}' 2>/dev/null || true)" ]]; then
+    # 当前 client 不在那个 server 上，switch-client 到不了：先选中 window，再用 detach-client -E
+    # 把当前终端改为 attach 到那个 server（回原 server 需要重新 attach）。
+    client="$(tmux show -gqv @windows_popup_client 2>/dev/null || true)"
+    tmux -S "$socket" select-window -t "$target" 2>/dev/null || true
+    tmux detach-client ${client:+-t "$client"} -E \
+      "env -u TMUX tmux -S $(printf '%q' "$socket") attach-session -t $(printf '%q' "${target%%:*}")"
+  else
+    tmux switch-client -t "$target"
+  fi
 fi
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Process table (pid -> ppid, pid -> command) for tmux helper scripts.
+
+Linux reads `/proc/<pid>/stat` and `/proc/<pid>/cmdline` directly; everything else
+(macOS, or `PROC_TABLE_BACKEND=ps`) forks `ps -axo pid=,ppid=,command=` as before.
+`ProcessIndex` walks single subtrees without listing the whole table.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+
+
+PROC_ROOT = "/proc"
+
+
+def _read_file(path: str) -> bytes:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks: list[bytes] = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def parse_stat(raw: bytes) -> tuple[int, str, list[bytes]]:
+    """Split a `/proc/<pid>/stat` line into (ppid, comm, fields after comm).
+
+    `comm` may contain spaces and parentheses, so split on the last `)`.
+    The returned fields start at `state` (field 3), so field N is `fields[N - 3]`.
+    """
+    head, _, tail = raw.rpartition(b")")
+    comm = head.partition(b"(")[2].decode("utf-8", "replace")
+    fields = tail.split()
+    return int(fields[1]), comm, fields
+
+
+def command_from_cmdline(raw: bytes, comm: str) -> str:
+    args = raw.rstrip(b"\0").split(b"\0") if raw else []
+    if not args or not any(args):
+        # Kernel threads and zombies have no argv; mirror how ps shows them.
+        return f"[{comm}]"
+    return " ".join(arg.decode("utf-8", "replace") for arg in args)
+
+
+def read_proc(root: str = PROC_ROOT) -> tuple[dict[int, int], dict[int, str]] | None:
+    """Read the table from procfs, or return None when `root` is not a usable procfs."""
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return None
+
+    parent_by_pid: dict[int, int] = {}
+    command_by_pid: dict[int, str] = {}
+    for name in names:
+        if not name.isdigit():
+            continue
+        base = f"{root}/{name}"
+        try:
+            ppid, comm, _fields = parse_stat(_read_file(f"{base}/stat"))
+            cmdline = _read_file(f"{base}/cmdline")
+        except (OSError, ValueError, IndexError):
+            # The process exited between listdir and read, or the entry is malformed.
+            continue
+        pid = int(name)
+        parent_by_pid[pid] = ppid
+        command_by_pid[pid] = command_from_cmdline(cmdline, comm)
+    if not parent_by_pid:
+        return None
+    return parent_by_pid, command_by_pid
+
+
+def parse_ps(raw: str) -> tuple[dict[int, int], dict[int, str]]:
+    parent_by_pid: dict[int, int] = {}
+    command_by_pid: dict[int, str] = {}
+    for line in raw.splitlines():
+        parts = line.strip().split(None, 2)
+        if len(parts) < 2:
+            continue
+        try:
+            pid = int(parts[0])
+            ppid = int(parts[1])
+        except ValueError:
+            continue
+        parent_by_pid[pid] = ppid
+        command_by_pid[pid] = parts[2] if len(parts) > 2 else ""
+    return parent_by_pid, command_by_pid
+
+
+def read_ps() -> tuple[dict[int, int], dict[int, str]]:
+    raw = subprocess.check_output(
+        ["ps", "-axo", "pid=,ppid=,command="],
+        text=True,
+        stderr=subprocess.DEVNULL,
+    )
+    return parse_ps(raw)
+
+
+def process_table() -> tuple[dict[int, int], dict[int, str]]:
+    """Return (parent_by_pid, command_by_pid); raises if neither procfs nor `ps` works."""
+    if os.environ.get("PROC_TABLE_BACKEND", "").strip().lower() != "ps":
+        table = read_proc()
+        if table is not None:
+            return table
+    return read_ps()
+
+
+class ProcessIndex:
+    """Commands of process subtrees, cached by (pid, start time) between invocations.
+
+    Subtrees are walked through `/proc/<pid>/task/<tid>/children`, so the cost follows the
+    size of the walked subtrees rather than the whole table. For every visited pid only
+    `stat` is read; `cmdline` is re-read when the pid is new, was reused (start time changed)
+    or exec'd another program (comm changed).
+
+    A process that rewrites its own argv keeps its cached command unless comm changes too.
+    Title setters such as Node's process.title (libuv) usually set comm through PR_SET_NAME as
+    well, so that case is caught; a program that only overwrites its argv memory is shown with
+    the command it started with until it exits.
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: str = PROC_ROOT) -> None:
+        self.root = root
+        self.entries: dict[int, tuple[int, str, str]] = {}
+        self.visited: dict[int, tuple[int, str, str]] = {}
+        self.refreshed = 0
+        self.reused = 0
+
+    @staticmethod
+    def supported(root: str = PROC_ROOT) -> bool:
+        pid = os.getpid()
+        return os.path.exists(f"{root}/{pid}/task/{pid}/children")
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return
+        for pid, entry in entries.items():
+            try:
+                start, comm, command = entry
+                self.entries[int(pid)] = (int(start), str(comm), str(command))
+            except (TypeError, ValueError):
+                continue
+
+    def commit(self) -> None:
+        """Forget processes that were not visited since the previous commit."""
+        self.entries = self.visited
+        self.visited = {}
+
+    def save(self, path: str) -> None:
+        self.commit()
+        payload = {
+            "version": self.VERSION,
+            "entries": {str(pid): list(entry) for pid, entry in self.entries.items()},
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _entry(self, pid: int) -> tuple[int, str, str] | None:
+        entry = self.visited.get(pid)
+        if entry is not None:
+            return entry
+        base = f"{self.root}/{pid}"
+        try:
+            _ppid, comm, fields = parse_stat(_read_file(f"{base}/stat"))
+            start = int(fields[19])
+        except (OSError, ValueError, IndexError):
+            return None
+        cached = self.entries.get(pid)
+        if cached is not None and cached[0] == start and cached[1] == comm:
+            entry = cached
+            self.reused += 1
+        else:
+            try:
+                entry = (start, comm, command_from_cmdline(_read_file(f"{base}/cmdline"), comm))
+            except OSError:
+                return None
+            self.refreshed += 1
+        self.visited[pid] = entry
+        return entry
+
+    def _children(self, pid: int) -> list[int]:
+        task_dir = f"{self.root}/{pid}/task"
+        try:
+            tids = os.listdir(task_dir)
+        except OSError:
+            return []
+        out: list[int] = []
+        for tid in tids:
+            try:
+                out.extend(int(part) for part in _read_file(f"{task_dir}/{tid}/children").split())
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def subtree_commands(self, pid: int, limit: int) -> list[str]:
+        seen: set[int] = set()
+        stack = [pid]
+        parts: list[str] = []
+        while stack and len(seen) < limit:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            entry = self._entry(current)
+            if entry is None:
+                continue
+            parts.append(entry[2])
+            stack.extend(self._children(current))
+        return parts
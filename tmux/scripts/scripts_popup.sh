@@ -601,7 +601,9 @@ panes_src() {
 }
 
 panes_src_simple() {
-    python3 "$HOME/.config/tmux/scripts/activity_rank.py" panes
+    # pane popup 的 kill/move/swap 都作用于当前 server，不参与多 server 排序。
+    # --top：先输出前 K 行（第一屏），其余排序完再补上，fzf 可以更早显示。
+    TMUX_ACTIVITY_SOCKETS= python3 "$HOME/.config/tmux/scripts/activity_rank_client.py" panes --top "${TMUX_ACTIVITY_TOP_K:-50}"
 }
 
 $@
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
+import os
 import re
 import subprocess
 import sys
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
 
 
 def run_tmux(args: List[str], check: bool = True, capture: bool = False) -> str:
@@ -19,18 +24,35 @@ def run_tmux(args: List[str], check: bool = True, capture: bool = False) -> str:
     return ""
 
 
+def tmux_ok(args: List[str]) -> bool:
+    result = subprocess.run(["tmux", *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return result.returncode == 0
+
+
+# 按顺序排列的 session id（空格分隔），由 apply_order / hooks 维护；按序号切换时不必再 list-sessions。
+# 取值以写入时的改名代数开头：session-renamed hook 每次给 RENAMES_OPTION 加一，
+# 代数对不上说明有外部 rename-session（或改名调整了顺序），索引视为过期。
+ORDER_OPTION = "@session_order"
+RENAMES_OPTION = "@session_renames"
+
+# 本次命令里已知的 ORDER_OPTION 取值（None 表示还没读过）。
+_session_order: Optional[List[str]] = None
+
+
 def list_sessions() -> List[Dict[str, object]]:
+    global _session_order
     output = run_tmux([
         "list-sessions",
         "-F",
-        "#{session_id}\t#{session_name}\t#{session_created}"
+        f"#{{session_id}}\t#{{session_name}}\t#{{session_created}}\t#{{{RENAMES_OPTION}}}\t#{{{ORDER_OPTION}}}"
     ], capture=True)
     if not output:
         return []
 
     sessions = []
     for line in output.splitlines():
-        session_id, name, created_str = line.split("\t")
+        session_id, name, created_str, renames, order = line.split("\t", 4)
+        _session_order = parse_order(order, renames)
         created = int(created_str)
         match = re.match(r"^(\d+)-(.*)$", name)
         if match:
@@ -60,63 +82,140 @@ def sanitize_label(label: str) -> str:
     return stripped or "session"
 
 
-def apply_order(ordered_sessions: List[Dict[str, object]]) -> None:
+def tmux_arg(arg: str) -> str:
+    # 单独的 ";" 或以 ";" 结尾的参数会被 tmux 当作命令分隔符；名称里末尾的 ";" 需要写成 "\;"。
+    if arg.endswith(";"):
+        return arg[:-1] + "\\;"
+    return arg
+
+
+def chain_commands(commands: List[List[str]]) -> List[str]:
+    args: List[str] = []
+    for command in commands:
+        if args:
+            args.append(";")
+        args.extend(tmux_arg(arg) for arg in command)
+    return args
+
+
+def rename_commands(ordered_sessions: List[Dict[str, object]]) -> List[List[str]]:
+    targets = []
     for position, session in enumerate(ordered_sessions, start=1):
         label = sanitize_label(str(session["label"]))
         new_name = f"{position}-{label}"
-        run_tmux(["rename-session", "-t", session["id"], new_name])
-
+        if new_name != session["name"]:
+            targets.append((str(session["id"]), new_name))
+
+    # 同一 label 的两个 session 互换位置时，目标名称仍被另一个待改名的 session 占用；
+    # tmux 不允许重名，所以这时先把所有待改名的 session 改成临时名称。
+    held = {str(session["name"]): str(session["id"]) for session in ordered_sessions}
+    commands: List[List[str]] = []
+    if any(held.get(new_name, session_id) != session_id for session_id, new_name in targets):
+        commands.extend(
+            ["rename-session", "-t", session_id, f"_renaming_{session_id.lstrip('$')}"]
+            for session_id, _new_name in targets
+        )
+    commands.extend(["rename-session", "-t", session_id, new_name] for session_id, new_name in targets)
+    return commands
+
+
+def parse_order(order: str, renames: str) -> List[str]:
+    generation, _, ids = order.partition(" ")
+    return ids.split() if generation == (renames or "0") else []
+
+
+def order_commands(ordered_sessions: List[Dict[str, object]], renames: int = 0) -> List[List[str]]:
+    global _session_order
+    ids = [str(session["id"]) for session in ordered_sessions]
+    if ids == _session_order and not renames:
+        return []
+    _session_order = ids
+    # 同一次调用里的 rename-session 触发的 hook 在整串命令之后才执行，所以代数要预先加上本次的改名数。
+    generation = f"#{{e|+:#{{{RENAMES_OPTION}}},{renames}}}"
+    return [["set", "-gF", ORDER_OPTION, " ".join([generation, *ids])]]
 
-def current_session_id(client: Optional[str] = None) -> str:
-    if not client:
-        return run_tmux(["display-message", "-p", "#{session_id}"], capture=True)
 
-    # 在 tmux 3.5+ 下，display-message 的 -c 只影响 client_* 格式；
-    # 直接取 #{session_id}/#{session_name}/#{window_id} 会落到“当前 target-pane”而不是该 client 的状态。
-    # 这里先取 client_session（session 名称），再映射回 session_id。
-    client_session = run_tmux(["display-message", "-p", "-c", client, "#{client_session}"], capture=True)
-    if not client_session:
+def apply_order(ordered_sessions: List[Dict[str, object]]) -> None:
+    # 只改名称有变化的 session，并把所有 rename-session 与索引更新用 ";" 串成一次 tmux 调用。
+    renames = rename_commands(ordered_sessions)
+    commands = renames + order_commands(ordered_sessions, len(renames))
+    if commands:
+        run_tmux(chain_commands(commands))
+
+
+def session_order() -> List[str]:
+    global _session_order
+    if _session_order is None:
+        output = run_tmux(
+            ["display-message", "-p", f"#{{{ORDER_OPTION}}}\t#{{{RENAMES_OPTION}}}"], check=False, capture=True
+        )
+        order, _, renames = output.partition("\t")
+        _session_order = parse_order(order, renames)
+    return _session_order
+
+
+def rebuild_order() -> List[str]:
+    """一致性检查：按 list-sessions 重新计算顺序，索引过期时写回。"""
+    sessions = list_sessions()
+    commands = order_commands(sessions)
+    if commands:
+        run_tmux(chain_commands(commands), check=False)
+    return [str(session["id"]) for session in sessions]
+
+
+def session_id_at(index: int, fresh: bool = False) -> str:
+    ids = rebuild_order() if fresh else session_order()
+    if not fresh and index > len(ids):
+        # 索引缺失、已过期（外部改名）或比实际 session 少（例如 hook 还没跑），重建后再取。
+        ids = rebuild_order()
+    if index > len(ids):
         return ""
+    return ids[index - 1]
 
-    sessions = list_sessions()
-    for session in sessions:
-        if session["name"] == client_session:
-            return str(session["id"])
 
-    return ""
+# 本次命令里解析过的 client 状态：client 名（无 client 时为 ""）-> (session_id, window_id)。
+_client_state: Dict[str, Tuple[str, str]] = {}
 
 
-def current_window_id(client: Optional[str] = None) -> str:
+def client_state(client: Optional[str] = None) -> Tuple[str, str]:
+    key = client or ""
+    if key in _client_state:
+        return _client_state[key]
     if not client:
-        return run_tmux(["display-message", "-p", "#{window_id}"], capture=True)
+        output = run_tmux(["display-message", "-p", "#{session_id}\t#{window_id}"], capture=True)
+        session_id, _, window_id = output.partition("\t")
+        _client_state[key] = (session_id, window_id)
+        return _client_state[key]
 
-    client_session = run_tmux(["display-message", "-p", "-c", client, "#{client_session}"], capture=True)
-    if not client_session:
-        return ""
-
-    # 取该 session 当前 active window（注意：这不是严格“每 client 独立”的 window，但对本配置足够稳定）
+    # 在 tmux 3.5+ 下，display-message 的 -c 只影响 client_* 格式；
+    # 直接取 #{session_id}/#{window_id} 会落到“当前 target-pane”而不是该 client 的状态。
+    # list-clients 的格式按每个 client 展开：session_id 是该 client 的 session，window_id 是其当前 window
+    # （严格说是该 session 的 active window，对本配置足够稳定）。一次查询拿到所有 client。
+    # control-mode client（如 activity_rank 的只读查询连接）不是用户终端，tty 为空，跳过。
     output = run_tmux(
-        [
-            "list-windows",
-            "-t",
-            client_session,
-            "-F",
-            "#{window_id}\t#{window_active}",
-        ],
+        ["list-clients", "-F", "#{client_name}\t#{client_tty}\t#{session_id}\t#{window_id}\t#{client_control_mode}"],
+        check=False,
         capture=True,
     )
-    if not output:
-        return ""
-
     for line in output.splitlines():
-        try:
-            window_id, active_str = line.split("\t")
-        except ValueError:
+        parts = line.split("\t")
+        if len(parts) != 5:
+            continue
+        name, tty, session_id, window_id, control_mode = parts
+        if control_mode == "1":
             continue
-        if active_str == "1":
-            return window_id
+        _client_state.setdefault(name, (session_id, window_id))
+        if tty:
+            _client_state.setdefault(tty, (session_id, window_id))
+    return _client_state.setdefault(key, ("", ""))
+
+
+def current_session_id(client: Optional[str] = None) -> str:
+    return client_state(client)[0]
 
-    return ""
+
+def current_window_id(client: Optional[str] = None) -> str:
+    return client_state(client)[1]
 
 
 def command_switch(index_str: str) -> None:
@@ -126,11 +225,13 @@ def command_switch(index_str: str) -> None:
         return
     if index < 1:
         return
-    sessions = list_sessions()
-    if index > len(sessions):
-        return
-    run_tmux(["switch-client", "-t", sessions[index - 1]["id"]], check=False)
-    run_tmux(["refresh-client", "-S"], check=False)
+    for fresh in (False, True):
+        session_id = session_id_at(index, fresh)
+        if not session_id:
+            return
+        # 索引里的 session 已不存在时 switch-client 失败，重建索引后再试一次。
+        if tmux_ok(chain_commands([["switch-client", "-t", session_id], ["refresh-client", "-S"]])):
+            return
 
 
 def command_rename(label: str) -> None:
@@ -175,6 +276,11 @@ def command_created() -> None:
     command_ensure()
 
 
+def command_check() -> None:
+    # Called after a session is closed; drops it from the order index (numbering is left as is).
+    rebuild_order()
+
+
 def command_move_window_to_session(index_str: str, client: Optional[str] = None) -> None:
     try:
         index = int(index_str)
@@ -182,19 +288,190 @@ def command_move_window_to_session(index_str: str, client: Optional[str] = None)
         return
     if index < 1:
         return
-    sessions = list_sessions()
-    if index > len(sessions):
+    target_session_id = session_id_at(index)
+    if not target_session_id:
         return
-    target_session_id = sessions[index - 1]["id"]
     source_window_id = current_window_id(client)
     if not source_window_id:
         return
     current_id = current_session_id(client)
     if target_session_id != current_id:
-        run_tmux(["move-window", "-s", source_window_id, "-t", f"{target_session_id}:"], check=False)
+        moved = tmux_ok(["move-window", "-s", source_window_id, "-t", f"{target_session_id}:"])
+        if not moved:
+            # 目标可能是索引里已关闭的 session：重建索引后再试一次。
+            fresh_id = session_id_at(index, fresh=True)
+            if fresh_id and fresh_id != target_session_id:
+                target_session_id = fresh_id
+                if target_session_id != current_id:
+                    tmux_ok(["move-window", "-s", source_window_id, "-t", f"{target_session_id}:"])
     run_tmux(["switch-client", "-t", target_session_id], check=False)
 
 
+# serve 把 FIFO 路径写在这个全局选项里；switch_session_relative.sh 读到它就只写一行请求。
+FIFO_OPTION = "@session_manager_fifo"
+LATENCY_LOG_LIMIT = 1 << 20
+
+
+def run_path(suffix: str) -> str:
+    server = os.environ.get("TMUX", "").partition(",")[0] or "default"
+    key = hashlib.sha1(server.encode("utf-8")).hexdigest()[:12]
+    return os.path.expanduser(f"~/.config/tmux/run/session_manager/{key}{suffix}")
+
+
+def relative_target(client: str, delta: int) -> str:
+    ids = session_order()
+    current = current_session_id(client or None)
+    if current not in ids:
+        ids = rebuild_order()
+    if len(ids) <= 1 or current not in ids:
+        return ""
+    return ids[(ids.index(current) + delta) % len(ids)]
+
+
+class KeyServer:
+    """合并连发的相对切换：每个 client 只保留累计的偏移量，执行一次最终的 switch-client。
+
+    switch-client 执行期间到达的请求继续累加，下一轮从切换后的位置出发，
+    所以输入比 tmux 快时中间的目标会被直接跳过。
+    """
+
+    def __init__(self, log_path: str = "") -> None:
+        self.cond = threading.Condition()
+        self.pending: Dict[str, Dict[str, float]] = {}
+        self.stopped = False
+        self.log_path = log_path
+
+    def submit(self, line: str) -> None:
+        parts = line.rstrip("\n").split("\t")
+        if parts[0] == "stop":
+            with self.cond:
+                self.stopped = True
+                self.cond.notify()
+            return
+        if parts[0] != "rel" or len(parts) < 3:
+            return
+        try:
+            delta = int(parts[2])
+        except ValueError:
+            return
+        received = time.time()
+        try:
+            # 按键时间（bash 的 $EPOCHREALTIME）；拿不到时从收到请求算起。
+            sent = float(parts[3]) if len(parts) > 3 and parts[3] else received
+        except ValueError:
+            sent = received
+        with self.cond:
+            entry = self.pending.setdefault(parts[1], {"delta": 0, "sent": sent, "requests": 0})
+            entry["delta"] += delta
+            entry["requests"] += 1
+            self.cond.notify()
+
+    def take(self, timeout: float) -> Optional[Dict[str, Dict[str, float]]]:
+        with self.cond:
+            if not self.pending and not self.stopped:
+                self.cond.wait(timeout)
+            batch, self.pending = self.pending, {}
+            return batch
+
+    def flush(self, client: str, entry: Dict[str, float]) -> str:
+        global _session_order
+        # 每轮都重新读 client 位置和顺序索引：上一轮的 switch-client 已经改变了它们。
+        _client_state.clear()
+        _session_order = None
+        target = relative_target(client, int(entry["delta"]))
+        if target:
+            switch = ["switch-client", "-c", client, "-t", target] if client else ["switch-client", "-t", target]
+            refresh = ["refresh-client", "-t", client, "-S"] if client else ["refresh-client", "-S"]
+            tmux_ok(chain_commands([switch, refresh]))
+        self.log({
+            "ts": round(time.time(), 3),
+            "client": client,
+            "target": target,
+            "delta": int(entry["delta"]),
+            "requests": int(entry["requests"]),
+            "latency_ms": round((time.time() - entry["sent"]) * 1000, 2),
+        })
+        return target
+
+    def log(self, record: Dict[str, object]) -> None:
+        if not self.log_path:
+            return
+        try:
+            if os.path.getsize(self.log_path) > LATENCY_LOG_LIMIT:
+                os.replace(self.log_path, f"{self.log_path}.1")
+        except OSError:
+            pass
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+
+def _pid_alive(path: str) -> bool:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def _read_fifo(path: str, server: KeyServer) -> None:
+    # O_RDWR 让 FIFO 始终有一个写端，按键脚本关闭后这里不会读到 EOF。
+    with os.fdopen(os.open(path, os.O_RDWR), "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            server.submit(line)
+
+
+def command_serve() -> None:
+    fifo_path = run_path(".fifo")
+    pid_path = run_path(".pid")
+    if _pid_alive(pid_path):
+        return
+    os.makedirs(os.path.dirname(fifo_path), exist_ok=True)
+    try:
+        os.unlink(fifo_path)
+    except FileNotFoundError:
+        pass
+    os.mkfifo(fifo_path, 0o600)
+    with open(pid_path, "w", encoding="utf-8") as f:
+        f.write(f"{os.getpid()}\n")
+
+    server = KeyServer(run_path(".latency.jsonl"))
+    threading.Thread(target=_read_fifo, args=(fifo_path, server), daemon=True).start()
+    run_tmux(["set", "-g", FIFO_OPTION, fifo_path], check=False)
+    try:
+        while not server.stopped:
+            batch = server.take(timeout=5.0)
+            if not batch:
+                # 空闲时确认 tmux server 还在；它退出后 daemon 也退出。
+                if not server.stopped and not tmux_ok(["show", "-gqv", FIFO_OPTION]):
+                    break
+                continue
+            for client, entry in batch.items():
+                server.flush(client, entry)
+    finally:
+        tmux_ok(["set", "-gu", FIFO_OPTION])
+        for path in (fifo_path, pid_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def command_stop() -> None:
+    fifo_path = run_path(".fifo")
+    if not _pid_alive(run_path(".pid")):
+        return
+    fd = os.open(fifo_path, os.O_RDWR)
+    try:
+        os.write(fd, b"stop\n")
+    finally:
+        os.close(fd)
+
+
 def main(argv: List[str]) -> None:
     if len(argv) < 2:
         return
@@ -210,6 +487,12 @@ def main(argv: List[str]) -> None:
         command_ensure()
     elif command == "created":
         command_created()
+    elif command == "check":
+        command_check()
+    elif command == "serve":
+        command_serve()
+    elif command == "stop":
+        command_stop()
     elif command == "move-window-to" and len(argv) >= 3:
         client = argv[3] if len(argv) >= 4 else None
         command_move_window_to_session(argv[2], client)
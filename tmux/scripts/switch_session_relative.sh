@@ -8,6 +8,25 @@ if [[ "${direction}" != "left" && "${direction}" != "right" ]]; then
   exit 0
 fi
 
+# 常驻 key server（session_manager.py serve）在跑时只把请求写进它的 FIFO：
+# 连按时由它合并成一次最终的 switch-client，不再每次都起进程查询/切换。
+fifo="$(tmux show -gqv @session_manager_fifo 2>/dev/null || true)"
+if [[ -n "${fifo}" && -p "${fifo}" ]]; then
+  pid=""
+  read -r pid <"${fifo%.fifo}.pid" 2>/dev/null || true
+  if [[ -n "${pid}" ]] && kill -0 "${pid}" 2>/dev/null; then
+    if [[ "${direction}" == "left" ]]; then
+      delta=-1
+    else
+      delta=1
+    fi
+    exec 3<>"${fifo}"
+    printf 'rel\t%s\t%s\t%s\n' "${client}" "${delta}" "${EPOCHREALTIME:-}" >&3
+    exec 3>&-
+    exit 0
+  fi
+fi
+
 current_session_name="$(
   if [[ -n "${client}" ]]; then
     tmux display-message -p -c "${client}" "#{client_session}" 2>/dev/null || true
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Codex turn-complete markers, one SQLite table (WAL) instead of one JSON file per pane.
+
+Every operation is an indexed query: add/ack by pane id (primary key) and per-window lookup
+by (server pid, window id). GC is incremental and rate limited: `gc_claim` lets at most one
+step run per interval, and each `gc_step` checks the next batch of markers after a cursor
+kept in the database, so every marker is checked once per epoch (one pass over the table)
+and a step costs the same at 10 or 10k markers. Legacy `<dir>/<pane>` JSON files are
+imported once and removed the first time the store is opened.
+
+Usage:
+  turn_markers.py ack PANE_ID [WINDOW_PANE_ID...]
+      Remove PANE_ID's marker and print `<acked 0|1>\\t<others 0|1>\\t<thread id>`, where
+      `others` says whether any of the WINDOW_PANE_IDs still has a marker. Exit 0 only when
+      a marker was removed.
+  turn_markers.py has PANE_ID...
+      Exit 0 when any of the panes has a marker.
+  turn_markers.py gc [--force]
+      Run one GC step against the current tmux server unless one ran within the interval.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Iterable
+
+
+TURN_COMPLETE_DIR = os.path.expanduser(
+    os.environ.get("CODEX_TMUX_TURN_COMPLETE_DIR", "~/.config/tmux/run/codex-turn-complete")
+)
+DB_NAME = "markers.sqlite3"
+SCHEMA_VERSION = 2
+BUSY_TIMEOUT_SECONDS = 1.0
+# `DELETE ... RETURNING` needs SQLite 3.35; older system Pythons (macOS) take the SELECT+DELETE path.
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+TMUX_TIMEOUT_SECONDS = 1.0
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(float(value))
+    except ValueError:
+        return default
+
+
+GC_INTERVAL_SECONDS = max(0, _env_int("CODEX_TMUX_TURN_COMPLETE_GC_INTERVAL_SECONDS", 60))
+GC_BATCH = max(1, _env_int("CODEX_TMUX_TURN_COMPLETE_GC_BATCH", 200))
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS markers (
+        pane_id TEXT PRIMARY KEY,
+        window_id TEXT NOT NULL DEFAULT '',
+        server_pid TEXT NOT NULL DEFAULT '',
+        thread_id TEXT NOT NULL DEFAULT '',
+        created_at INTEGER NOT NULL DEFAULT 0,
+        payload TEXT NOT NULL DEFAULT '{}'
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS markers_window ON markers (server_pid, window_id)",
+    "CREATE INDEX IF NOT EXISTS markers_created ON markers (created_at)",
+    # Single-row GC bookkeeping: last step time, resume cursor (a pane id) and epoch count.
+    """CREATE TABLE IF NOT EXISTS gc_state (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        last_run REAL NOT NULL DEFAULT 0,
+        cursor TEXT NOT NULL DEFAULT '',
+        epoch INTEGER NOT NULL DEFAULT 0
+    )""",
+    "INSERT OR IGNORE INTO gc_state (id) VALUES (0)",
+]
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+class MarkerStore:
+    def __init__(self, directory: str | None = None) -> None:
+        directory = directory or TURN_COMPLETE_DIR
+        self.directory = directory
+        self.path = os.path.join(directory, DB_NAME)
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit; writes that must be atomic open their own transaction.
+        self.db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._migrate()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "MarkerStore":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def _migrate(self) -> None:
+        """Create the schema and import (then delete) legacy one-file-per-pane markers."""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock.
+            if self.db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                self.db.execute("COMMIT")
+                return
+            for statement in SCHEMA:
+                self.db.execute(statement)
+            imported = []
+            for name in os.listdir(self.directory):
+                if not name.startswith("%"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = None
+                if isinstance(data, dict):
+                    data.setdefault("pane-id", name)
+                    self._insert(data, replace=False)
+                imported.append(path)
+            self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        for path in imported:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _insert(self, marker: dict[str, Any], *, replace: bool = True) -> None:
+        created_at = marker.get("created-at")
+        self.db.execute(
+            f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO markers"
+            " (pane_id, window_id, server_pid, thread_id, created_at, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                _text(marker.get("pane-id")),
+                _text(marker.get("window-id")),
+                _text(marker.get("tmux-server-pid")),
+                _text(marker.get("thread-id")),
+                created_at if isinstance(created_at, int) else 0,
+                json.dumps(marker, ensure_ascii=False),
+            ),
+        )
+
+    def add(self, marker: dict[str, Any]) -> None:
+        """Insert or replace the marker of `marker["pane-id"]`."""
+        self._insert(marker)
+
+    def add_many(self, markers: Iterable[dict[str, Any]]) -> None:
+        """`add` for several markers in one transaction."""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for marker in markers:
+                self._insert(marker)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def get(self, pane_id: str) -> dict[str, Any] | None:
+        row = self.db.execute("SELECT payload FROM markers WHERE pane_id = ?", (pane_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ack(self, pane_id: str) -> dict[str, Any] | None:
+        """Remove and return the pane's marker (None when it had none)."""
+        if HAS_RETURNING:
+            row = self.db.execute("DELETE FROM markers WHERE pane_id = ? RETURNING payload", (pane_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT payload FROM markers WHERE pane_id = ?", (pane_id,)).fetchone()
+            if row:
+                self.db.execute("DELETE FROM markers WHERE pane_id = ?", (pane_id,))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return json.loads(row[0]) if row else None
+
+    def has_any(self, pane_ids: Iterable[str]) -> bool:
+        ids = list(pane_ids)
+        if not ids:
+            return False
+        marks = ",".join("?" * len(ids))
+        return self.db.execute(f"SELECT 1 FROM markers WHERE pane_id IN ({marks}) LIMIT 1", ids).fetchone() is not None
+
+    def panes_in_window(self, server_pid: str, window_id: str) -> list[str]:
+        rows = self.db.execute(
+            "SELECT pane_id FROM markers WHERE server_pid = ? AND window_id = ?", (server_pid, window_id)
+        )
+        return [row[0] for row in rows]
+
+    def gc_claim(self, interval_seconds: float = GC_INTERVAL_SECONDS, *, now: float | None = None) -> bool:
+        """Record a GC run and return True, unless one was recorded less than the interval ago."""
+        now = time.time() if now is None else now
+        claimed = self.db.execute(
+            "UPDATE gc_state SET last_run = ? WHERE id = 0 AND (last_run <= ? OR last_run > ?)",
+            # A last_run in the future (clock moved back) does not block GC forever.
+            (now, now - interval_seconds, now),
+        ).rowcount
+        return claimed == 1
+
+    def gc_step(
+        self,
+        *,
+        current_server_pid: str,
+        live_pane_ids: set[str] | None,
+        ttl_seconds: int = 0,
+        batch: int = GC_BATCH,
+    ) -> tuple[int, int]:
+        """Check the next `batch` markers after the cursor; return (checked, removed).
+
+        Deletes markers of other tmux servers, of panes that are gone, and older than the
+        TTL. Reaching the end of the table resets the cursor and starts a new epoch.
+        """
+        expire_before = int(time.time()) - ttl_seconds if ttl_seconds > 0 else 0
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.db.execute("SELECT cursor FROM gc_state WHERE id = 0").fetchone()[0]
+            rows = self.db.execute(
+                "SELECT pane_id, server_pid, created_at FROM markers WHERE pane_id > ? ORDER BY pane_id LIMIT ?",
+                (cursor, batch),
+            ).fetchall()
+            stale = [
+                (pane_id,)
+                for pane_id, server_pid, created_at in rows
+                if (current_server_pid and server_pid and server_pid != current_server_pid)
+                or (live_pane_ids is not None and pane_id not in live_pane_ids)
+                or (expire_before and 0 < created_at < expire_before)
+            ]
+            self.db.executemany("DELETE FROM markers WHERE pane_id = ?", stale)
+            if len(rows) < batch:
+                self.db.execute("UPDATE gc_state SET cursor = '', epoch = epoch + 1 WHERE id = 0")
+            else:
+                self.db.execute("UPDATE gc_state SET cursor = ? WHERE id = 0", (rows[-1][0],))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return len(rows), len(stale)
+
+
+def _tmux(args: list[str], socket: str | None) -> str | None:
+    argv = ["tmux", *(["-S", socket] if socket else []), *args]
+    try:
+        result = subprocess.run(
+            argv,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=TMUX_TIMEOUT_SECONDS,
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout
+
+
+def gc_ttl_seconds() -> int:
+    return max(0, _env_int("CODEX_TMUX_TURN_COMPLETE_TTL_SECONDS", 0))
+
+
+def run_gc(
+    *,
+    current_server_pid: str,
+    list_panes: Callable[[], str | None],
+    directory: str | None = None,
+    force: bool = False,
+) -> tuple[int, int] | None:
+    """One scheduled GC step; None when a step already ran within the interval.
+
+    `list_panes` (the `list-panes -a -F '#{pane_id}'` output) is only called when the step runs.
+    """
+    if not current_server_pid:
+        return None
+    with MarkerStore(directory) as store:
+        if not store.gc_claim(0 if force else GC_INTERVAL_SECONDS):
+            return None
+        out = list_panes()
+        pane_ids = {line.strip() for line in out.splitlines() if line.strip()} if out else None
+        return store.gc_step(current_server_pid=current_server_pid, live_pane_ids=pane_ids, ttl_seconds=gc_ttl_seconds())
+
+
+def main(argv: list[str]) -> int:
+    if argv[1:2] == ["gc"]:
+        socket = os.environ.get("TMUX", "").partition(",")[0] or None
+        try:
+            server_pid = (_tmux(["display-message", "-p", "#{pid}"], socket) or "").strip()
+            run_gc(
+                current_server_pid=server_pid,
+                list_panes=lambda: _tmux(["list-panes", "-a", "-F", "#{pane_id}"], socket),
+                force="--force" in argv[2:],
+            )
+        except (OSError, sqlite3.Error):
+            return 1
+        return 0
+    if len(argv) < 3 or argv[1] not in ("ack", "has"):
+        print(__doc__.split("Usage:", 1)[1].rstrip(), file=sys.stderr)
+        return 2
+    try:
+        with MarkerStore() as store:
+            if argv[1] == "has":
+                return 0 if store.has_any(argv[2:]) else 1
+            marker = store.ack(argv[2])
+            others = store.has_any(pane for pane in argv[3:] if pane != argv[2])
+    except (OSError, sqlite3.Error):
+        return 1
+    thread_id = _text(marker.get("thread-id")).strip() if marker else ""
+    print(f"{int(marker is not None)}\t{int(others)}\t{thread_id}")
+    return 0 if marker is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -10,18 +10,79 @@ fallback_dir() {
   [[ -n "$last_dir" ]] && printf '%s' "$last_dir" || printf '%s' "$path"
 }
 
-if ! command -v git >/dev/null 2>&1; then
-  fallback_dir
-  exit 0
+# 与 git_meta.py 相同的规则，只用 bash 内建：向上找 .git（目录，或 worktree/submodule 的 `gitdir:` 文件）。
+# 返回 0=找到（git_top/git_dir），1=不在 repo 里，2=布局不认识，交给 git。
+git_top=""
+git_dir=""
+find_repo() {
+  local dir line
+  [[ -z "${GIT_DIR:-}" && -z "${GIT_WORK_TREE:-}" ]] || return 2
+  # 与 `git rev-parse --show-toplevel` 一样解析符号链接。
+  cd -P -- "$path" 2>/dev/null || return 1
+  dir="$PWD"
+  while :; do
+    if [[ -d "$dir/.git" ]]; then
+      git_top="$dir"
+      git_dir="$dir/.git"
+      return 0
+    fi
+    if [[ -f "$dir/.git" ]]; then
+      line=""
+      IFS= read -r line <"$dir/.git" || true
+      [[ "$line" == gitdir:* ]] || return 2
+      line="${line#gitdir:}"
+      line="${line#"${line%%[![:space:]]*}"}"
+      [[ "$line" == /* ]] || line="$dir/$line"
+      git_top="$dir"
+      git_dir="$line"
+      return 0
+    fi
+    [[ "$dir" == "/" ]] && return 1
+    dir="${dir%/*}"
+    [[ -n "$dir" ]] || dir="/"
+  done
+}
+
+# 直接读 HEAD 设置 branch（detached 时为空）；返回 2 表示需要 git。
+branch=""
+head_branch() {
+  local head="" ref
+  IFS= read -r head <"$git_dir/HEAD" 2>/dev/null || [[ -n "$head" ]] || return 2
+  head="${head%"${head##*[![:space:]]}"}"
+  if [[ "$head" == ref:* ]]; then
+    ref="${head#ref:}"
+    ref="${ref#"${ref%%[![:space:]]*}"}"
+    # 同 git_meta.read_head：只认 refs/heads/；reftable 的占位 .invalid 和其他符号引用交给 git。
+    [[ "$ref" == refs/heads/* && "$ref" != "refs/heads/.invalid" ]] || return 2
+    branch="${ref#refs/heads/}"
+    return 0
+  fi
+  [[ "$head" =~ ^[0-9a-f]{40}([0-9a-f]{24})?$ ]] || return 2
+}
+
+start_dir="$PWD"
+status=0
+find_repo || status=$?
+top="$git_top"
+if [[ "$status" == 0 ]]; then
+  head_branch || status=$?
+fi
+
+if [[ "$status" == 2 ]]; then
+  if ! command -v git >/dev/null 2>&1; then
+    fallback_dir
+    exit 0
+  fi
+  cd -- "$start_dir"
+  top="$(git -C "$path" rev-parse --show-toplevel 2>/dev/null || true)"
+  branch="$(git -C "$path" symbolic-ref --quiet --short HEAD 2>/dev/null || true)"
 fi
 
-top="$(git -C "$path" rev-parse --show-toplevel 2>/dev/null || true)"
 if [[ -z "$top" ]]; then
   fallback_dir
   exit 0
 fi
 
-branch="$(git -C "$path" symbolic-ref --quiet --short HEAD 2>/dev/null || true)"
 if [[ -n "$branch" ]]; then
   printf '%s' "$branch"
   exit 0
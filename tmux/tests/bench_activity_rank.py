@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Benchmarks for activity_rank.py.
+
+Usage: python3 tests/bench_activity_rank.py [--bench classify,rows,scale] [--panes 5000] [--repeat 5]
+                                             [--sizes 10,100,1000,10000] [--depth 24]
+
+`classify` compares the pre-cache classifier (two regexes, repeated normalization, every pane
+classified by rank_windows and again by rank_panes) with classify_panes() on synthetic panes.
+`rows` measures bytes per PaneDetail (slotted) against the same fields in a plain dataclass
+carrying the kind/bucket/mark attributes that ranking used to set on every row.
+`scale` builds a synthetic server per size (4 panes per window, 8 windows per session, every
+pane owning a process chain `--depth` deep) and, with the tmux listing and the process table
+stubbed, reports time and peak traced memory of each ranking stage. The per-pane columns
+should stay flat as the size grows; a rising `us/pane` marks super-linear behavior.
+"""
+
+import argparse
+import dataclasses
+import importlib.util
+import os
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "activity_rank.py"
+sys.path.insert(0, str(MODULE_PATH.parent))
+
+COMMANDS = [
+    ("zsh", "shell", "zsh"),
+    ("node", "vite dev server", "node node_modules/vite/bin/vite.js --host"),
+    ("zsh", "codex agent", "zsh node /usr/local/bin/codex --model o3"),
+    ("pytest", "tests", "python3 -m pytest -q tests"),
+    ("nvim", "README.md", "nvim README.md"),
+    ("node", "storybook", "node node_modules/.bin/storybook dev -p 6006"),
+    ("zsh", "claude", "zsh claude --resume"),
+    ("make", "build", "make -j8 all cc -O2 -c src/main.c"),
+]
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("activity_rank", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_panes(activity_rank, count: int):
+    panes = []
+    process_text = {}
+    for index in range(count):
+        command, title, proc = COMMANDS[index % len(COMMANDS)]
+        window = index // 4
+        pane_id = f"%{index}"
+        panes.append(
+            activity_rank.PaneDetail(
+                f"${window // 8}", f"{window // 8}-s", f"@{window}", window % 8, title,
+                pane_id, index % 4, command, title, f"/repo/{window}",
+                1_700_000_000 + (index * 7919) % 100_000, index % 3 == 0, index % 41 == 0,
+                False, False, 10_000 + index,
+            )
+        )
+        process_text[pane_id] = f"{proc} --worker {index % 13}"
+    return panes, process_text
+
+
+def legacy_pane_kind(activity_rank, pane, process_text) -> str:
+    norm = activity_rank._norm
+    direct = norm(f"{pane.command} {pane.title}")
+    if activity_rank.AGENT_RE.search(direct):
+        return "agent"
+    proc = process_text.get(pane.pane_id, "") or process_text.get(pane.pane_pid, "")
+    text = norm(f"{direct} {norm(proc)}")
+    if activity_rank.AGENT_RE.search(text):
+        return "agent"
+    if activity_rank.NOISE_RE.search(text):
+        return "noise"
+    return "normal"
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_classify(activity_rank, count: int, repeat: int) -> None:
+    panes, process_text = synthetic_panes(activity_rank, count)
+    legacy = {pane.pane_id: legacy_pane_kind(activity_rank, pane, process_text) for pane in panes}
+    if legacy != activity_rank.classify_panes(panes, process_text):
+        raise SystemExit("classify_panes disagrees with the legacy classifier")
+
+    def run_legacy() -> None:
+        # rank_windows and rank_panes each classified every pane.
+        for _ in range(2):
+            for pane in panes:
+                legacy_pane_kind(activity_rank, pane, process_text)
+
+    def run_cold() -> None:
+        activity_rank._KIND_CACHE.clear()
+        activity_rank.classify_panes(panes, process_text)
+
+    def run_warm() -> None:
+        activity_rank.classify_panes(panes, process_text)
+
+    legacy_seconds = best_of(repeat, run_legacy)
+    cold_seconds = best_of(repeat, run_cold)
+    warm_seconds = best_of(repeat, run_warm)
+    print(f"classify {count} panes")
+    print(f"  legacy (2 passes)   {legacy_seconds * 1000:8.2f} ms")
+    print(f"  classify_panes cold {cold_seconds * 1000:8.2f} ms  {legacy_seconds / cold_seconds:5.2f}x")
+    print(f"  classify_panes warm {warm_seconds * 1000:8.2f} ms  {legacy_seconds / warm_seconds:5.2f}x")
+
+
+def synthetic_listing(count: int) -> str:
+    """A `list-panes -a -F SNAPSHOT_FMT` reply for `count` panes."""
+    lines = []
+    for index in range(count):
+        command, title, _proc = COMMANDS[index % len(COMMANDS)]
+        window = index // 4
+        session = window // 8
+        fields = [
+            f"${session}", f"{session}-s", str(1_700_000_000 + session), f"@{window}", str(window % 8), title,
+            str(1_700_000_000 + (index * 7919) % 100_000), "1" if index % 3 == 0 else "0", "1" if index % 41 == 0 else "",
+            "1" if window % 8 == 0 else "0", "0", f"%{index}", str(index % 4), command, title, f"/repo/{window}",
+            str(10_000 + index), "1" if index % 4 == 0 else "0",
+        ]
+        lines.append("\t".join(fields) + "\n")
+    return "".join(lines)
+
+
+def synthetic_process_table(count: int, depth: int) -> tuple[dict[int, list[int]], dict[int, str]]:
+    """Every pane pid (10000 + i) owns a chain of `depth` descendants."""
+    children: dict[int, list[int]] = {}
+    commands: dict[int, str] = {}
+    next_pid = 10_000_000
+    for index in range(count):
+        _command, _title, proc = COMMANDS[index % len(COMMANDS)]
+        parent = 10_000 + index
+        commands[parent] = f"-zsh {index % 13}"
+        for level in range(depth):
+            children.setdefault(parent, []).append(next_pid)
+            commands[next_pid] = proc if level == depth - 1 else f"sh -c step-{level}"
+            parent = next_pid
+            next_pid += 1
+    return children, commands
+
+
+def measure(repeat: int, fn) -> tuple[float, int]:
+    """Best wall time over `repeat` runs, then peak traced bytes of one more run."""
+    seconds = best_of(repeat, fn)
+    tracemalloc.start()
+    fn()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_scale(activity_rank, sizes: list[int], depth: int, repeat: int) -> None:
+    # Stub both collectors: the tmux reply and the full process table (the /proc index is disabled).
+    os.environ["TMUX_ACTIVITY_PROC_INDEX"] = ""
+    print(f"scale (process depth {depth}; ms / peak KiB / us per pane)")
+    print(f"{'panes':>7}  {'stage':<22}{'ms':>10}  {'peak KiB':>10}  {'us/pane':>8}")
+    for count in sizes:
+        listing = synthetic_listing(count)
+        table = synthetic_process_table(count, depth)
+        activity_rank._tmux_batch = lambda commands, server="", listing=listing: [listing for _ in commands]
+        activity_rank._process_table = lambda table=table: table
+        snapshot = activity_rank.collect_snapshot()
+        process_text = activity_rank.process_text_for_panes(snapshot.panes)
+
+        def cold(fn):
+            def run():
+                activity_rank._KIND_CACHE.clear()
+                fn()
+            return run
+
+        stages = [
+            ("collect_snapshot", activity_rank.collect_snapshot),
+            ("process_text_for_panes", lambda: activity_rank.process_text_for_panes(snapshot.panes)),
+            ("rank_windows", cold(lambda: activity_rank.rank_windows(snapshot.windows, snapshot.panes, process_text))),
+            ("rank_sessions", cold(lambda: activity_rank.rank_sessions(snapshot.sessions, snapshot.windows, snapshot.panes, process_text))),
+            ("rank_panes", cold(lambda: activity_rank.rank_panes(snapshot.details, process_text))),
+        ]
+        for name, fn in stages:
+            seconds, peak = measure(repeat, fn)
+            print(f"{count:>7}  {name:<22}{seconds * 1000:>10.2f}  {peak / 1024:>10.1f}  {seconds * 1e6 / count:>8.2f}")
+
+
+def bytes_per_row(count: int, make) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    rows = [make(index) for index in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del rows
+    return total / count
+
+
+def bench_rows(activity_rank, count: int) -> None:
+    fields = [(field.name, field.type, field) for field in dataclasses.fields(activity_rank.PaneDetail)]
+    legacy_cls = dataclasses.make_dataclass("LegacyPaneDetail", [(name, kind, dataclasses.field(default=field.default)) for name, kind, field in fields])
+    values = ("$1", "1-s", "@1", 1, "editor", "%1", 0, "zsh", "shell", "/repo", 1_700_000_000, True, False, False, False, 101, False)
+
+    def make_legacy(index: int):
+        row = legacy_cls(*values)
+        row.mark, row.kind, row.bucket = " ", "normal", 1
+        return row
+
+    def make_slotted(index: int):
+        return activity_rank.PaneDetail(*values)
+
+    legacy = bytes_per_row(count, make_legacy)
+    slotted = bytes_per_row(count, make_slotted)
+    print(f"rows {count} PaneDetail")
+    print(f"  dataclass + rank attrs {legacy:8.1f} B/row")
+    print(f"  slotted                {slotted:8.1f} B/row  {legacy / slotted:5.2f}x smaller")
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--panes", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--bench", default="classify,rows,scale")
+    ap.add_argument("--sizes", default="10,100,1000,10000")
+    ap.add_argument("--depth", type=int, default=24)
+    args = ap.parse_args(argv)
+    benches = {part.strip() for part in args.bench.split(",") if part.strip()}
+    activity_rank = load_module()
+    if "classify" in benches:
+        bench_classify(activity_rank, args.panes, args.repeat)
+    if "rows" in benches:
+        bench_rows(activity_rank, args.panes)
+    if "scale" in benches:
+        sizes = [int(part) for part in args.sizes.split(",") if part.strip()]
+        bench_scale(activity_rank, sizes, args.depth, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""End-to-end cost of the Codex notify hook chain, per stage, against fake tools.
+
+Usage: python3 tests/bench_notify_chain.py [--payloads FILE.jsonl] [--repeat 5] [--platform darwin|native]
+
+Replays `agent-turn-complete` payloads (the built-in samples, or one JSON object per line
+from `--payloads`, e.g. copied out of a notify log) through every stage of the chain:
+
+  interpreter      `python -c pass`, the floor every stage pays
+  handler          codex_notify_handler.py on its own
+  autorun          codex_notify_tmux_autorun.py on its own
+  chain            codex_notify_agent_turn_complete.py (in-process fan-out)
+  chain-isolated   the same with CODEX_NOTIFY_ISOLATE=1 (one interpreter per subhandler)
+
+tmux, git, osascript and terminal-notifier are fake executables on PATH (in the style of
+tests/test_codex_panel_scripts.py) that log every call; HOME is a temp dir so markers,
+spool and autorun state never touch the real config. `--platform darwin` (default) makes
+every interpreter report `sys.platform == "darwin"` through a sitecustomize on PYTHONPATH,
+so the macOS-only notification path runs on Linux too; the same sitecustomize counts
+interpreters. Per stage the report shows median / max wall time, the import time of the
+modules the stage's first interpreter loads (`-X importtime`, summed self time), and the
+median number of interpreters and fake tool executions per run. The removal reaper is
+shared across runs, so it shows up only in the run that first starts it. The handler's
+coalescing wait (the CODEX_NOTIFY_COALESCE_QUIET_MS gap for a lone event, at most
+CODEX_NOTIFY_COALESCE_MS) is part of its wall time; set them in the environment to see the
+chain without it.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+TOOLS = ("tmux", "git", "osascript", "terminal-notifier")
+STAGE_SCRIPTS = {
+    "handler": "codex_notify_handler.py",
+    "autorun": "codex_notify_tmux_autorun.py",
+    "chain": "codex_notify_agent_turn_complete.py",
+    "chain-isolated": "codex_notify_agent_turn_complete.py",
+}
+# What each stage's first interpreter imports. Import time is measured on these in a
+# separate `-X importtime` run: the dispatcher imports its subhandlers with importlib, which
+# `-X importtime` does not time, and the flag would also skew the timed runs.
+STAGE_MODULES = {
+    "interpreter": [],
+    "handler": ["codex_notify_handler"],
+    "autorun": ["codex_notify_tmux_autorun"],
+    "chain": ["codex_notify_agent_turn_complete", "codex_notify_handler", "codex_notify_tmux_autorun"],
+    "chain-isolated": ["codex_notify_agent_turn_complete"],
+}
+
+SAMPLE_PAYLOADS = [
+    {
+        "type": "agent-turn-complete",
+        "thread-id": "019dd4f7-8dc0-7111-aabf-3b7a3697600f",
+        "turn-id": "1",
+        "input-messages": ["fix the failing test"],
+        "last-assistant-message": "Fixed the off-by-one in the parser; tests pass.",
+    },
+    {
+        "type": "agent-turn-complete",
+        "thread-id": "019dd4f7-8dc0-7111-aabf-3b7a3697600f",
+        "turn-id": "2",
+        "input-messages": ["keep going"],
+        "last-assistant-message": "Step 2 of 3 done.\n\n[tmux] continue with step 3 remaining=3",
+    },
+    {
+        "type": "agent-turn-complete",
+        "thread-id": "019dd4f8-0000-7000-8000-000000000001",
+        "turn-id": "1",
+        "input-messages": ["summarize the diff"],
+        "last-assistant-message": "Summary:\n" + "- changed a file\n" * 40,
+    },
+]
+
+SITECUSTOMIZE = """
+import os, sys
+_log = os.environ.get("BENCH_PYTHON_LOG")
+if _log:
+    with open(_log, "a") as _f:
+        _f.write(f"{os.getpid()}\\n")
+if os.environ.get("BENCH_PLATFORM") == "darwin":
+    sys.platform = "darwin"
+"""
+
+FAKE_TOOL = """
+#!/bin/sh
+printf '%s\\n' "$(basename "$0")" >> "$BENCH_CALL_LOG"
+"""
+
+FAKE_TMUX = FAKE_TOOL + r"""
+case "$*" in
+  *list-clients*) printf '/dev/ttys001\t/dev/ttys001\t%%3\tattached,focused\n' ;;
+  *list-panes*) printf '%%3\n' ;;
+  *'#{pane_mode}') printf '\n' ;;
+  *'#{pane_id}') printf '%%3\n' ;;
+  *display-message*) printf '%%3\t$1\t@2\t4242\tmain\tcodex\n' ;;
+  *capture-pane*) printf '\342\200\272 \n' ;;
+esac
+"""
+
+FAKE_GIT = FAKE_TOOL + """
+case "$*" in
+  *--show-toplevel*) pwd ;;
+  *--abbrev-ref*) printf 'feature\\n' ;;
+esac
+"""
+
+FAKE_OSASCRIPT = FAKE_TOOL + """
+case "$*" in
+  *frontmost*) printf 'com.googlecode.iterm2\\n' ;;
+esac
+"""
+
+
+def write_executable(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(textwrap.dedent(content).lstrip(), encoding="utf-8")
+    path.chmod(0o755)
+
+
+def load_payloads(path: str) -> list[dict]:
+    if not path:
+        return SAMPLE_PAYLOADS
+    payloads = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                payload = json.loads(line)
+                if isinstance(payload, dict):
+                    payloads.append(payload)
+    return payloads
+
+
+def make_sandbox(tmp: Path, platform: str) -> tuple[dict, Path]:
+    fake_bin = tmp / "bin"
+    write_executable(fake_bin / "tmux", FAKE_TMUX)
+    write_executable(fake_bin / "git", FAKE_GIT)
+    write_executable(fake_bin / "osascript", FAKE_OSASCRIPT)
+    write_executable(fake_bin / "terminal-notifier", FAKE_TOOL)
+    site = tmp / "site"
+    site.mkdir()
+    (site / "sitecustomize.py").write_text(SITECUSTOMIZE, encoding="utf-8")
+    repo = tmp / "repo"
+    (repo / ".git").mkdir(parents=True)
+    (repo / ".git" / "HEAD").write_text("ref: refs/heads/feature\n", encoding="utf-8")
+
+    env = os.environ.copy()
+    env.update(
+        {
+            "HOME": str(tmp / "home"),
+            "PATH": f"{fake_bin}:{env.get('PATH', '')}",
+            "PYTHONPATH": str(site),
+            "BENCH_PLATFORM": platform,
+            "TMUX": f"{tmp / 'tmux.sock'},4242,0",
+            "TMUX_PANE": "%3",
+            "CODEX_NOTIFY_AUTO_REMOVE_DELAY_SECONDS": "0.1",
+            "CODEX_NOTIFY_REAPER_IDLE_SECONDS": "2",
+            "CODEX_TMUX_AUTORUN_DEFAULT_REMAINING": "1000000",
+        }
+    )
+    env.pop("CODEX_NOTIFY_ISOLATE", None)
+    return env, repo
+
+
+def stage_argv(python: str, stage: str, payload_json: str) -> list[str]:
+    if stage == "interpreter":
+        return [python, "-c", "pass"]
+    return [python, str(SCRIPTS / STAGE_SCRIPTS[stage]), payload_json]
+
+
+def import_ms(python: str, stage: str, env: dict) -> float:
+    code = "".join(f"import {module}\n" for module in STAGE_MODULES[stage]) or "pass"
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        env=dict(env, PYTHONPATH=f"{env['PYTHONPATH']}:{SCRIPTS}", BENCH_PYTHON_LOG=""),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        timeout=30,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            total_us += int(fields[0])
+        except (ValueError, IndexError):
+            continue
+    return total_us / 1000
+
+
+def count_lines(path: Path) -> list[str]:
+    try:
+        return path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def run_once(python: str, stage: str, payload: dict, env: dict, logs: Path, run: int) -> dict:
+    call_log = logs / f"calls-{run}.log"
+    python_log = logs / f"python-{run}.log"
+    run_env = dict(env, BENCH_CALL_LOG=str(call_log), BENCH_PYTHON_LOG=str(python_log))
+    if stage == "chain-isolated":
+        run_env["CODEX_NOTIFY_ISOLATE"] = "1"
+
+    start = time.perf_counter()
+    subprocess.run(
+        stage_argv(python, stage, json.dumps(payload)),
+        env=run_env,
+        cwd=payload.get("cwd") or None,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=30,
+    )
+    wall = time.perf_counter() - start
+
+    calls = count_lines(call_log)
+    sample = {
+        "wall_ms": wall * 1000,
+        "import_ms": import_ms(python, stage, env),
+        "pythons": len(count_lines(python_log)),
+    }
+    for tool in TOOLS:
+        sample[tool] = calls.count(tool)
+    return sample
+
+
+def summarize(stage: str, samples: list[dict]) -> None:
+    walls = [sample["wall_ms"] for sample in samples]
+    imports = statistics.median(sample["import_ms"] for sample in samples)
+    counts = [statistics.median(sample[key] for sample in samples) for key in ("pythons",) + TOOLS]
+    count_cells = "".join(f"{count:>10g}" for count in counts)
+    print(f"{stage:<16}{statistics.median(walls):>10.1f}{max(walls):>10.1f}{imports:>10.1f}{count_cells}")
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--payloads", default="")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--platform", choices=("darwin", "native"), default="darwin")
+    ap.add_argument("--python", default=sys.executable or "python3")
+    ap.add_argument("--stages", default="interpreter,handler,autorun,chain,chain-isolated")
+    args = ap.parse_args(argv)
+
+    payloads = load_payloads(args.payloads)
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    print(f"notify chain, {len(payloads)} payloads x {args.repeat} (ms; counts are medians per run)")
+    header = "".join(f"{name.split('-')[-1]:>10}" for name in ("pythons",) + TOOLS)
+    print(f"{'stage':<16}{'median':>10}{'max':>10}{'import':>10}{header}")
+
+    with tempfile.TemporaryDirectory() as tmp_raw:
+        tmp = Path(tmp_raw)
+        env, repo = make_sandbox(tmp, args.platform)
+        logs = tmp / "logs"
+        logs.mkdir()
+        run = 0
+        for stage in stages:
+            samples = []
+            for repeat in range(args.repeat):
+                for payload in payloads:
+                    run += 1
+                    # A fresh turn id per replay, so autorun does not skip it as already handled.
+                    replay = dict(payload, cwd=str(repo), **{"turn-id": f"{payload.get('turn-id', '')}-{run}"})
+                    samples.append(run_once(args.python, stage, replay, env, logs, run))
+            summarize(stage, samples)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Compare the /proc reader with the `ps` fallback at 10k / 30k / 100k processes.
+
+Usage: python3 tests/bench_proc_table.py [--sizes 1000,10000,30000,100000] [--repeat 3] [--max-spawn N]
+
+Linux only. For each size the benchmark tops the live process table up with idle `sleep`
+children and times `proc_table.read_proc()` against `proc_table.read_ps()` on the same
+table. A fake procfs on disk is not representative (procfs reads never touch storage and a
+real `ps` reads more files per pid), so the processes are real. That is why spawning is
+capped: a size that needs more than `--max-spawn` extra processes (default 2000, or
+`BENCH_PROC_TABLE_MAX_SPAWN`) is skipped, so the 30k / 100k rows only run when asked for,
+e.g. `--max-spawn 100000` on a machine with the pid headroom. Sizes that would leave less
+than 1024 pids below `pid_max` or the user's process limit are skipped too.
+"""
+
+import argparse
+import importlib.util
+import os
+import resource
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "proc_table.py"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("proc_table", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def process_limit() -> int:
+    try:
+        pid_max = int(Path("/proc/sys/kernel/pid_max").read_text().strip())
+    except (OSError, ValueError):
+        pid_max = 32768
+    soft, _hard = resource.getrlimit(resource.RLIMIT_NPROC)
+    if soft == resource.RLIM_INFINITY:
+        return pid_max
+    return min(pid_max, soft)
+
+
+def spawn_sleepers(count: int) -> subprocess.Popen | None:
+    """Start `count` sleeping grandchildren under one shell so teardown is a single killpg."""
+    if count <= 0:
+        return None
+    script = f'i=0; while [ "$i" -lt {count} ]; do sleep 600 & i=$((i + 1)); done; echo ready; wait'
+    proc = subprocess.Popen(["sh", "-c", script], stdout=subprocess.PIPE, text=True, start_new_session=True)
+    assert proc.stdout is not None
+    proc.stdout.readline()
+    return proc
+
+
+def stop_sleepers(proc: subprocess.Popen | None) -> None:
+    if proc is None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,30000,100000")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--max-spawn", type=int, default=int(os.environ.get("BENCH_PROC_TABLE_MAX_SPAWN", "2000")))
+    args = ap.parse_args(argv)
+    proc_table = load_module()
+    if proc_table.read_proc() is None:
+        print("procfs not available; nothing to compare", file=sys.stderr)
+        return 1
+
+    limit = process_limit()
+    print(f"{'processes':>10}  {'/proc (ms)':>11}  {'ps (ms)':>9}  {'speedup':>7}")
+    for size in (int(part) for part in args.sizes.split(",") if part.strip()):
+        baseline = len((proc_table.read_proc() or ({}, {}))[0])
+        if size + 1024 > limit:
+            print(f"{size:>10}  skipped (process limit {limit})")
+            continue
+        if size - baseline > args.max_spawn:
+            print(f"{size:>10}  skipped (needs {size - baseline} processes; pass --max-spawn to allow)")
+            continue
+        sleepers = spawn_sleepers(size - baseline)
+        try:
+            proc_rows = proc_table.read_proc() or ({}, {})
+            ps_rows = proc_table.read_ps()
+            shared = set(proc_rows[0]) & set(ps_rows[0])
+            mismatched = [pid for pid in shared if proc_rows[0][pid] != ps_rows[0][pid]]
+            if mismatched:
+                print(f"{size}: parent pids differ for {len(mismatched)} processes", file=sys.stderr)
+                return 1
+            proc_seconds = best_of(args.repeat, proc_table.read_proc)
+            ps_seconds = best_of(args.repeat, proc_table.read_ps)
+        finally:
+            stop_sleepers(sleepers)
+        print(
+            f"{len(proc_rows[0]):>10}  {proc_seconds * 1000:>11.1f}  {ps_seconds * 1000:>9.1f}"
+            f"  {ps_seconds / proc_seconds:>6.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Per-notification cost of turn-complete marker GC at 100 / 1k / 10k markers.
+
+Usage: python3 tests/bench_turn_markers.py [--sizes 100,1000,10000] [--notifications 200] [--interval 60]
+
+`legacy` is the pre-store GC that ran on every notification: list the marker directory,
+parse each JSON file, stop after 200 kept markers (so stale markers past the cap are never
+collected). `step` runs `gc_step` on every notification (interval 0): one bounded batch
+after the cursor. `scheduled` is what the handler does now: `run_gc` with `--interval`
+seconds between steps while notifications arrive 0.5s apart, so most calls only check the
+last run time. Half of the markers belong to panes that no longer exist; `stale left` is
+what is still on disk / in the table after the whole notification burst.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "turn_markers.py"
+SERVER_PID = "4242"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("turn_markers", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def marker(index: int, now: int) -> dict:
+    return {
+        "type": "agent-turn-complete",
+        "thread-id": f"thread-{index}",
+        "turn-id": f"turn-{index}",
+        "cwd": f"/repo/{index % 50}",
+        "title": "Codex (repo)",
+        "message": "Turn complete " * 8,
+        "tmux-server-pid": SERVER_PID,
+        "pane-id": f"%{index}",
+        "window-id": f"@{index // 4}",
+        "created-at": now,
+    }
+
+
+def live_panes(count: int) -> set[str]:
+    return {f"%{index}" for index in range(0, count, 2)}
+
+
+def legacy_gc(directory: str, current_server_pid: str, pane_ids: set[str]) -> None:
+    entries = os.listdir(directory)
+    count = 0
+    for name in entries:
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = None
+        if name.startswith("%") and name not in pane_ids:
+            os.unlink(path)
+            continue
+        if isinstance(data, dict) and data.get("tmux-server-pid") not in ("", None, current_server_pid):
+            os.unlink(path)
+            continue
+        count += 1
+        if count >= 200:
+            break
+
+
+def summarize(label: str, count: int, samples: list[float], stale_left: int) -> None:
+    median = statistics.median(samples) * 1000
+    worst = max(samples) * 1000
+    total = sum(samples) * 1000
+    print(f"{count:>7}  {label:<10}{median:>10.3f}{worst:>10.3f}{total:>11.1f}  {stale_left:>10}")
+
+
+def bench_legacy(count: int, notifications: int) -> None:
+    now = int(time.time())
+    pane_ids = live_panes(count)
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(count):
+            with open(os.path.join(directory, f"%{index}"), "w", encoding="utf-8") as f:
+                json.dump(marker(index, now), f)
+        samples = []
+        for _ in range(notifications):
+            start = time.perf_counter()
+            legacy_gc(directory, SERVER_PID, pane_ids)
+            samples.append(time.perf_counter() - start)
+        stale_left = sum(1 for name in os.listdir(directory) if name not in pane_ids)
+    summarize("legacy", count, samples, stale_left)
+
+
+def bench_store(turn_markers, count: int, notifications: int, interval: float, label: str) -> None:
+    now = int(time.time())
+    pane_listing = "".join(f"{pane}\n" for pane in sorted(live_panes(count)))
+    with tempfile.TemporaryDirectory() as directory:
+        with turn_markers.MarkerStore(directory) as store:
+            store.db.execute("BEGIN")
+            for index in range(count):
+                store.add(marker(index, now))
+            store.db.execute("COMMIT")
+        samples = []
+        clock = time.time()
+        for _ in range(notifications):
+            clock += 0.5
+            start = time.perf_counter()
+            with mock.patch.object(turn_markers, "GC_INTERVAL_SECONDS", interval), mock.patch.object(
+                turn_markers.time, "time", lambda clock=clock: clock
+            ):
+                turn_markers.run_gc(current_server_pid=SERVER_PID, list_panes=lambda: pane_listing, directory=directory)
+            samples.append(time.perf_counter() - start)
+        with turn_markers.MarkerStore(directory) as store:
+            stale_left = store.db.execute("SELECT count(*) FROM markers").fetchone()[0] - count // 2
+    summarize(label, count, samples, stale_left)
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="100,1000,10000")
+    ap.add_argument("--notifications", type=int, default=200)
+    ap.add_argument("--interval", type=float, default=60.0)
+    args = ap.parse_args(argv)
+    turn_markers = load_module()
+    sizes = [int(part) for part in args.sizes.split(",") if part.strip()]
+    print(f"marker GC, {args.notifications} notifications (ms per notification; batch {turn_markers.GC_BATCH})")
+    print(f"{'markers':>7}  {'mode':<10}{'median':>10}{'max':>10}{'total':>11}  {'stale left':>10}")
+    for count in sizes:
+        bench_legacy(count, args.notifications)
+        bench_store(turn_markers, count, args.notifications, 0.0, "step")
+        bench_store(turn_markers, count, args.notifications, args.interval, "scheduled")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
 import importlib.util
 import io
+import json
+import os
 from pathlib import Path
 import sys
-from contextlib import redirect_stdout
+import tempfile
+import time
+from contextlib import redirect_stderr, redirect_stdout
 import unittest
+from unittest import mock
 
 
 ROOT = Path(__file__).resolve().parents[1]
 MODULE_PATH = ROOT / "scripts" / "activity_rank.py"
+sys.path.insert(0, str(MODULE_PATH.parent))
 
 
 def load_module():
@@ -39,11 +45,11 @@ class ActivityRankTests(unittest.TestCase):
 
         ranked = activity_rank.rank_windows(windows, panes, process_text={})
 
-        self.assertEqual([row.window_id for row in ranked], ["@4", "@3", "@2", "@5", "@1"])
-        self.assertEqual(ranked[0].mark, "✓")
-        self.assertEqual(ranked[1].mark, "•")
-        self.assertEqual(ranked[2].mark, "●")
-        self.assertEqual(ranked[-1].mark, "·")
+        self.assertEqual([row.window_id for row in ranked.rows], ["@4", "@3", "@2", "@5", "@1"])
+        self.assertEqual(ranked.info["@4"].mark, "✓")
+        self.assertEqual(ranked.info["@3"].mark, "•")
+        self.assertEqual(ranked.info["@2"].mark, "●")
+        self.assertEqual(ranked.info["@1"].mark, "·")
 
     def test_activity_time_beats_stale_activity_flag_for_non_noise_windows(self):
         activity_rank = load_module()
@@ -58,7 +64,7 @@ class ActivityRankTests(unittest.TestCase):
 
         ranked = activity_rank.rank_windows(windows, panes, process_text={})
 
-        self.assertEqual([row.window_id for row in ranked], ["@2", "@1"])
+        self.assertEqual([row.window_id for row in ranked.rows], ["@2", "@1"])
 
     def test_sessions_aggregate_best_child_without_letting_noise_dominate(self):
         activity_rank = load_module()
@@ -80,10 +86,10 @@ class ActivityRankTests(unittest.TestCase):
 
         ranked = activity_rank.rank_sessions(sessions, windows, panes, process_text={})
 
-        self.assertEqual([row.session_id for row in ranked], ["$3", "$2", "$1"])
-        self.assertEqual(ranked[0].mark, "✓")
-        self.assertEqual(ranked[1].mark, "●")
-        self.assertEqual(ranked[2].mark, "·")
+        self.assertEqual([row.session_id for row in ranked.rows], ["$3", "$2", "$1"])
+        self.assertEqual(ranked.info["$3"].mark, "✓")
+        self.assertEqual(ranked.info["$2"].mark, "●")
+        self.assertEqual(ranked.info["$1"].mark, "·")
 
     def test_panes_follow_parent_window_rank_and_do_not_force_origin_first(self):
         activity_rank = load_module()
@@ -94,9 +100,9 @@ class ActivityRankTests(unittest.TestCase):
 
         ranked = activity_rank.rank_panes(panes, process_text={}, origin_pane_id="%1")
 
-        self.assertEqual([row.pane_id for row in ranked], ["%2", "%1"])
-        self.assertEqual(ranked[0].mark, "●")
-        self.assertEqual(ranked[1].mark, "·")
+        self.assertEqual([row.pane_id for row in ranked.rows], ["%2", "%1"])
+        self.assertEqual(ranked.info["%2"].mark, "●")
+        self.assertEqual(ranked.info["%1"].mark, "·")
 
     def test_agent_process_tree_activity_is_not_downgraded_by_dev_server_child(self):
         activity_rank = load_module()
@@ -115,9 +121,39 @@ class ActivityRankTests(unittest.TestCase):
 
         ranked = activity_rank.rank_windows(windows, panes, process_text=process_text)
 
-        self.assertEqual([row.window_id for row in ranked], ["@1", "@2"])
-        self.assertEqual(ranked[0].kind, "agent")
-        self.assertEqual(ranked[1].kind, "noise")
+        self.assertEqual([row.window_id for row in ranked.rows], ["@1", "@2"])
+        self.assertEqual(ranked.info["@1"].kind, "agent")
+        self.assertEqual(ranked.info["@2"].kind, "noise")
+
+    def test_single_scan_classifier_matches_separate_agent_and_noise_patterns(self):
+        activity_rank = load_module()
+        texts = [
+            "vite codex",
+            "codex_x vite",
+            "node node_modules/vite/bin/vite.js --host",
+            "zsh claude --resume",
+            "next dev -p 3000 roo",
+            "viteless shell",
+            "",
+        ]
+        for text in texts:
+            expected = "agent" if activity_rank.AGENT_RE.search(text) else "noise" if activity_rank.NOISE_RE.search(text) else "normal"
+            self.assertEqual(activity_rank._classify_text(text), expected, text)
+
+    def test_rank_panes_classifies_each_pane_once(self):
+        activity_rank = load_module()
+        panes = [
+            activity_rank.PaneDetail("$1", "work", "@1", 1, "dev", "%1", 0, "node", "vite dev", "/repo", 500, True, False, False, False, 101),
+            activity_rank.PaneDetail("$1", "work", "@1", 1, "dev", "%2", 1, "zsh", "shell", "/repo", 500, True, False, False, False, 102),
+        ]
+        calls = []
+        classify = activity_rank._classify_text
+        activity_rank._classify_text = lambda text: calls.append(text) or classify(text)
+
+        ranked = activity_rank.rank_panes(panes, process_text={})
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([row.pane_id for row in ranked.rows], ["%2", "%1"])
 
     def test_print_panes_does_not_mutate_mru_state(self):
         activity_rank = load_module()
@@ -135,6 +171,244 @@ class ActivityRankTests(unittest.TestCase):
 
         self.assertEqual(calls, [])
 
+    def test_snapshot_derives_sessions_windows_and_panes_from_one_listing(self):
+        activity_rank = load_module()
+        raw = "".join(
+            "\t".join(fields) + "\n"
+            for fields in [
+                ["$1", "1-work", "900", "@1", "1", "editor", "800", "1", "", "1", "0", "%1", "0", "nvim", "t1", "/repo", "101", "1"],
+                ["$1", "1-work", "900", "@1", "1", "editor", "800", "1", "", "1", "0", "%2", "1", "zsh", "t2", "/repo", "102", "0"],
+                ["$2", "2-agent", "700", "@2", "0", "codex", "700", "0", "1", "0", "1", "%3", "0", "codex", "t3", "/x", "103", "1"],
+            ]
+        )
+
+        snapshot = activity_rank.Snapshot.parse(raw)
+
+        self.assertEqual([(row.session_id, row.activity) for row in snapshot.sessions], [("$1", 900), ("$2", 700)])
+        self.assertEqual([row.window_id for row in snapshot.windows], ["@1", "@2"])
+        self.assertTrue(snapshot.windows[1].codex_unread)
+        self.assertTrue(snapshot.windows[1].zoomed)
+        self.assertEqual([(row.window_id, row.pane_id, row.pane_pid) for row in snapshot.panes], [("@1", "%1", 101), ("@1", "%2", 102), ("@2", "%3", 103)])
+        self.assertEqual(snapshot.details[2].session_name, "2-agent")
+        self.assertTrue(snapshot.details[0].pane_active)
+
+    def test_linked_window_keeps_one_row_per_session(self):
+        activity_rank = load_module()
+        # @5 is linked into alpha at index 0 and lives in beta at index 5.
+        raw = "".join(
+            "\t".join(fields) + "\n"
+            for fields in [
+                ["$1", "alpha", "900", "@5", "0", "shared", "800", "0", "", "1", "0", "%5", "0", "zsh", "t", "/repo", "105", "1"],
+                ["$2", "beta", "700", "@5", "5", "shared", "800", "0", "", "0", "0", "%5", "0", "zsh", "t", "/repo", "105", "1"],
+                ["$2", "beta", "700", "@6", "6", "other", "100", "0", "", "1", "0", "%6", "0", "zsh", "t", "/repo", "106", "1"],
+            ]
+        )
+        activity_rank.collect_snapshot = lambda: activity_rank.Snapshot.parse(raw)
+        activity_rank.process_text_for_panes = lambda panes: {}
+        activity_rank._tmux_batch = lambda commands: [""]
+        state = activity_rank.RankState(max_age=60)
+
+        snapshot = activity_rank.Snapshot.parse(raw)
+        self.assertTrue(state.refresh())
+        targets = [line.split("\t")[0] for line in state.answer("windows").splitlines()]
+
+        self.assertEqual([(row.session_name, row.window_id, row.window_index) for row in snapshot.windows], [("alpha", "@5", 0), ("beta", "@5", 5), ("beta", "@6", 6)])
+        self.assertEqual(sorted(targets), ["alpha:0", "beta:5", "beta:6"])
+
+    def test_rank_state_serves_prerendered_lists_and_filters_popup_window_per_request(self):
+        activity_rank = load_module()
+        raw = "".join(
+            "\t".join(fields) + "\n"
+            for fields in [
+                ["$1", "1-work", "900", "@1", "1", "agent", "800", "1", "", "0", "0", "%1", "0", "zsh", "codex agent", "/repo", "101", "1"],
+                ["$1", "1-work", "900", "@9", "9", "popup", "100", "0", "", "1", "0", "%9", "0", "fzf", "popup", "/repo", "109", "1"],
+                ["$1", "1-work", "900", "@9", "9", "popup", "100", "0", "", "1", "0", "%8", "1", "zsh", "origin", "/repo", "108", "0"],
+            ]
+        )
+        queries = []
+        activity_rank.collect_snapshot = lambda: activity_rank.Snapshot.parse(raw)
+        activity_rank.process_text_for_panes = lambda panes: {}
+        activity_rank._tmux_batch = lambda commands: queries.append(commands) or ["@9\n"]
+        state = activity_rank.RankState(max_age=60)
+
+        self.assertTrue(state.refresh())
+        windows = state.answer("windows").splitlines()
+        panes = state.answer("panes\t%8").splitlines()
+
+        self.assertEqual([line.split("\t")[0] for line in windows], ["1-work:1", "1-work:9"])
+        self.assertEqual(state.answer("sessions"), "1-work\t● 1-work\n")
+        self.assertEqual(panes[0], activity_rank.PANES_HEADER)
+        self.assertEqual([line.split("\t")[0] for line in panes[1:]], ["%1", "%8"])
+        self.assertEqual(queries, [[activity_rank.EXCLUDE_WINDOW_QUERY]])
+
+    def test_servers_are_collected_and_ranked_together_without_id_collisions(self):
+        activity_rank = load_module()
+        listings = {
+            "/tmp/a.sock": [["$0", "work", "100", "@0", "0", "shell", "100", "0", "", "1", "0", "%0", "0", "zsh", "t", "/a", "0", "1"]],
+            "/tmp/b.sock": [
+                ["$0", "work", "900", "@0", "0", "agent", "900", "1", "", "1", "0", "%0", "0", "zsh", "codex agent", "/b", "0", "1"],
+                ["$0", "work", "900", "@1", "1", "done", "50", "0", "1", "0", "0", "%1", "0", "zsh", "t", "/b", "0", "1"],
+            ],
+        }
+
+        def fake_batch(commands, server=""):
+            if server not in listings:
+                raise OSError("no server")
+            return ["".join("\t".join(fields) + "\n" for fields in listings[server])]
+
+        activity_rank._tmux_batch = fake_batch
+        activity_rank.process_text_for_panes = lambda panes: {}
+        servers = activity_rank.activity_servers(["/tmp/b.sock", "/tmp/a.sock", "/tmp/gone.sock", "/tmp/a.sock"])
+        out = io.StringIO()
+        with redirect_stdout(out):
+            activity_rank.print_windows(servers)
+
+        self.assertEqual(servers, ["/tmp/b.sock", "/tmp/a.sock", "/tmp/gone.sock"])
+        rows = [line.split("\t") for line in out.getvalue().splitlines()]
+        self.assertEqual([(row[0], row[2]) for row in rows], [("work:1", "/tmp/b.sock"), ("work:0", "/tmp/b.sock"), ("work:0", "/tmp/a.sock")])
+        self.assertEqual(rows[0][1], "✓   [b.sock] work:1  done")
+        self.assertEqual(rows[1][1][0], "●")
+
+    def test_profile_records_phases_and_counts_as_jsonl(self):
+        activity_rank = load_module()
+        pane = activity_rank.PaneDetail(
+            "$1", "work", "@1", 1, "agent", "%1", 0, "zsh", "codex agent",
+            "/repo", 100, True, False, False, False, 101,
+        )
+        activity_rank.collect_pane_details = lambda: [pane]
+        activity_rank.process_text_for_panes = lambda panes: {}
+        activity_rank._KIND_CACHE.clear()
+        activity_rank.PROFILE = activity_rank.Profile(True)
+
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            log_path = Path(tmp_raw) / "run" / "profile.jsonl"
+            with mock.patch.dict(os.environ, {"TMUX_ACTIVITY_PROFILE_LOG": str(log_path)}):
+                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as err:
+                    activity_rank.print_panes()
+                    activity_rank.PROFILE.emit("panes")
+            records = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(json.loads(err.getvalue()), records[0])
+        self.assertEqual(records[0]["command"], "panes")
+        self.assertEqual(set(records[0]["phases_ms"]), {"tmux", "process_text", "classify", "rank", "render"})
+        self.assertEqual(records[0]["counts"], {"panes": 1, "regex_scans": 1})
+
+    def test_top_k_phases_stream_the_same_order_as_a_full_sort(self):
+        activity_rank = load_module()
+        panes = [
+            activity_rank.PaneDetail("$1", "work", f"@{i % 5}", i % 5, "w", f"%{i}", i, "zsh", "codex" if i % 7 == 0 else "shell", "/repo", (i * 37) % 11, i % 2 == 0, i % 13 == 0, False, False, 100 + i)
+            for i in range(40)
+        ]
+        activity_rank.collect_pane_details = lambda: panes
+        activity_rank.process_text_for_panes = lambda rows: {}
+        full = activity_rank.render_panes(activity_rank.rank_panes(panes, process_text={}))
+
+        info, key = activity_rank._pane_order(panes, {})
+        phases = list(activity_rank.ranked_phases(panes, key, 5))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            activity_rank.print_panes(top_k=5)
+
+        self.assertEqual([len(chunk) for chunk in phases], [5, 35])
+        self.assertEqual(out.getvalue().splitlines(), full)
+        self.assertEqual(out.getvalue().count(activity_rank.PANES_HEADER), 1)
+
+    def test_structured_formats_keep_tabs_in_titles_and_match_the_library_ranking(self):
+        activity_rank = load_module()
+        panes = [
+            activity_rank.PaneDetail("$1", "work", "@1", 1, "w", "%1", 0, "zsh", "a\ttabbed title", "/repo/x y", 100, False, False, False, False, 101),
+            activity_rank.PaneDetail("$1", "work", "@2", 2, "w", "%2", 0, "zsh", "codex agent", "/repo", 200, True, False, False, False, 102),
+        ]
+        activity_rank.collect_pane_details = lambda: panes
+        activity_rank.process_text_for_panes = lambda rows: {}
+
+        jsonl = io.StringIO()
+        nul = io.StringIO()
+        with redirect_stdout(jsonl):
+            activity_rank.print_panes(fmt="jsonl")
+        with redirect_stdout(nul):
+            activity_rank.print_panes(fmt="nul")
+        ranked = activity_rank.rank("panes")
+
+        rows = [json.loads(line) for line in jsonl.getvalue().splitlines()]
+        self.assertEqual(rows, list(activity_rank.records(ranked)))
+        self.assertEqual([(row["pane_id"], row["kind"], row["mark"]) for row in rows], [("%2", "agent", "●"), ("%1", "normal", " ")])
+        self.assertEqual(rows[1]["title"], "a\ttabbed title")
+        header, *records = [record.split("\x1f") for record in nul.getvalue().split("\0")[:-1]]
+        self.assertEqual(tuple(header), activity_rank.record_fields(activity_rank.PaneDetail))
+        self.assertEqual([dict(zip(header, record))["title"] for record in records], ["codex agent", "a\ttabbed title"])
+
+    def test_ranking_does_not_mutate_slotted_rows(self):
+        activity_rank = load_module()
+        window = activity_rank.WindowRow("$1", "work", "@1", 1, "agent", 100, True, False, False)
+        pane = activity_rank.PaneDetail("$1", "work", "@1", 1, "agent", "%1", 0, "zsh", "codex", "/repo", 100, True, False, False, False, 101)
+
+        activity_rank.rank_windows([window], [pane], process_text={})
+        activity_rank.rank_panes([pane], process_text={})
+
+        self.assertFalse(hasattr(window, "__dict__"))
+        self.assertFalse(hasattr(pane, "__dict__"))
+        self.assertFalse(hasattr(window, "mark"))
+
+    def test_control_replies_keep_pane_ids_and_skip_notifications(self):
+        activity_rank = load_module()
+        stream = io.StringIO(
+            "%begin 100 1 0\n"
+            "%end 100 1 0\n"
+            "%session-changed $1 work\n"
+            "%begin 100 2 1\n"
+            "%1\t@1\n"
+            "%2\t@1\n"
+            "%end 100 2 1\n"
+            "%begin 100 3 1\n"
+            "%end 100 3 1\n"
+        )
+
+        replies = activity_rank._read_control_replies(stream, 2)
+
+        self.assertEqual(replies, ["%1\t@1\n%2\t@1\n", ""])
+
+    def test_control_error_reply_raises_so_callers_can_fall_back(self):
+        activity_rank = load_module()
+        stream = io.StringIO("%begin 100 2 1\nparse error: unknown command: bogus\n%error 100 2 1\n")
+
+        with self.assertRaises(activity_rank.TmuxControlError):
+            activity_rank._read_control_replies(stream, 1)
+
+    def test_wedged_control_client_times_out_and_falls_back_to_subprocesses(self):
+        activity_rank = load_module()
+        activity_rank.CONTROL_TIMEOUT_SECONDS = 0.2
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            fake_tmux = Path(tmp_raw) / "tmux"
+            # The control client never answers; plain queries echo their last argument.
+            fake_tmux.write_text('#!/bin/sh\ncase "$1" in -C) exec sleep 30 ;; esac\nfor arg; do last=$arg; done\necho "$last"\n', encoding="utf-8")
+            fake_tmux.chmod(0o755)
+            env = {"PATH": f"{tmp_raw}:{os.environ['PATH']}", "TMUX_ACTIVITY_BACKEND": "control"}
+            with mock.patch.dict(os.environ, env):
+                os.environ.pop("TMUX_ACTIVITY_SOCKET", None)
+                os.environ.pop("OUTER_TMUX_SOCKET", None)
+                start = time.monotonic()
+                replies = activity_rank._tmux_batch([["show", "-gqv", "one"], ["show", "-gqv", "two"]])
+                elapsed = time.monotonic() - start
+
+        self.assertEqual(replies, ["one\n", "two\n"])
+        self.assertLess(elapsed, 2.0)
+
+    def test_client_asks_the_daemon_only_for_requests_it_serves(self):
+        import activity_rank_client as client
+
+        with mock.patch.dict(os.environ, {"ORIGIN_PANE_ID": "%7", "TMUX_ACTIVITY_SOCKETS": ""}):
+            os.environ.pop("TMUX_ACTIVITY_DAEMON", None)
+            os.environ.pop("TMUX_ACTIVITY_PROFILE", None)
+            self.assertEqual(client.daemon_request_for(["x", "windows"]), "windows")
+            self.assertEqual(client.daemon_request_for(["x", "panes", "--top", "50"]), "panes\t%7")
+            self.assertIsNone(client.daemon_request_for(["x", "windows", "--format=jsonl"]))
+            self.assertIsNone(client.daemon_request_for(["x", "sessions", "--socket", "/tmp/s"]))
+            self.assertIsNone(client.daemon_request_for(["x", "serve"]))
+            os.environ["TMUX_ACTIVITY_DAEMON"] = "0"
+            self.assertIsNone(client.daemon_request_for(["x", "windows"]))
+
 
 if __name__ == "__main__":
     unittest.main()
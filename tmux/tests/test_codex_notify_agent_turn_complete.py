@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import importlib.util
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "codex_notify_agent_turn_complete.py"
+
+FAKE_HANDLER = """import sys, time
+time.sleep(float(sys.argv[0].endswith("slow.py")) * 5)
+open(sys.argv[0] + ".log", "w").write(sys.argv[1])
+"""
+
+# In-process subhandlers for a real dispatcher run: the drainer spools an event and is still
+# delivering it (while another producer spools a second one) when the hanging handler's
+# deadline makes the dispatcher exit.
+FAKE_DRAINER = """import os, time
+import notify_spool
+
+def handle(payload):
+    spool = notify_spool.Spool(os.environ["SPOOL_DIR"])
+    spool.put({"pane-id": "%1"})
+
+    def deliver(events):
+        spool.put({"pane-id": "%2"})
+        time.sleep(0.5)
+        with open(os.environ["DELIVERED"], "w") as f:
+            f.write(str(len(events)))
+
+    def handoff():
+        with open(os.environ["HANDED_OFF"], "w") as f:
+            f.write(str(len(spool.pending())))
+
+    spool.drain(0, deliver, handoff=handoff)
+    return 0
+"""
+FAKE_NOISY = """import sys
+
+def handle(payload):
+    print("handler stdout")
+    print("handler stderr", file=sys.stderr)
+    raise RuntimeError("handler traceback")
+"""
+FAKE_HANG = """import time
+
+def handle(payload):
+    time.sleep(30)
+"""
+RUN_DISPATCHER = """import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location("dispatcher", sys.argv[1])
+dispatcher = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dispatcher)
+dispatcher.ISOLATE = False
+dispatcher.HANDLERS = tuple((name, 0.2) for name in sys.argv[2:])
+dispatcher.main(["dispatcher", json.dumps({"type": "agent-turn-complete"})])
+"""
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("codex_notify_agent_turn_complete", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def fake_handler(name: str, handle) -> str:
+    module = types.ModuleType(name)
+    module.handle = handle
+    sys.modules[name] = module
+    return name
+
+
+class CodexNotifyAgentTurnCompleteTests(unittest.TestCase):
+    def tearDown(self):
+        for name in ("fake_notify_fast", "fake_notify_slow"):
+            sys.modules.pop(name, None)
+
+    def test_handlers_share_one_payload_and_run_concurrently_under_their_deadlines(self):
+        dispatcher = load_module()
+        seen = []
+        release = threading.Event()
+
+        def slow(payload):
+            seen.append(("slow", payload))
+            release.wait(10)
+            return 0
+
+        fast = fake_handler("fake_notify_fast", lambda payload: seen.append(("fast", payload)) or 0)
+        dispatcher.HANDLERS = ((fake_handler("fake_notify_slow", slow), 0.3), (fast, 0.3))
+
+        start = time.monotonic()
+        try:
+            finished = dispatcher._dispatch_in_process({"type": "agent-turn-complete"})
+            elapsed = time.monotonic() - start
+        finally:
+            release.set()
+
+        self.assertFalse(finished)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(sorted(name for name, _payload in seen), ["fast", "slow"])
+        self.assertIs(seen[0][1], seen[1][1])
+
+    def test_isolate_runs_each_handler_in_its_own_interpreter(self):
+        dispatcher = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(tmp_raw)
+            for name in ("fast", "slow"):
+                (tmp / f"{name}.py").write_text(FAKE_HANDLER, encoding="utf-8")
+            dispatcher.__file__ = str(tmp / "dispatcher.py")
+            dispatcher.HANDLERS = (("slow", 0.5), ("fast", 0.5), ("missing", 0.5))
+            payload_json = json.dumps({"type": "agent-turn-complete"})
+
+            start = time.monotonic()
+            dispatcher._dispatch_subprocess(payload_json)
+            elapsed = time.monotonic() - start
+
+            self.assertLess(elapsed, 3.0)
+            self.assertEqual((tmp / "fast.py.log").read_text(encoding="utf-8"), payload_json)
+            # The slow handler was killed at its deadline.
+            self.assertFalse((tmp / "slow.py.log").exists())
+
+    def test_killing_a_slow_handler_keeps_the_drainers_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(tmp_raw)
+            (tmp / "fake_drainer.py").write_text(FAKE_DRAINER, encoding="utf-8")
+            (tmp / "fake_hang.py").write_text(FAKE_HANG, encoding="utf-8")
+            (tmp / "run.py").write_text(RUN_DISPATCHER, encoding="utf-8")
+            env = dict(
+                os.environ,
+                PYTHONPATH=os.pathsep.join([str(tmp), str(MODULE_PATH.parent)]),
+                SPOOL_DIR=str(tmp / "spool"),
+                DELIVERED=str(tmp / "delivered"),
+                HANDED_OFF=str(tmp / "handed-off"),
+            )
+
+            start = time.monotonic()
+            subprocess.run(
+                [sys.executable, str(tmp / "run.py"), str(MODULE_PATH), "fake_hang", "fake_drainer"],
+                env=env,
+                check=True,
+                timeout=10,
+            )
+            elapsed = time.monotonic() - start
+
+            # The hanging handler was abandoned at its deadline, but the batch the drainer had
+            # claimed was delivered and removed from flight rather than killed with it, and the
+            # event spooled meanwhile was handed off instead of left for a future producer.
+            self.assertLess(elapsed, 5.0)
+            self.assertEqual((tmp / "delivered").read_text(encoding="utf-8"), "1")
+            self.assertEqual(os.listdir(tmp / "spool" / "inflight"), [])
+            self.assertEqual((tmp / "handed-off").read_text(encoding="utf-8"), "1")
+
+    def test_in_process_handlers_do_not_write_to_the_notify_pipes(self):
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(tmp_raw)
+            (tmp / "fake_noisy.py").write_text(FAKE_NOISY, encoding="utf-8")
+            (tmp / "run.py").write_text(RUN_DISPATCHER, encoding="utf-8")
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp), str(MODULE_PATH.parent)]))
+
+            result = subprocess.run(
+                [sys.executable, str(tmp / "run.py"), str(MODULE_PATH), "fake_noisy"],
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=10,
+            )
+
+            self.assertEqual((result.returncode, result.stdout, result.stderr), (0, "", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
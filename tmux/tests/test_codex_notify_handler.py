@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import importlib.util
+import json
+import os
+from pathlib import Path
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "codex_notify_handler.py"
+sys.path.insert(0, str(MODULE_PATH.parent))
+
+FAKE_TMUX = """#!/bin/sh
+printf '%s\\n' "$*" >> "$FAKE_TMUX_LOG"
+case "$*" in
+  *display-message*) printf '%%3\\t$1\\t@2\\t4242\\tmain\\tcodex\\n' ;;
+  *list-clients*) printf '/dev/ttys001\\t/dev/ttys001\\t%%3\\tattached\\nctl\\t\\t%%3\\tattached,control-mode\\n' ;;
+  *list-panes*) printf '%%3\\n' ;;
+esac
+"""
+
+FAKE_NOTIFIER = """#!/bin/sh
+printf '%s\\n' "$@" > "$FAKE_NOTIFIER_LOG"
+"""
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("codex_notify_handler", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_executable(path: Path, text: str) -> str:
+    path.write_text(text, encoding="utf-8")
+    path.chmod(0o755)
+    return str(path)
+
+
+class CodexNotifyHandlerTests(unittest.TestCase):
+    def test_turn_complete_asks_tmux_once_per_query_kind(self):
+        handler = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(tmp_raw)
+            tmux_log = tmp / "tmux.log"
+            notifier_log = tmp / "notifier.log"
+            removals = []
+            handler._find_tmux = lambda: write_executable(tmp / "tmux", FAKE_TMUX)
+            handler._find_terminal_notifier = lambda: write_executable(tmp / "terminal-notifier", FAKE_NOTIFIER)
+            handler._frontmost_bundle_id = lambda: handler.ITERM2_BUNDLE_ID
+            handler._schedule_terminal_notifier_remove = lambda notifier, group, delay: removals.append(group)
+            handler.TMUX_TURN_COMPLETE_DIR = str(tmp / "markers")
+            handler.NOTIFY_SPOOL_DIR = str(tmp / "spool")
+            handler.NOTIFY_BATCH_LOG = str(tmp / "batches.jsonl")
+            env = {
+                "FAKE_TMUX_LOG": str(tmux_log),
+                "FAKE_NOTIFIER_LOG": str(notifier_log),
+                "TMUX": "/tmp/fake-sock,1,0",
+                "TMUX_PANE": "%3",
+                "CODEX_NOTIFY_ON_CLICK": "",
+            }
+            payload = {"type": "agent-turn-complete", "cwd": tmp_raw, "turn-id": "t1", "last-assistant-message": "done"}
+
+            with mock.patch.dict(os.environ, env), mock.patch.object(handler.sys, "platform", "darwin"):
+                self.assertEqual(handler.main(["handler", json.dumps(payload)]), 0)
+
+            commands = [line.split()[2] for line in tmux_log.read_text(encoding="utf-8").splitlines()]
+            with handler.turn_markers.MarkerStore(str(tmp / "markers")) as store:
+                marker = store.get("%3")
+            notifier_argv = notifier_log.read_text(encoding="utf-8").splitlines()
+
+        self.assertEqual(sorted(commands), ["display-message", "list-clients", "list-panes", "set-window-option"])
+        self.assertEqual((marker["window-id"], marker["tmux-server-pid"]), ("@2", "4242"))
+        on_click = shlex.split(notifier_argv[notifier_argv.index("-execute") + 1])
+        for flag, value in [("--client", "/dev/ttys001"), ("--session-name", "main"), ("--window-name", "codex"), ("--pane-id", "%3")]:
+            self.assertEqual(on_click[on_click.index(flag) + 1], value)
+        # The control-mode client does not count as a second attached client.
+        self.assertEqual(removals, ["codex-pane-3"])
+
+    def test_slow_git_probe_does_not_hold_back_the_notification(self):
+        handler = load_module()
+        release = threading.Event()
+        sent = []
+
+        def slow_repo_root(cwd):
+            release.wait(10)
+            return "/repo/slow"
+
+        handler._git_repo_root = slow_repo_root
+        handler._git_branch_name = lambda cwd: "feature"
+        handler._find_tmux = lambda: None
+        handler._notify_macos = lambda title, message, **kwargs: sent.append(title)
+        handler.PROBE_DEADLINE_SECONDS = 0.2
+        handler.COALESCE_SECONDS = 0
+        payload = {"type": "agent-turn-complete", "cwd": "/work/app", "last-assistant-message": "done"}
+
+        start = time.monotonic()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_raw, mock.patch.dict(os.environ, {"TMUX_PANE": ""}):
+                handler.NOTIFY_SPOOL_DIR = str(Path(tmp_raw) / "spool")
+                handler.NOTIFY_BATCH_LOG = str(Path(tmp_raw) / "batches.jsonl")
+                handler.main(["handler", json.dumps(payload)])
+            elapsed = time.monotonic() - start
+        finally:
+            release.set()
+
+        self.assertLess(elapsed, 2.0)
+        # The repo root missed the deadline, so the title falls back to the cwd (and no branch).
+        self.assertEqual(sent, ["Codex (app)"])
+
+    def test_a_burst_of_turn_completes_is_delivered_as_one_batch(self):
+        handler = load_module()
+        sent = []
+        tmux_calls = []
+        handler._notify_macos = lambda title, message, **kwargs: sent.append((title, message, kwargs))
+        handler._tmux_ok = lambda tmux_bin, socket, args: tmux_calls.append(args) or True
+        handler._gc_turn_complete_markers = lambda **kwargs: tmux_calls.append(["gc"])
+        handler.COALESCE_SECONDS = 0.3
+        handler.COALESCE_QUIET_SECONDS = 0.3
+
+        def event(index: int) -> dict:
+            pane_id = f"%{index}"
+            marker = {"pane-id": pane_id, "window-id": f"@{index // 5}", "tmux-server-pid": "4242", "created-at": 1}
+            return {
+                "queued-at": time.time(), "pane-id": pane_id, "title": f"Codex (app{index})", "label": f"app{index}",
+                "message": "done", "group": f"codex-pane-{index}", "on-click": f"click {index}", "visible": True,
+                "marker": marker, "tmux": ["tmux", ""], "server-pid": "4242",
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            handler.TMUX_TURN_COMPLETE_DIR = str(Path(tmp_raw) / "markers")
+            handler.NOTIFY_SPOOL_DIR = str(Path(tmp_raw) / "notify" / "spool")
+            handler.NOTIFY_BATCH_LOG = str(Path(tmp_raw) / "notify" / "batches.jsonl")
+            threads = [threading.Thread(target=handler._submit, args=(event(index),)) for index in range(15)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+            with handler.turn_markers.MarkerStore(handler.TMUX_TURN_COMPLETE_DIR) as store:
+                marked = sum(len(store.panes_in_window("4242", f"@{window}")) for window in range(3))
+            batches = [json.loads(line) for line in Path(handler.NOTIFY_BATCH_LOG).read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual(len(sent), 1)
+        title, message, kwargs = sent[0]
+        self.assertEqual(title, "Codex (15 turns complete)")
+        self.assertTrue(message.startswith("app"))
+        self.assertFalse(kwargs["visible"])
+        self.assertEqual(marked, 15)
+        self.assertEqual([batch["events"] for batch in batches], [15])
+        # One chained set-window-option for the three windows, then one GC step.
+        self.assertEqual(len(tmux_calls), 2)
+        self.assertEqual(tmux_calls[0][:5], ["set-window-option", "-t", "@0", "@codex_done", "1"])
+        self.assertEqual([args for args in tmux_calls[0] if args == ";"], [";", ";"])
+        self.assertEqual(tmux_calls[1], ["gc"])
+
+    def test_handoff_drains_the_spool_in_a_detached_process(self):
+        handler = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            handler.TMUX_TURN_COMPLETE_DIR = str(Path(tmp_raw) / "markers")
+            handler.NOTIFY_SPOOL_DIR = str(Path(tmp_raw) / "notify" / "spool")
+            spool = handler.notify_spool.Spool(handler.NOTIFY_SPOOL_DIR)
+            marker = {"pane-id": "%7", "window-id": "@1", "tmux-server-pid": "4242", "created-at": 1}
+            spool.put({"pane-id": "%7", "title": "Codex", "message": "done", "marker": marker, "tmux": None})
+
+            handler._hand_off_drain()
+            deadline = time.monotonic() + 10
+            while spool.stranded() and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            self.assertFalse(spool.stranded())
+            with handler.turn_markers.MarkerStore(handler.TMUX_TURN_COMPLETE_DIR) as store:
+                self.assertEqual(store.get("%7")["window-id"], "@1")
+
+    def test_a_probe_past_its_deadline_does_not_hold_up_the_exit(self):
+        script = (
+            "import sys, time\n"
+            f"sys.path.insert(0, {str(MODULE_PATH.parent)!r})\n"
+            "import codex_notify_handler\n"
+            "probes = codex_notify_handler.Probes(0.1)\n"
+            "probes.start('slow', time.sleep, 30)\n"
+            "print(probes.get('slow', 'default'))\n"
+        )
+        start = time.monotonic()
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=20)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(result.stdout, "default\n")
+        self.assertLess(elapsed, 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
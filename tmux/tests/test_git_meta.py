@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import importlib.util
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "git_meta.py"
+AUTO_NAME = ROOT / "scripts" / "window_auto_name.sh"
+SHA = "0123456789abcdef0123456789abcdef01234567"
+# Keep the machine's own git config (core.abbrev, includes) out of the detached-HEAD names.
+NO_USER_CONFIG = {"GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1"}
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("git_meta", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_head(git_dir: Path, text: str, mtime: int) -> None:
+    git_dir.mkdir(parents=True, exist_ok=True)
+    (git_dir / "HEAD").write_text(text + "\n", encoding="utf-8")
+    os.utime(git_dir / "HEAD", (mtime, mtime))
+
+
+class GitMetaTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, NO_USER_CONFIG)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_walks_up_to_git_dirs_and_worktree_gitdir_files_without_forking_git(self):
+        git_meta = load_module()
+        git_meta._git = lambda cwd, args: self.fail(f"forked git {args}")
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(os.path.realpath(tmp_raw))
+            write_head(tmp / "repo" / ".git", "ref: refs/heads/feature/x", 1_000)
+            (tmp / "repo" / "src" / "pkg").mkdir(parents=True)
+            write_head(tmp / "repo" / ".git" / "worktrees" / "wt", SHA, 1_000)
+            (tmp / "wt").mkdir()
+            (tmp / "wt" / ".git").write_text("gitdir: ../repo/.git/worktrees/wt\n", encoding="utf-8")
+            (tmp / "plain").mkdir()
+
+            self.assertEqual(git_meta.repo_root(str(tmp / "repo" / "src" / "pkg")), str(tmp / "repo"))
+            self.assertEqual(git_meta.branch_name(str(tmp / "repo" / "src")), "feature/x")
+            self.assertEqual(git_meta.repo_root(str(tmp / "wt")), str(tmp / "wt"))
+            self.assertEqual(git_meta.branch_name(str(tmp / "wt")), "detached@0123456")
+            self.assertIsNone(git_meta.branch_name(str(tmp / "plain")))
+
+    def test_head_is_reread_only_when_its_mtime_changes(self):
+        git_meta = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            git_dir = Path(tmp_raw) / "repo" / ".git"
+            write_head(git_dir, "ref: refs/heads/main", 1_000)
+            self.assertEqual(git_meta.branch_name(str(git_dir.parent)), "main")
+
+            write_head(git_dir, "ref: refs/heads/other", 1_000)
+            self.assertEqual(git_meta.branch_name(str(git_dir.parent)), "main")
+            write_head(git_dir, "ref: refs/heads/other", 2_000)
+            self.assertEqual(git_meta.branch_name(str(git_dir.parent)), "other")
+
+    def test_unusual_layouts_fall_back_to_git(self):
+        git_meta = load_module()
+        calls = []
+        git_meta._git = lambda cwd, args: calls.append(args) or "from-git"
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            reftable = Path(tmp_raw) / "reftable"
+            write_head(reftable / ".git", "ref: refs/heads/.invalid", 1_000)
+            odd = Path(tmp_raw) / "odd"
+            odd.mkdir()
+            (odd / ".git").write_text("not a gitdir line\n", encoding="utf-8")
+
+            self.assertEqual(git_meta.branch_name(str(reftable)), "from-git")
+            self.assertEqual(git_meta.repo_root(str(odd)), "from-git")
+
+        self.assertEqual(calls, [["rev-parse", "--abbrev-ref", "HEAD"], ["rev-parse", "--show-toplevel"]])
+
+    def test_detached_head_follows_core_abbrev(self):
+        git_meta = load_module()
+        calls = []
+        git_meta._git = lambda cwd, args: calls.append(args) or "from-git"
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            repo = Path(tmp_raw) / "repo"
+            write_head(repo / ".git", SHA, 1_000)
+            write_head(repo / ".git" / "worktrees" / "wt", SHA, 1_000)
+            (repo / ".git" / "worktrees" / "wt" / "commondir").write_text("../..\n", encoding="utf-8")
+            (Path(tmp_raw) / "wt").mkdir()
+            (Path(tmp_raw) / "wt" / ".git").write_text("gitdir: ../repo/.git/worktrees/wt\n", encoding="utf-8")
+            config = repo / ".git" / "config"
+
+            for text, expected in (
+                ("[core]\n\tbare = false\n", "detached@0123456"),
+                ("[core]\n\tabbrev = 10 ; wide\n", "detached@0123456789"),
+                ('[Core] abbrev = "auto"\n', "detached@0123456"),
+                ("[core]\n\tabbrev = no\n", f"detached@{SHA}"),
+            ):
+                config.write_text(text, encoding="utf-8")
+                git_meta._CONFIG_CACHE.clear()
+                with self.subTest(config=text):
+                    self.assertEqual(git_meta.branch_name(str(repo)), expected)
+                    self.assertEqual(git_meta.branch_name(str(Path(tmp_raw) / "wt")), expected)
+            self.assertEqual(calls, [])
+
+            config.write_text("[include]\n\tpath = ~/.gitconfig.local\n", encoding="utf-8")
+            git_meta._CONFIG_CACHE.clear()
+            self.assertEqual(git_meta.branch_name(str(repo)), "from-git")
+            self.assertEqual(calls, [["rev-parse", "--abbrev-ref", "HEAD"]])
+
+    @unittest.skipUnless(shutil.which("bash"), "bash not installed")
+    def test_window_auto_name_reads_the_same_layouts_as_git_meta(self):
+        # window_auto_name.sh re-implements the reader in bash builtins; both must agree on
+        # what they parse and on what they leave to git.
+        git_meta = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(os.path.realpath(tmp_raw))
+            fake_bin = tmp / "bin"
+            fake_bin.mkdir()
+            (fake_bin / "git").write_text('#!/bin/sh\necho "$@" >> "$GIT_CALLS"\nexit 1\n', encoding="utf-8")
+            (fake_bin / "git").chmod(0o755)
+
+            write_head(tmp / "repo" / ".git", "ref: refs/heads/feature/x", 1_000)
+            (tmp / "repo" / "src").mkdir()
+            write_head(tmp / "repo" / ".git" / "worktrees" / "wt", "ref: refs/heads/wt-branch", 1_000)
+            (tmp / "wt").mkdir()
+            (tmp / "wt" / ".git").write_text("gitdir: ../repo/.git/worktrees/wt\n", encoding="utf-8")
+            write_head(tmp / "repo" / ".git" / "modules" / "sub", SHA, 1_000)
+            (tmp / "repo" / "sub").mkdir()
+            (tmp / "repo" / "sub" / ".git").write_text("gitdir: ../.git/modules/sub\n", encoding="utf-8")
+            fixtures = {
+                "detached": SHA,
+                "sha256": SHA + "0" * 24,
+                "no-space": "ref:refs/heads/tight",
+                "remote-ref": "ref: refs/remotes/origin/main",
+                "reftable": "ref: refs/heads/.invalid",
+                "garbage": "not a head",
+            }
+            for name, head in fixtures.items():
+                write_head(tmp / name / ".git", head, 1_000)
+            (tmp / "odd").mkdir()
+            (tmp / "odd" / ".git").write_text("not a gitdir line\n", encoding="utf-8")
+            (tmp / "plain").mkdir()
+
+            cases = ["repo", "repo/src", "wt", "repo/sub", *fixtures, "odd", "plain"]
+            for case in cases:
+                path = str(tmp / case)
+                calls = tmp / f"{case.replace('/', '_')}.calls"
+                result = subprocess.run(
+                    ["bash", str(AUTO_NAME), path],
+                    env=dict(os.environ, PATH=f"{fake_bin}:{os.environ.get('PATH', '')}", GIT_CALLS=str(calls)),
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    check=True,
+                )
+                bash_forked = calls.exists()
+
+                forked = []
+                git_meta._git = lambda cwd, args: forked.append(args)
+                root = git_meta.repo_root(path)
+                branch = git_meta.branch_name(path)
+                with self.subTest(case=case):
+                    self.assertEqual(bash_forked, bool(forked))
+                    if not forked:
+                        # window_auto_name: branch, else repo name (detached), else directory name.
+                        name = branch if branch and not branch.startswith("detached") else os.path.basename(root or path)
+                        self.assertEqual(result.stdout, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
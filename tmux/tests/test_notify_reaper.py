@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import importlib.util
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "notify_reaper.py"
+
+# Stand-in for terminal-notifier: records each `-remove GROUP` call.
+FAKE_NOTIFIER = """#!/bin/sh
+printf '%s\\n' "$*" >> "$FAKE_NOTIFIER_LOG"
+"""
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("notify_reaper", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_executable(path: Path, text: str) -> str:
+    path.write_text(text, encoding="utf-8")
+    path.chmod(0o755)
+    return str(path)
+
+
+def message(group: str, due: float, notifier: str = "terminal-notifier") -> bytes:
+    return json.dumps({"group": group, "due": due, "notifier": notifier}).encode("utf-8")
+
+
+class NotifyReaperTests(unittest.TestCase):
+    def test_due_entries_are_taken_as_one_batch_and_rescheduling_moves_a_group(self):
+        reaper = load_module()
+        r = reaper.Reaper()
+        r.add(message("codex-pane-1", 100.0))
+        r.add(message("codex-pane-2", 100.1))
+        r.add(message("codex-pane-3", 105.0))
+        r.add(message("codex-pane-1", 110.0))
+        r.add(b"not json")
+
+        self.assertEqual(r.next_due(), 100.1)
+        self.assertEqual(r.take_due(99.0), [])
+        # 100.1 is within the batch slack of 100.0; pane-1 moved to 110.
+        self.assertEqual(r.take_due(100.0), [("codex-pane-2", "terminal-notifier")])
+        self.assertEqual(r.take_due(110.0), [("codex-pane-3", "terminal-notifier"), ("codex-pane-1", "terminal-notifier")])
+        self.assertIsNone(r.next_due())
+
+    def test_schedule_starts_one_reaper_that_runs_every_removal(self):
+        reaper = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(tmp_raw)
+            log = tmp / "notifier.log"
+            notifier = write_executable(tmp / "terminal-notifier", FAKE_NOTIFIER)
+            env = {"FAKE_NOTIFIER_LOG": str(log), "CODEX_NOTIFY_REAPER_IDLE_SECONDS": "0.3"}
+            with mock.patch.dict(os.environ, env):
+                for index in range(5):
+                    self.assertTrue(reaper.schedule(f"codex-pane-{index}", 0.2, notifier, run_dir=str(tmp / "run")))
+
+            socket_path = reaper.socket_path(str(tmp / "run"))
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and os.path.exists(socket_path):
+                time.sleep(0.05)
+            lines = sorted(log.read_text(encoding="utf-8").splitlines())
+
+            # The reaper went idle and exited, taking its socket with it.
+            self.assertFalse(os.path.exists(socket_path))
+        self.assertEqual(lines, [f"-remove codex-pane-{index}" for index in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
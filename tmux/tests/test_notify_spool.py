@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import importlib.util
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "notify_spool.py"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("notify_spool", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class NotifySpoolTests(unittest.TestCase):
+    def test_events_claimed_by_a_dead_drainer_are_delivered_by_the_next_one(self):
+        notify_spool = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            spool = notify_spool.Spool(tmp_raw)
+            for index in range(3):
+                spool.put({"pane-id": f"%{index}"})
+            # A drainer claimed the batch and died before delivering it.
+            spool.claim()
+            self.assertEqual(spool.pending(), [])
+            self.assertEqual(len(os.listdir(spool.inflight)), 3)
+
+            delivered = []
+            spool.put({"pane-id": "%3"})
+            self.assertEqual(spool.drain(0, delivered.append), 1)
+
+            self.assertEqual([[event["pane-id"] for event in batch] for batch in delivered], [["%0", "%1", "%2", "%3"]])
+            self.assertEqual(os.listdir(spool.inflight), [])
+
+    def test_failed_delivery_puts_the_batch_back(self):
+        notify_spool = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            spool = notify_spool.Spool(tmp_raw)
+            spool.put({"pane-id": "%1"})
+
+            def fail(events):
+                raise RuntimeError("notifier crashed")
+
+            handoffs = []
+            with self.assertRaises(RuntimeError):
+                spool.drain(0, fail, handoff=lambda: handoffs.append(len(spool.pending())))
+            self.assertEqual(len(spool.pending()), 1)
+            self.assertEqual(os.listdir(spool.inflight), [])
+            self.assertEqual(handoffs, [1])
+
+    def test_an_event_spooled_during_a_delivery_past_the_deadline_is_handed_off(self):
+        notify_spool = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            spool = notify_spool.Spool(tmp_raw)
+            spool.put({"pane-id": "%1"})
+            delivered = []
+            detached = []
+
+            def slow_deliver(events):
+                delivered.append([event["pane-id"] for event in events])
+                if len(delivered) == 1:
+                    # Another producer finds the lock taken and leaves its event to this drainer.
+                    spool.put({"pane-id": "%2"})
+                    self.assertEqual(spool.drain(0, delivered.append), 0)
+                    time.sleep(0.3)
+
+            def handoff():
+                # The handler starts a detached `--drain` process; a thread stands in for it here.
+                thread = threading.Thread(target=spool.drain, args=(0, slow_deliver), kwargs={"block": True})
+                thread.start()
+                detached.append(thread)
+
+            spool.drain(0, slow_deliver, deadline=time.monotonic() + 0.1, handoff=handoff)
+            self.assertEqual(len(detached), 1)
+            detached[0].join(5)
+
+            self.assertEqual(delivered, [["%1"], ["%2"]])
+            self.assertEqual(spool.pending(), [])
+
+    def test_a_lone_event_waits_only_for_the_quiet_gap_and_drain_stops_at_its_deadline(self):
+        notify_spool = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            spool = notify_spool.Spool(tmp_raw)
+            delivered = []
+            spool.put({"pane-id": "%1"})
+            start = time.monotonic()
+            spool.drain(2.0, delivered.append, quiet_seconds=0.05)
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertEqual(len(delivered), 1)
+
+            # An event arrives during every delivery: without the deadline this drain would never end.
+            def deliver_while_more_arrive(events):
+                delivered.append(events)
+                spool.put({"pane-id": "%2"})
+
+            spool.put({"pane-id": "%2"})
+            start = time.monotonic()
+            spool.drain(0.05, deliver_while_more_arrive, quiet_seconds=0.02, deadline=start + 0.3)
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertGreater(len(delivered), 2)
+            # What arrived after the deadline stays spooled for the next producer.
+            self.assertEqual(len(spool.pending()), 1)
+
+    def test_stop_draining_waits_for_the_batch_in_delivery_and_starts_no_other(self):
+        notify_spool = load_module()
+        self.addCleanup(notify_spool._stopping.clear)
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            spool = notify_spool.Spool(tmp_raw)
+            spool.put({"pane-id": "%1"})
+            delivering = threading.Event()
+            delivered = []
+
+            def slow_deliver(events):
+                delivering.set()
+                time.sleep(0.2)
+                spool.put({"pane-id": "%2"})
+                delivered.append(events)
+
+            drainer = threading.Thread(target=spool.drain, args=(0, slow_deliver))
+            drainer.start()
+            delivering.wait(5)
+            self.assertTrue(notify_spool.stop_draining(5))
+            drainer.join(5)
+
+            self.assertEqual(len(delivered), 1)
+            self.assertEqual([json.loads(Path(tmp_raw, name).read_text())["pane-id"] for name in spool.pending()], ["%2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import importlib.util
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "proc_table.py"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("proc_table", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_proc_entry(root: Path, pid: int, stat: str, cmdline: bytes) -> None:
+    base = root / str(pid)
+    base.mkdir()
+    (base / "stat").write_text(stat, encoding="utf-8")
+    (base / "cmdline").write_bytes(cmdline)
+
+
+def write_indexed_entry(root: Path, pid: int, comm: str, start: int, argv: list[str], children: list[int]) -> None:
+    base = root / str(pid)
+    (base / "task" / str(pid)).mkdir(parents=True, exist_ok=True)
+    (base / "stat").write_text(f"{pid} ({comm}) S 1 0 0 0 -1 0 0 0 0 0 0 0 0 0 20 0 1 0 {start} 0 0\n", encoding="utf-8")
+    (base / "cmdline").write_bytes(b"\0".join(arg.encode() for arg in argv) + b"\0")
+    (base / "task" / str(pid) / "children").write_text(" ".join(str(child) for child in children), encoding="utf-8")
+
+
+class ProcTableTests(unittest.TestCase):
+    def test_read_proc_matches_ps_shape_including_odd_comm_and_kernel_threads(self):
+        proc_table = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            root = Path(tmp_raw)
+            write_proc_entry(root, 2, "2 (kthreadd) S 0 0 0 0 -1 0 0 0 0 0 0 0 0 0 20 0 1 0 5 0 0\n", b"")
+            write_proc_entry(
+                root,
+                101,
+                "101 (tmux: server) S 1 101 101 0 -1 0 0 0 0 0 0 0 0 0 20 0 1 0 900 0 0\n",
+                b"tmux\0new-session\0",
+            )
+            write_proc_entry(
+                root,
+                102,
+                "102 (we) ird) S 101 102 102 0 -1 0 0 0 0 0 0 0 0 0 20 0 1 0 901 0 0\n",
+                b"node\0node_modules/vite/bin/vite.js\0--host\0",
+            )
+            (root / "self").mkdir()
+
+            parents, commands = proc_table.read_proc(str(root))
+
+        self.assertEqual(parents, {2: 0, 101: 1, 102: 101})
+        self.assertEqual(commands[2], "[kthreadd]")
+        self.assertEqual(commands[101], "tmux new-session")
+        self.assertEqual(commands[102], "node node_modules/vite/bin/vite.js --host")
+
+    def test_missing_procfs_falls_back_to_ps_output(self):
+        proc_table = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            self.assertIsNone(proc_table.read_proc(str(Path(tmp_raw) / "missing")))
+        parents, commands = proc_table.parse_ps("  101     1 tmux new-session\n  102   101\nbogus line\n")
+        self.assertEqual(parents, {101: 1, 102: 101})
+        self.assertEqual(commands, {101: "tmux new-session", 102: ""})
+
+    def test_codex_session_id_skips_rows_without_argv(self):
+        proc_table = load_module()
+        spec = importlib.util.spec_from_file_location("codex_session_id", ROOT / "scripts" / "codex_session_id.py")
+        codex_session_id = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = codex_session_id
+        spec.loader.exec_module(codex_session_id)
+        table = ({2: 0, 101: 1, 102: 101, 103: 101}, {2: "[kthreadd]", 101: "tmux", 102: "", 103: "codex"})
+        proc_table.process_table = lambda: table
+
+        self.assertEqual(codex_session_id.iter_ps_table(), ({101: 1, 103: 101}, {101: "tmux", 103: "codex"}))
+
+    def test_process_index_reuses_unchanged_pids_and_rereads_reused_ones(self):
+        proc_table = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            root = Path(tmp_raw) / "proc"
+            cache = Path(tmp_raw) / "run" / "proc-index.json"
+            write_indexed_entry(root, 100, "zsh", 10, ["-zsh"], [101])
+            write_indexed_entry(root, 101, "node", 11, ["node", "codex"], [102])
+            write_indexed_entry(root, 102, "vite", 12, ["node", "vite"], [])
+
+            first = proc_table.ProcessIndex(str(root))
+            self.assertEqual(first.subtree_commands(100, 80), ["-zsh", "node codex", "node vite"])
+            first.save(str(cache))
+            self.assertEqual(first.refreshed, 3)
+
+            # pid 102 exited and the pid was reused by a different process.
+            (root / "102" / "stat").unlink()
+            (root / "102" / "cmdline").unlink()
+            write_indexed_entry(root, 102, "pytest", 99, ["python3", "-m", "pytest"], [])
+
+            second = proc_table.ProcessIndex(str(root))
+            second.load(str(cache))
+            self.assertEqual(second.subtree_commands(100, 80), ["-zsh", "node codex", "python3 -m pytest"])
+            self.assertEqual((second.reused, second.refreshed), (2, 1))
+            self.assertEqual(second.subtree_commands(101, 1), ["node codex"])
+
+    def test_process_index_rereads_a_retitled_process(self):
+        proc_table = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            root = Path(tmp_raw) / "proc"
+            write_indexed_entry(root, 100, "python3", 10, ["python3", "worker.py"], [])
+            index = proc_table.ProcessIndex(str(root))
+            self.assertEqual(index.subtree_commands(100, 80), ["python3 worker.py"])
+            index.commit()
+
+            # setproctitle rewrites argv and sets comm to the new title's head.
+            (root / "100" / "stat").unlink()
+            (root / "100" / "cmdline").unlink()
+            write_indexed_entry(root, 100, "worker: idle", 10, ["worker: idle"], [])
+
+            self.assertEqual(index.subtree_commands(100, 80), ["worker: idle"])
+            self.assertEqual((index.reused, index.refreshed), (0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+import importlib.util
+from pathlib import Path
+import sys
+import unittest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "session_manager.py"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("session_manager", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def session(session_id: str, name: str, index, label: str, created: int = 0):
+    return {"id": session_id, "name": name, "created": created, "index": index, "label": label}
+
+
+class SessionManagerTests(unittest.TestCase):
+    def test_apply_order_renames_only_changed_sessions_in_one_tmux_call(self):
+        session_manager = load_module()
+        calls = []
+        session_manager.run_tmux = lambda args, check=True, capture=False: calls.append(args) or ""
+        sessions = [session(f"${i}", f"{i + 1}-s{i}", i + 1, f"s{i}") for i in range(40)]
+        sessions[10], sessions[11] = sessions[11], sessions[10]
+        order = " ".join(str(entry["id"]) for entry in sessions)
+
+        session_manager.apply_order(sessions)
+        renamed = [session(entry["id"], f"{pos}-{entry['label']}", pos, entry["label"]) for pos, entry in enumerate(sessions, start=1)]
+        session_manager.apply_order(renamed)
+
+        self.assertEqual(
+            calls,
+            [[
+                "rename-session", "-t", "$11", "11-s11", ";",
+                "rename-session", "-t", "$10", "12-s10", ";",
+                "set", "-gF", "@session_order", f"#{{e|+:#{{@session_renames}},2}} {order}",
+            ]],
+        )
+
+    def test_switch_by_index_reads_the_order_option_and_rebuilds_it_when_stale(self):
+        session_manager = load_module()
+        calls = []
+        live = {"$0", "$2"}
+        outputs = {
+            "display-message": "0 $0 $1\t",
+            "list-sessions": "$0\t1-a\t10\t\t0 $0 $1\n$2\t2-c\t30\t\t0 $0 $1",
+        }
+
+        def fake_run(args, check=True, capture=False):
+            calls.append(args)
+            return outputs.get(args[0], "") if capture else ""
+
+        session_manager.run_tmux = fake_run
+        session_manager.tmux_ok = lambda args: calls.append(args) or args[2] in live
+
+        session_manager.command_switch("1")
+        self.assertEqual([args[0] for args in calls], ["display-message", "switch-client"])
+
+        calls.clear()
+        session_manager.command_switch("2")
+        self.assertEqual(
+            calls,
+            [
+                ["switch-client", "-t", "$1", ";", "refresh-client", "-S"],
+                ["list-sessions", "-F", "#{session_id}\t#{session_name}\t#{session_created}\t#{@session_renames}\t#{@session_order}"],
+                ["set", "-gF", "@session_order", "#{e|+:#{@session_renames},0} $0 $2"],
+                ["switch-client", "-t", "$2", ";", "refresh-client", "-S"],
+            ],
+        )
+
+    def test_external_rename_invalidates_the_order_index(self):
+        session_manager = load_module()
+        calls = []
+        # The index was written at rename generation 1; an external rename-session bumped it to 2
+        # and swapped the numbering, while every id still exists.
+        outputs = {
+            "display-message": "1 $0 $1\t2",
+            "list-sessions": "$1\t1-b\t20\t2\t1 $0 $1\n$0\t2-a\t10\t2\t1 $0 $1",
+        }
+
+        def fake_run(args, check=True, capture=False):
+            calls.append(args)
+            return outputs.get(args[0], "") if capture else ""
+
+        session_manager.run_tmux = fake_run
+        session_manager.tmux_ok = lambda args: calls.append(args) or True
+
+        session_manager.command_switch("1")
+
+        self.assertEqual([args[0] for args in calls], ["display-message", "list-sessions", "set", "switch-client"])
+        self.assertEqual(calls[-1][2], "$1")
+
+    def test_client_state_comes_from_one_list_clients_call_per_command(self):
+        session_manager = load_module()
+        calls = []
+
+        def fake_run(args, check=True, capture=False):
+            calls.append(args)
+            if args[0] == "list-clients":
+                return "client-9\t\t$3\t@7\t1\n/dev/ttys001\t/dev/ttys001\t$1\t@4\t0\nclient-7\t/dev/ttys002\t$2\t@9\t0"
+            return ""
+
+        session_manager.run_tmux = fake_run
+
+        self.assertEqual(session_manager.current_session_id("client-7"), "$2")
+        self.assertEqual(session_manager.current_window_id("client-7"), "@9")
+        self.assertEqual(session_manager.current_window_id("/dev/ttys001"), "@4")
+        self.assertEqual(session_manager.current_session_id("/dev/ttys002"), "$2")
+        self.assertEqual([args[0] for args in calls], ["list-clients"])
+        # The control-mode client is skipped, so it answers neither for itself nor for an empty tty.
+        self.assertNotIn("client-9", session_manager._client_state)
+        self.assertNotIn("", session_manager._client_state)
+
+    def test_key_server_coalesces_repeated_navigation_into_one_switch(self):
+        session_manager = load_module()
+        calls = []
+        current = {"session": "$1"}
+
+        def fake_run(args, check=True, capture=False):
+            if args[0] == "display-message":
+                return "3 $0 $1 $2 $3\t3"
+            if args[0] == "list-clients":
+                return f"c1\t/dev/ttys001\t{current['session']}\t@1\t0"
+            return ""
+
+        def fake_ok(args):
+            calls.append(args)
+            current["session"] = args[args.index("-t") + 1]
+            return True
+
+        session_manager.run_tmux = fake_run
+        session_manager.tmux_ok = fake_ok
+        server = session_manager.KeyServer()
+        for _ in range(5):
+            server.submit("rel\tc1\t1\t\n")
+        server.submit("rel\tc1\t-1\t\n")
+
+        batch = server.take(timeout=0)
+        self.assertEqual({client: (entry["delta"], entry["requests"]) for client, entry in batch.items()}, {"c1": (4, 6)})
+        self.assertEqual(server.flush("c1", batch["c1"]), "$1")
+        server.submit("rel\tc1\t1\t\n")
+        self.assertEqual(server.flush("c1", server.take(timeout=0)["c1"]), "$2")
+        self.assertEqual(
+            calls,
+            [
+                ["switch-client", "-c", "c1", "-t", "$1", ";", "refresh-client", "-t", "c1", "-S"],
+                ["switch-client", "-c", "c1", "-t", "$2", ";", "refresh-client", "-t", "c1", "-S"],
+            ],
+        )
+
+    def test_swapping_sessions_with_the_same_label_goes_through_temporary_names(self):
+        session_manager = load_module()
+        commands = session_manager.rename_commands([session("$1", "2-x", 2, "x"), session("$0", "1-x", 1, "x")])
+
+        self.assertEqual(
+            commands,
+            [
+                ["rename-session", "-t", "$1", "_renaming_1"],
+                ["rename-session", "-t", "$0", "_renaming_0"],
+                ["rename-session", "-t", "$1", "1-x"],
+                ["rename-session", "-t", "$0", "2-x"],
+            ],
+        )
+
+    def test_chained_arguments_escape_a_trailing_semicolon(self):
+        session_manager = load_module()
+        args = session_manager.chain_commands([["rename-session", "-t", "$1", "1-a;"], ["refresh-client", "-S"]])
+
+        self.assertEqual(args, ["rename-session", "-t", "$1", "1-a\\;", ";", "refresh-client", "-S"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import importlib.util
+import io
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+import unittest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULE_PATH = ROOT / "scripts" / "turn_markers.py"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("turn_markers", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def marker(pane_id: str, window_id: str = "@1", server_pid: str = "100", created_at: int = 0, thread_id: str = ""):
+    return {
+        "type": "agent-turn-complete",
+        "thread-id": thread_id,
+        "pane-id": pane_id,
+        "window-id": window_id,
+        "tmux-server-pid": server_pid,
+        "created-at": created_at or int(time.time()),
+    }
+
+
+class TurnMarkersTests(unittest.TestCase):
+    def test_legacy_marker_files_are_imported_once_and_removed(self):
+        turn_markers = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            tmp = Path(tmp_raw)
+            (tmp / "%1").write_text(json.dumps(marker("%1", thread_id="t-1")), encoding="utf-8")
+            (tmp / "%2").write_text("{not json", encoding="utf-8")
+
+            with turn_markers.MarkerStore(tmp_raw) as store:
+                self.assertEqual(store.get("%1")["thread-id"], "t-1")
+                self.assertIsNone(store.get("%2"))
+            self.assertEqual(sorted(path.name for path in tmp.iterdir() if path.name.startswith("%")), [])
+
+            # A legacy file that shows up later is not re-imported: migration ran once.
+            (tmp / "%3").write_text(json.dumps(marker("%3")), encoding="utf-8")
+            with turn_markers.MarkerStore(tmp_raw) as store:
+                self.assertIsNone(store.get("%3"))
+
+    def test_ack_removes_the_pane_marker_and_reports_the_rest_of_the_window(self):
+        turn_markers = load_module()
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            turn_markers.TURN_COMPLETE_DIR = tmp_raw
+            with turn_markers.MarkerStore(tmp_raw) as store:
+                store.add(marker("%1", thread_id="t-1"))
+                store.add(marker("%2"))
+                store.add(marker("%9", window_id="@2"))
+                self.assertEqual(sorted(store.panes_in_window("100", "@1")), ["%1", "%2"])
+
+            out = io.StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(turn_markers.main(["turn_markers.py", "ack", "%1", "%1", "%2"]), 0)
+                self.assertEqual(turn_markers.main(["turn_markers.py", "ack", "%2", "%1", "%2"]), 0)
+                self.assertEqual(turn_markers.main(["turn_markers.py", "ack", "%2"]), 1)
+            self.assertEqual(out.getvalue().splitlines(), ["1\t1\tt-1", "1\t0\t", "0\t0\t"])
+            self.assertEqual(turn_markers.main(["turn_markers.py", "has", "%8", "%9"]), 0)
+            self.assertEqual(turn_markers.main(["turn_markers.py", "has", "%1"]), 1)
+
+    def test_ack_without_returning_selects_and_deletes_in_one_transaction(self):
+        turn_markers = load_module()
+        turn_markers.HAS_RETURNING = False
+        with tempfile.TemporaryDirectory() as tmp_raw, turn_markers.MarkerStore(tmp_raw) as store:
+            store.add(marker("%1", thread_id="t-1"))
+            statements = []
+            store.db.set_trace_callback(statements.append)
+
+            self.assertEqual(store.ack("%1")["thread-id"], "t-1")
+            self.assertIsNone(store.ack("%1"))
+
+            self.assertFalse(any("RETURNING" in statement for statement in statements))
+            self.assertEqual(statements[0], "BEGIN IMMEDIATE")
+            self.assertIsNone(store.get("%1"))
+
+    def test_gc_steps_resume_from_the_cursor_and_cover_every_marker_once_per_epoch(self):
+        turn_markers = load_module()
+        now = int(time.time())
+        with tempfile.TemporaryDirectory() as tmp_raw, turn_markers.MarkerStore(tmp_raw) as store:
+            for index in range(500):
+                store.add(marker(f"%{index:03d}", server_pid="100" if index % 2 else "99"))
+            store.add(marker("%999", created_at=now - 3600))
+            live = {f"%{index:03d}" for index in range(0, 500, 5)} | {"%999"}
+
+            steps = [
+                store.gc_step(current_server_pid="100", live_pane_ids=live, ttl_seconds=60, batch=200)
+                for _ in range(3)
+            ]
+            epoch = store.db.execute("SELECT epoch, cursor FROM gc_state").fetchone()
+            remaining = [row[0] for row in store.db.execute("SELECT pane_id FROM markers")]
+
+        self.assertEqual([checked for checked, _removed in steps], [200, 200, 101])
+        self.assertEqual(sum(removed for _checked, removed in steps), 451)
+        self.assertEqual(epoch, (1, ""))
+        self.assertEqual(sorted(remaining), [f"%{index:03d}" for index in range(5, 500, 10)])
+
+    def test_gc_runs_at_most_once_per_interval(self):
+        turn_markers = load_module()
+        listed = []
+
+        def list_panes():
+            listed.append(1)
+            return "%1\n"
+
+        with tempfile.TemporaryDirectory() as tmp_raw:
+            with turn_markers.MarkerStore(tmp_raw) as store:
+                store.add(marker("%1"))
+                store.add(marker("%2"))
+                self.assertTrue(store.gc_claim(60, now=1_000))
+                self.assertFalse(store.gc_claim(60, now=1_030))
+                self.assertTrue(store.gc_claim(60, now=1_061))
+
+            self.assertEqual(turn_markers.run_gc(current_server_pid="100", list_panes=list_panes, directory=tmp_raw), (2, 1))
+            self.assertIsNone(turn_markers.run_gc(current_server_pid="100", list_panes=list_panes, directory=tmp_raw))
+            self.assertEqual(listed, [1])
+
+if __name__ == "__main__":
+    unittest.main()